@@ -0,0 +1,123 @@
+# displacement_task.py – Verdrängung als Hintergrundaufgabe (QgsTask)
+# Die Eingaben werden vorher auf dem Hauptthread direkt aus den Ebenen gelesen;
+# die Aufgabe selbst greift weder auf Ebenen noch auf das laufende Projekt zu.
+# Geschrieben wird erst in finished() (Hauptthread) und nur bei Erfolg.
+
+import traceback
+
+from qgis.core import QgsTask, QgsProcessingFeedback, QgsProject, QgsGeometry, QgsFeatureRequest
+
+
+def collect_source_geometry(specs, crs) -> QgsGeometry:
+    """
+    Liest die Ebenen einer Spezifikationsliste (siehe _collect_layers_from_list)
+    direkt – nur Hauptthread. Entspricht dem Ausdruck aus build_source_expressions:
+    je Objekt transformieren → vereinfachen → glätten, je Ebene sammeln, Ebenen vereinigen.
+    """
+    project = QgsProject.instance()
+    result = None
+    for spec in specs:
+        layer = project.mapLayer(spec['layer_id'])
+        if layer is None:
+            continue
+        req = QgsFeatureRequest()
+        if spec.get('selected_only') and layer.selectedFeatureIds():
+            req.setFilterFids(layer.selectedFeatureIds())
+        if crs is not None and crs.isValid() and layer.crs().isValid() and layer.crs().authid() != crs.authid():
+            req.setDestinationCrs(crs, project.transformContext())
+
+        simplify = spec.get('simplify')
+        smooth = None
+        if spec.get('smooth_enabled'):
+            off, it = spec.get('smooth_offset'), spec.get('smooth_iter')
+            if off in (None, 0, 0.0) and it in (None, 0):
+                smooth = (1, 0.25)            # QGIS-Standardwerte von smooth()
+            else:
+                smooth = (1 if it is None else int(it), 0.0 if off is None else float(off))
+
+        geoms = []
+        for feat in layer.getFeatures(req):
+            g = feat.geometry()
+            if g is None or g.isEmpty():
+                continue
+            if isinstance(simplify, (int, float)) and simplify > 0:
+                g = g.simplify(simplify)
+            if smooth is not None:
+                g = g.smooth(*smooth)
+            geoms.append(g)
+        if not geoms:
+            continue
+        part = QgsGeometry.collectGeometry(geoms)
+        result = part if result is None else result.combine(part)
+    return result if result is not None else QgsGeometry()
+
+
+class DisplacementTask(QgsTask):
+    """
+    Rechnet line_displacement (Stufen 1–16) im Hintergrund. Fortschritt je Stufe
+    erscheint im Taskmanager; Abbruch greift zwischen den Stufen und in den
+    längeren Schleifen (auch in der Netzverknüpfung). on_finished(task, ok)
+    wird auf dem Hauptthread aufgerufen; bei ok stehen geometry und early bereit.
+    Ist buf_dist eine Liste mehrerer Abstände, rechnen die gemeinsamen Stufen
+    einmal; results enthält dann [(Abstand, Geometrie, vorzeitig), …], geometry
+    und early beziehen sich auf den ersten Abstand. log_enabled schaltet das Log
+    nur für diese Aufgabe (None: LOG_ENABLED des Skripts).
+    """
+
+    def __init__(self, description, to_move, fixed, crs, buf_dist, min_repl_len,
+                 pre_params, fin_params, stage, options, on_finished, log_enabled=None):
+        super().__init__(description, QgsTask.CanCancel)
+        self.to_move = to_move
+        self.fixed = fixed
+        self.crs = crs
+        self.buf_dist = buf_dist
+        self.min_repl_len = min_repl_len
+        self.pre_params = pre_params
+        self.fin_params = fin_params
+        self.stage = stage or "final"
+        self.options = dict(options or {})
+        self.on_finished = on_finished
+        self.log_enabled = log_enabled
+        self.feedback = QgsProcessingFeedback()
+        self.geometry = None
+        self.early = False
+        self.results = []
+        self.canceled = False
+        self.error = ""
+
+    def run(self):
+        import Linienverdraengung as LV  # registrar nimmt den scripts-Ordner in sys.path auf
+
+        # Verbindung im Arbeitsthread anlegen → direkte Weitergabe an den Taskmanager
+        self.feedback.progressChanged.connect(lambda p: self.setProgress(p))
+        project = QgsProject()       # nur für das KBS der Netzverknüpfung; nichts am laufenden Projekt
+        project.setCrs(self.crs)
+        try:
+            if isinstance(self.buf_dist, (list, tuple)) and len(self.buf_dist) > 1:
+                self.results = LV.run_line_displacement_multi(
+                    self.to_move, self.fixed, self.buf_dist, self.min_repl_len,
+                    self.pre_params, self.fin_params, self.options, project,
+                    self.stage, self.feedback, log_enabled=self.log_enabled)
+                _dist, self.geometry, self.early = self.results[0]
+            else:
+                dist = self.buf_dist[0] if isinstance(self.buf_dist, (list, tuple)) else self.buf_dist
+                self.geometry, self.early = LV.run_line_displacement(
+                    self.to_move, self.fixed, dist, self.min_repl_len,
+                    self.pre_params, self.fin_params, self.options, project,
+                    self.stage, self.feedback, log_enabled=self.log_enabled)
+                self.results = [(dist, self.geometry, self.early)]
+        except LV.DisplacementCanceled:
+            self.canceled = True
+            return False
+        except Exception as e:
+            self.error = f"{e}\n{traceback.format_exc()}"
+            return False
+        return not self.isCanceled()
+
+    def cancel(self):
+        self.feedback.cancel()
+        super().cancel()
+
+    def finished(self, result):
+        self.canceled = self.canceled or self.isCanceled()
+        self.on_finished(self, bool(result))
@@ -58,7 +58,7 @@ def _per_feature_pipeline(src_authid: str | None, target_authid: str | None,
         else:
             off = (0.0 if smooth_offset in (None,) else smooth_offset)
             it  = (1   if smooth_iter  in (None,) else smooth_iter)
-            term = f"smooth({term}, {off}, {it})"
+            term = f"smooth({term}, {it}, {off})"   # smooth(Geometrie, Iterationen, Versatz)
 
     return term
 
@@ -152,6 +152,38 @@ def _arr_literal_with_comments(vals: list) -> str:
     return "\n".join(lines)
 
 
+def _map_literal(opts: dict) -> str:
+    """
+    Gibt die Optionen als map(...) aus, ein Schlüssel-Wert-Paar pro Zeile.
+    """
+    def lit(v):
+        if isinstance(v, bool):
+            return "true" if v else "false"
+        if v is None:
+            return "NULL"
+        if isinstance(v, str):
+            return _q(v)
+        return str(v)
+
+    items = list(opts.items())
+    lines = ["map("]
+    for i, (k, v) in enumerate(items):
+        comma = "," if i < len(items) - 1 else ""
+        lines.append(f"  {_q(str(k))}, {lit(v)}{comma}")
+    lines.append(")")
+    return "\n".join(lines)
+
+
+def build_source_expressions(to_move_layers, fixed_layers, target_authid: str | None = None):
+    """
+    Ausdrücke für die Argumente 1) und 2): je Ebene aggregate(..., 'collect', ...),
+    mehrere Ebenen per union(...) verschachtelt. Rückgabe (weichend, bleibend).
+    """
+    move_expr  = _union_nested([_aggregate_layer(L, target_authid) for L in to_move_layers])
+    fixed_expr = _union_nested([_aggregate_layer(L, target_authid) for L in fixed_layers])
+    return move_expr, fixed_expr
+
+
 def build_line_displacement_call(
     to_move_layers,
     fixed_layers,
@@ -162,15 +194,11 @@ def build_line_displacement_call(
     fin_params,
     debug_stage: str,
     log_to_desktop: bool = False,
-    target_authid: str | None = None
+    target_authid: str | None = None,
+    options: dict | None = None
 ) -> str:
-    # --- zu verdrängende Geometrie: pro Feature -> collect, ggf. mehrere Layer -> union ---
-    move_terms = [_aggregate_layer(L, target_authid) for L in to_move_layers]
-    move_expr  = _union_nested(move_terms)
-
-    # --- bleibende Geometrie: identisches Schema ---
-    fixed_terms = [_aggregate_layer(L, target_authid) for L in fixed_layers]
-    fixed_expr  = _union_nested(fixed_terms)
+    # --- zu verdrängende und bleibende Geometrie: pro Feature -> collect, ggf. mehrere Layer -> union ---
+    move_expr, fixed_expr = build_source_expressions(to_move_layers, fixed_layers, target_authid)
 
     # Parameterblöcke (6 Elemente) normalisieren
     pre6 = _norm_params(pre_params, default_iters=0)
@@ -244,7 +272,10 @@ def build_line_displacement_call(
 
     # 4) Verdrängungs-Abstand
     parts.append(t("-- 4) Verdrängungs-Abstand:", "-- 4) Displacement distance:"))
-    parts.append(f"{buf_dist},")
+    if isinstance(buf_dist, (list, tuple)):
+        parts.append(_arr_literal(list(buf_dist)) + ",")   # mehrere Abstände: je Abstand ein Objekt
+    else:
+        parts.append(f"{buf_dist},")
     parts.append("")
 
     # 5) Mindestlänge verdrängter Strecken
@@ -269,7 +300,15 @@ def build_line_displacement_call(
 
     # 9) Logdatei auf Desktop
     parts.append(t("-- 9) Logdatei auf Desktop:", "-- 9) Write log file on desktop:"))
-    parts.append(logfl)
+    if options:
+        parts.append(logfl + ",")
+        parts.append("")
+
+        # 10) Optionen (optional)
+        parts.append(t("-- 10) Optionen:", "-- 10) Options:"))
+        parts.append(_map_literal(options))
+    else:
+        parts.append(logfl)
     parts.append(")")
 
     return "\n".join(parts)
@@ -2,9 +2,11 @@
 import os
 from PyQt5.QtCore import QUrl
 from qgis.PyQt import QtWidgets, QtCore, QtGui
-from qgis.gui import QgsProjectionSelectionWidget
+from qgis.gui import QgsProjectionSelectionWidget, QgsFileWidget
 from qgis.core import QgsCoordinateReferenceSystem
 from .i18n import t
+from . import registrar  # noqa: F401  (nimmt den scripts-Ordner in sys.path auf)
+import ld_core  # scripts/ld_core.py – MERGE_DEFAULTS wie im Processing-Algorithmus
 
 class LineDisplacementDialog(QtWidgets.QDialog):
     def __init__(self, parent=None):
@@ -168,6 +170,14 @@ class LineDisplacementDialog(QtWidgets.QDialog):
         self.spin_buf.setValue(0.0)
         self.spin_buf.setMinimumWidth(70)
 
+        self.edit_more_dists = QtWidgets.QLineEdit()
+        self.edit_more_dists.setPlaceholderText(t("z. B. 15; 25 (optional)", "e.g. 15; 25 (optional)"))
+        self.edit_more_dists.setToolTip(t(
+            "Weitere Verdrängungs-Abstände (z. B. für andere Maßstäbe). Gemeinsame Schritte laufen nur einmal; "
+            "je Abstand entsteht ein Objekt mit dem Abstand im Feld 'buf_dist'.",
+            "Further displacement distances (e.g. for other scales). Shared steps run only once; "
+            "each distance yields one feature with the distance in the field 'buf_dist'."))
+
         self.spin_minlen = QtWidgets.QDoubleSpinBox()
         self.spin_minlen.setDecimals(6)
         self.spin_minlen.setRange(0.0, 1e9)
@@ -175,6 +185,7 @@ class LineDisplacementDialog(QtWidgets.QDialog):
         self.spin_minlen.setMinimumWidth(70)
 
         form_disp.addRow(t("Verdrängungs-Abstand:", "Displacement distance:"), self.spin_buf)
+        form_disp.addRow(t("Weitere Abstände:", "Further distances:"), self.edit_more_dists)
         form_disp.addRow(t("Mindestlänge verdrängter Strecken:", "Minimal length of displaced segments:"), self.spin_minlen)
 
         # -------- Netzverknüpfung zu verdrängender Geometrie --------
@@ -205,25 +216,28 @@ class LineDisplacementDialog(QtWidgets.QDialog):
             grid.addWidget(widget_post,row, 2)
             row += 1
 
+        d_tol, d_ang, d_simpl, d_iters, d_split, d_even = ld_core.MERGE_DEFAULTS
         self.chk_split_pre  = QtWidgets.QCheckBox(); self.chk_split_post = QtWidgets.QCheckBox()
+        self.chk_split_pre.setChecked(d_split); self.chk_split_post.setChecked(d_split)
         _mk_row(t("vorab an Kreuzungen zerlegen:", "Initially split at intersections:"), self.chk_split_pre, self.chk_split_post)
         self.chk_even_pre   = QtWidgets.QCheckBox(); self.chk_even_post = QtWidgets.QCheckBox()
+        self.chk_even_pre.setChecked(d_even); self.chk_even_post.setChecked(d_even)
         _mk_row(t("ungerade Kreuzungen nicht verknüpfen:", "Dont’t connect uneven intersections:"), self.chk_even_pre, self.chk_even_post)
 
-        self.spin_tol_pre  = QtWidgets.QDoubleSpinBox(); self.spin_tol_pre.setDecimals(6); self.spin_tol_pre.setRange(0.0, 1e9); self.spin_tol_pre.setValue(0.0); self.spin_tol_pre.setMinimumWidth(70)
-        self.spin_tol_post = QtWidgets.QDoubleSpinBox(); self.spin_tol_post.setDecimals(6); self.spin_tol_post.setRange(0.0, 1e9); self.spin_tol_post.setValue(0.0); self.spin_tol_post.setMinimumWidth(70)
+        self.spin_tol_pre  = QtWidgets.QDoubleSpinBox(); self.spin_tol_pre.setDecimals(6); self.spin_tol_pre.setRange(0.0, 1e9); self.spin_tol_pre.setValue(d_tol); self.spin_tol_pre.setMinimumWidth(70)
+        self.spin_tol_post = QtWidgets.QDoubleSpinBox(); self.spin_tol_post.setDecimals(6); self.spin_tol_post.setRange(0.0, 1e9); self.spin_tol_post.setValue(d_tol); self.spin_tol_post.setMinimumWidth(70)
         _mk_row(t("Toleranz gegenüber Löchern:", "Tolerance for holes:"), self.spin_tol_pre, self.spin_tol_post)
 
-        self.spin_ang_pre  = QtWidgets.QDoubleSpinBox(); self.spin_ang_pre.setDecimals(3); self.spin_ang_pre.setRange(0.0, 180.0); self.spin_ang_pre.setValue(90.0); self.spin_ang_pre.setMinimumWidth(70)
-        self.spin_ang_post = QtWidgets.QDoubleSpinBox(); self.spin_ang_post.setDecimals(3); self.spin_ang_post.setRange(0.0, 180.0); self.spin_ang_post.setValue(90.0); self.spin_ang_post.setMinimumWidth(70)
+        self.spin_ang_pre  = QtWidgets.QDoubleSpinBox(); self.spin_ang_pre.setDecimals(3); self.spin_ang_pre.setRange(0.0, 180.0); self.spin_ang_pre.setValue(d_ang); self.spin_ang_pre.setMinimumWidth(70)
+        self.spin_ang_post = QtWidgets.QDoubleSpinBox(); self.spin_ang_post.setDecimals(3); self.spin_ang_post.setRange(0.0, 180.0); self.spin_ang_post.setValue(d_ang); self.spin_ang_post.setMinimumWidth(70)
         _mk_row(t("maximale Winkelabweichung (°):", "Maximum angle deviation (°):"), self.spin_ang_pre, self.spin_ang_post)
 
-        self.spin_simpl_pre  = QtWidgets.QDoubleSpinBox(); self.spin_simpl_pre.setDecimals(6); self.spin_simpl_pre.setRange(0.0, 10.0); self.spin_simpl_pre.setValue(0.0); self.spin_simpl_pre.setMinimumWidth(70)
-        self.spin_simpl_post = QtWidgets.QDoubleSpinBox(); self.spin_simpl_post.setDecimals(6); self.spin_simpl_post.setRange(0.0, 10.0); self.spin_simpl_post.setValue(0.0); self.spin_simpl_post.setMinimumWidth(70)
+        self.spin_simpl_pre  = QtWidgets.QDoubleSpinBox(); self.spin_simpl_pre.setDecimals(6); self.spin_simpl_pre.setRange(0.0, 10.0); self.spin_simpl_pre.setValue(d_simpl); self.spin_simpl_pre.setMinimumWidth(70)
+        self.spin_simpl_post = QtWidgets.QDoubleSpinBox(); self.spin_simpl_post.setDecimals(6); self.spin_simpl_post.setRange(0.0, 10.0); self.spin_simpl_post.setValue(d_simpl); self.spin_simpl_post.setMinimumWidth(70)
         _mk_row(t("vereinfachende Betrachtung:", "Simplified assessment:"), self.spin_simpl_pre, self.spin_simpl_post)
 
-        self.spin_it_pre  = QtWidgets.QSpinBox(); self.spin_it_pre.setRange(0, 999999); self.spin_it_pre.setValue(10); self.spin_it_pre.setMinimumWidth(70)
-        self.spin_it_post = QtWidgets.QSpinBox(); self.spin_it_post.setRange(0, 999999); self.spin_it_post.setValue(10); self.spin_it_post.setMinimumWidth(70)
+        self.spin_it_pre  = QtWidgets.QSpinBox(); self.spin_it_pre.setRange(0, 999999); self.spin_it_pre.setValue(d_iters); self.spin_it_pre.setMinimumWidth(70)
+        self.spin_it_post = QtWidgets.QSpinBox(); self.spin_it_post.setRange(0, 999999); self.spin_it_post.setValue(d_iters); self.spin_it_post.setMinimumWidth(70)
         _mk_row(t("maximale Iterationen:", "Maximum iterations:"), self.spin_it_pre, self.spin_it_post)
 
         def _set_enabled_col(pre_col: bool, on: bool):
@@ -338,12 +352,52 @@ class LineDisplacementDialog(QtWidgets.QDialog):
         self.chk_leave_symbol = QtWidgets.QCheckBox(
             t("Symbolebene hinterlassen, deren Geometriegenerator die Verdrängung auch ohne Plugin steuern kann", "Leave symbol layer whose geometry generator can control displacement even without plugin")
         )
-        self.chk_leave_symbol.setChecked(True)
+        self.chk_leave_symbol.setChecked(False)   # nur für dynamische Nutzung; gerechnet wird direkt
         v4.addWidget(self.chk_leave_symbol)
 
         self.chk_log = QtWidgets.QCheckBox(t("Logdatei auf Desktop ablegen","Write log file on desktop"))
         v4.addWidget(self.chk_log)
 
+        # Kachelmodus (Quadtree + Prozess-Pool)
+        tiles_row = QtWidgets.QHBoxLayout()
+        self.chk_tiles = QtWidgets.QCheckBox(t("in Kacheln parallel rechnen, Prozesse:", "Compute in parallel tiles, processes:"))
+        self.spin_workers = QtWidgets.QSpinBox()
+        self.spin_workers.setRange(0, 256)
+        self.spin_workers.setValue(0)
+        self.spin_workers.setSpecialValueText(t("automatisch", "automatic"))
+        self.spin_workers.setMinimumWidth(70)
+        self.spin_workers.setEnabled(False)
+        self.chk_tiles.toggled.connect(self.spin_workers.setEnabled)
+        tiles_row.addWidget(self.chk_tiles)
+        tiles_row.addWidget(self.spin_workers)
+        tiles_row.addStretch(1)
+        v4.addLayout(tiles_row)
+
+        # Export aller Debug-Stufen eines Laufs in ein GeoPackage
+        export_row = QtWidgets.QHBoxLayout()
+        self.chk_export = QtWidgets.QCheckBox(t("alle Debug-Stufen ins GeoPackage exportieren:", "Export all debug stages to GeoPackage:"))
+        self.file_export = QgsFileWidget()
+        self.file_export.setStorageMode(QgsFileWidget.SaveFile)
+        self.file_export.setFilter("GeoPackage (*.gpkg)")
+        self.file_export.setEnabled(False)
+        self.chk_export.toggled.connect(self.file_export.setEnabled)
+        export_row.addWidget(self.chk_export)
+        export_row.addWidget(self.file_export, 1)
+        v4.addLayout(export_row)
+
+        # Kennzahlen je Stufe (JSON-Zeilen + Tabelle)
+        self.chk_metrics = QtWidgets.QCheckBox(t("Kennzahlen je Stufe aufzeichnen (JSON-Zeilen auf dem Desktop) und als Tabelle zeigen",
+                                                 "Record metrics per stage (JSON lines on desktop) and show them as a table"))
+        v4.addWidget(self.chk_metrics)
+
+        self.chk_profile = QtWidgets.QCheckBox(t("Laufzeitprofil erstellen (cProfile, .prof neben der Logdatei)",
+                                                 "Create runtime profile (cProfile, .prof next to the log file)"))
+        v4.addWidget(self.chk_profile)
+
+        self.chk_memory = QtWidgets.QCheckBox(t("Speicherverbrauch je Stufe messen (ins Log, langsamer)",
+                                                "Trace memory per stage (into the log, slower)"))
+        v4.addWidget(self.chk_memory)
+
         # Fortgeschritten-Box zum linken Container
         main_v.addWidget(adv)
 
@@ -4,16 +4,20 @@ from datetime import datetime
 from qgis.PyQt import QtWidgets, QtCore, QtGui
 from qgis.core import (
     QgsProject, QgsVectorLayer, QgsFeature, QgsGeometry, QgsWkbTypes,
-    QgsExpression, QgsExpressionContext, QgsExpressionContextUtils,
     QgsApplication, QgsLineSymbol, QgsSingleSymbolRenderer,
     QgsCoordinateReferenceSystem, QgsCoordinateTransformContext
 )
 from qgis.utils import iface
 
 from .line_displacement_gui import LineDisplacementDialog
+from .metrics_dock import MetricsDock, read_metrics
 from .expression_builder import build_line_displacement_call
+from .displacement_task import DisplacementTask, collect_source_geometry
 from . import registrar
+from .provider import LineDisplacementProvider
 from .i18n import t
+import ld_logging  # scripts/ld_logging.py – registrar nimmt den Ordner in sys.path auf
+import ld_core     # scripts/ld_core.py
 
 
 # ------------ gemeinsames Logging (nur wenn aktiviert) ------------
@@ -23,20 +27,21 @@ def _logfile_path():
     home = os.path.expanduser("~")
     return os.path.join(home, "Desktop", "line_displacement.log")
 
-def _log_to_file(text: str):
+def _metrics_path():
+    home = os.path.expanduser("~")
+    return os.path.join(home, "Desktop", "line_displacement_metrics.jsonl")
+
+# Datei + Python-Konsole, gepuffert über den gemeinsamen Hintergrund-Thread
+_LOG = ld_logging.get_logger("main", _logfile_path(), enabled=True, echo=True)
+
+def _log_to_file(text, level=ld_logging.INFO):
     if not MAIN_LOG_ENABLED:
         return
-    try:
-        with open(_logfile_path(), "a", encoding="utf-8") as f:
-            from datetime import datetime
-            f.write(f"[main] {datetime.now().isoformat(timespec='seconds')}  {text}\n")
-    except Exception:
-        pass
-    # immer auch in die Python-Konsole
-    print(f"[main] {text}")
+    _LOG.log(text, level)
 
 def _bar(self, level, msg):
-    _log_to_file(t(f"MITTEILUNGSLEISTE[{level}] {msg}", f"BAR[{level}] {msg}"))
+    _log_to_file(lambda: t(f"MITTEILUNGSLEISTE[{level}] {msg}", f"BAR[{level}] {msg}"),
+                 {"warn": ld_logging.WARNING, "crit": ld_logging.ERROR}.get(level, ld_logging.INFO))
     if level == "info":
         self.iface.messageBar().pushInfo(t("Linienverdrängung", "Line Displacement"), msg)
     elif level == "warn":
@@ -78,20 +83,11 @@ def _pick_ref_crs(self, moving, fixed):
 
     return prj.crs(), False
 
-def _set_layer_visible(layer, visible: bool):
-    node = QgsProject.instance().layerTreeRoot().findLayer(layer.id())
-    if node:
-        node.setItemVisibilityChecked(bool(visible))
-
-def _wait(ms: int):
-    loop = QtCore.QEventLoop()
-    QtCore.QTimer.singleShot(ms, loop.quit)
-    loop.exec()
-
-def _add_geomgen_symbol(layer: QgsVectorLayer, expr_text: str) -> bool:
+def _add_geomgen_symbol(layer: QgsVectorLayer, expr_text: str, active: bool = True) -> bool:
     """
-    Hängt einen Geometriegenerator (Linie) als zusätzliche Symbolebene an
-    und lässt ihn aktiv (sichtbar), damit der Ausdruck sofort ausgewertet wird.
+    Hängt einen Geometriegenerator (Linie) als zusätzliche Symbolebene an.
+    active=True lässt ihn aktiv (sichtbar), damit der Ausdruck sofort ausgewertet
+    wird; active=False hinterlässt ihn nur abgeschaltet zur späteren Nutzung.
     Umsetzung über die Symbol-Registry von QgsApplication.
     """
     try:
@@ -128,72 +124,87 @@ def _add_geomgen_symbol(layer: QgsVectorLayer, expr_text: str) -> bool:
         else:
             _log_to_file(t("WARN: setSubSymbol nicht vorhanden – Unter-Symbol konnte nicht gesetzt werden.", "WARN: setSubSymbol not available – could not set sub-symbol."))
 
-        gg.setEnabled(True)  # während der Berechnung aktiv
+        gg.setEnabled(bool(active))
 
         base_symbol.appendSymbolLayer(gg)
         layer.setRenderer(QgsSingleSymbolRenderer(base_symbol))
         layer.triggerRepaint()
 
-        _log_to_file(t("Geometriegenerator hinzugefügt (aktiv; Expression explizit gesetzt).", "Geometry generator added (active; expression set explicitly)."))
+        _log_to_file(t(f"Geometriegenerator hinzugefügt (aktiv={bool(active)}; Expression explizit gesetzt).", f"Geometry generator added (active={bool(active)}; expression set explicitly)."))
         return True
     except Exception as e:
         _log_to_file(t(f"Geometriegenerator-FEHLER: {e}", f"Geometry generator ERROR: {e}"))
         return False
 
-def _cleanup_geomgen(layer: QgsVectorLayer, leave_symbol: bool):
+def _parse_distances(text: str) -> list:
+    """Weitere Abstände aus dem Dialog: durch Semikolon oder Leerzeichen getrennt, Dezimalkomma erlaubt."""
+    vals = []
+    for tok in text.replace(";", " ").split():
+        try:
+            vals.append(float(tok.replace(",", ".")))
+        except ValueError:
+            _log_to_file(t(f"Abstand '{tok}' ignoriert (keine Zahl).", f"Distance '{tok}' ignored (not a number)."))
+    return vals
+
+def _write_result(layer: QgsVectorLayer, results, replace: bool) -> bool:
     """
-    Entfernt die Geometriegenerator-Symbolebenen absturzfrei (oder lässt sie deaktiviert stehen).
-    Vorgehen:
-      - immer auf einem KLON des Symbols arbeiten
-      - rückwärts löschen
-      - den bereinigten Klon als Renderer setzen
+    Schreibt das Ergebnis in die Zielebene: vorhandene Objekte ersetzen oder anhängen.
+    results = [(Abstand, Geometrie, vorzeitig), …] – je Abstand ein Objekt, der Abstand
+    landet im Feld 'buf_dist', sofern die Ebene eines hat.
     """
-    try:
-        r = layer.renderer()
-        if not r:
-            _log_to_file(t("Aufräumen: Kein Renderer vorhanden.", "Cleanup: No renderer present."))
-            return
-        orig = r.symbol()
-        if not orig:
-            _log_to_file(t("Aufräumen: Kein Symbol vorhanden.", "Cleanup: No symbol present."))
-            return
-
-        # immer erst klonen – nie am "lebenden" Symbol schneiden
-        sym = orig.clone()
-
-        if leave_symbol:
-            # nur deaktivieren (im Klon), Optik bleibt 1:1 erhalten
-            changed = 0
-            for i in range(sym.symbolLayerCount()):
-                sl = sym.symbolLayer(i)
-                if getattr(sl, "layerType", lambda: "")() == "GeometryGenerator":
-                    sl.setEnabled(False)
-                    changed += 1
-            layer.setRenderer(QgsSingleSymbolRenderer(sym))
-            layer.triggerRepaint()
-            _log_to_file(t(f"Aufräumen: Geometriegenerator deaktiviert hinterlassen (count={changed}).", f"Cleanup: Geometry generator left disabled (count={changed})."))
-        else:
-            # rückwärts löschen im Klon
-            removed = 0
-            for i in range(sym.symbolLayerCount() - 1, -1, -1):
-                sl = sym.symbolLayer(i)
-                if getattr(sl, "layerType", lambda: "")() == "GeometryGenerator":
-                    sym.deleteSymbolLayer(i)
-                    removed += 1
-            # bereinigten Klon setzen
-            layer.setRenderer(QgsSingleSymbolRenderer(sym))
-            layer.triggerRepaint()
-            _log_to_file(t(f"Aufräumen: Geometriegenerator entfernt (count={removed}).", f"Cleanup: Geometry generator removed (count={removed})."))
-    except Exception as e:
-        _log_to_file(t(f"Aufräum-Fehler: {e}", f"Cleanup error: {e}"))
+    prov = layer.dataProvider()
+    if replace:
+        ids = [f.id() for f in layer.getFeatures()]
+        if ids:
+            _log_to_file(t(f"Objekte löschen: {len(ids)}", f"deleteFeatures: {len(ids)}"))
+            prov.deleteFeatures(ids)
+    idx = layer.fields().indexOf("buf_dist")
+    feats = []
+    for dist, geom, _early in results:
+        if geom is None or geom.isEmpty():
+            continue
+        feat = QgsFeature(layer.fields())
+        feat.setGeometry(geom)
+        if idx >= 0:
+            feat.setAttribute(idx, dist)
+        feats.append(feat)
+    ok, added = prov.addFeatures(feats)
+    layer.updateExtents()
+    layer.triggerRepaint()
+    _log_to_file(t(f"Ergebnis geschrieben (ersetzen={replace}, ok={ok}).",
+                   f"Result written (replace={replace}, ok={ok})."))
+    return bool(ok)
+
+def _add_stage_layer(geom: QgsGeometry, stage: str, crs, label: str = "") -> QgsVectorLayer:
+    """Debug-Stufe als neue temporäre Ebene passenden Geometrietyps (die Zielebene bleibt unberührt)."""
+    gtype = QgsWkbTypes.displayString(QgsWkbTypes.multiType(geom.wkbType()))
+    auth = crs.authid() if crs and crs.isValid() else "EPSG:4326"
+    lyr = QgsVectorLayer(f"{gtype}?crs={auth}", f"line_displacement: {stage}{label}", "memory")
+    g = QgsGeometry(geom)
+    g.convertToMultiType()
+    f = QgsFeature()
+    f.setGeometry(g)
+    lyr.dataProvider().addFeatures([f])
+    lyr.updateExtents()
+    QgsProject.instance().addMapLayer(lyr, True)
+    return lyr
 
 class LineDisplacement:
     def __init__(self, iface_):
         self.iface = iface_
         self.action = None
+        self.metrics_dock = None
+        self.task = None   # laufende DisplacementTask (Referenz halten, sonst räumt Python sie ab)
+        self.provider = None
         self.plugin_dir = os.path.dirname(__file__)
 
+    def initProcessing(self):
+        """Processing-Anbieter mit 'Linien verdrängen' (auch für qgis_process, siehe metadata.txt)."""
+        self.provider = LineDisplacementProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
     def initGui(self):
+        self.initProcessing()
         icon_path = os.path.join(self.plugin_dir, "icon.png")
         icon = QtGui.QIcon(icon_path)
         self.action = QtWidgets.QAction(icon, t("Linienverdrängung", "Line Displacement"), self.iface.mainWindow())
@@ -205,9 +216,32 @@ class LineDisplacement:
             self.iface.messageBar().pushWarning(t("Linienverdrängung", "Line Displacement"), msg)
 
     def unload(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.provider is not None:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
         if self.action:
             self.iface.removeToolBarIcon(self.action)
             self.iface.removePluginMenu(t("Linienverdrängung", "Line Displacement"), self.action)
+        if self.metrics_dock:
+            self.iface.removeDockWidget(self.metrics_dock)
+            self.metrics_dock.deleteLater()
+            self.metrics_dock = None
+
+    def _show_metrics(self, path, offset):
+        """Zeigt die seit offset angehängten Kennzahlen im andockbaren Fenster."""
+        records = read_metrics(path, offset)
+        if not records:
+            _log_to_file(t("Keine Kennzahlen gefunden.", "No metrics found."))
+            return
+        if self.metrics_dock is None:
+            self.metrics_dock = MetricsDock(self.iface.mainWindow())
+            self.iface.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.metrics_dock)
+        self.metrics_dock.show_records(records)
+        self.metrics_dock.show()
+        self.metrics_dock.raise_()
 
     def _ensure_temp_subset_layer(self, lyr, only_selected):
         """
@@ -256,7 +290,13 @@ class LineDisplacement:
                                   simplify=None,
                                   smooth_enabled=False,
                                   smooth_offset=None,
-                                  smooth_iter=None):
+                                  smooth_iter=None,
+                                  make_subset=True):
+        """
+        Ebenen-Spezifikationen für den Ausdruck und die direkte Berechnung.
+        make_subset=False legt keine temporäre Teil-Ebene an (die direkte
+        Berechnung liest die Auswahl über 'layer_id' + 'selected_only').
+        """
         prj = QgsProject.instance()
         result = []
         for name in names:
@@ -264,9 +304,11 @@ class LineDisplacement:
             if not lst:
                 continue
             lyr = lst[0]
-            lyr2 = self._ensure_temp_subset_layer(lyr, selected_only)
+            lyr2 = self._ensure_temp_subset_layer(lyr, selected_only) if make_subset else lyr
             result.append({
                 'name': lyr2.name(),
+                'layer_id': lyr.id(),
+                'selected_only': bool(selected_only),
                 'simplify': simplify,
                 'smooth_enabled': bool(smooth_enabled),
                 'smooth_offset': smooth_offset,
@@ -282,18 +324,7 @@ class LineDisplacement:
         crs_used = crs if (crs and crs.isValid()) else (prj.crs() if prj.crs().isValid() else QgsCoordinateReferenceSystem("EPSG:4326"))
         auth = crs_used.authid() if crs_used.isValid() else "EPSG:4326"
 
-        vlyr = QgsVectorLayer(f"LineString?crs={auth}", name, "memory")
-        prov = vlyr.dataProvider()
-
-        # kleines Dummy-Feature (damit der Geometriegenerator sofort rendern kann)
-        f = QgsFeature()
-        if crs_used.isGeographic():
-            geom_wkt = "LINESTRING(0 0, 0 0.000001)"
-        else:
-            geom_wkt = "LINESTRING(0 0, 0 1)"
-        f.setGeometry(QgsGeometry.fromWkt(geom_wkt))
-        prov.addFeatures([f])
-
+        vlyr = QgsVectorLayer(f"LineString?crs={auth}&field=buf_dist:double", name, "memory")
         QgsProject.instance().addMapLayer(vlyr, True)
         return vlyr
 
@@ -306,67 +337,12 @@ class LineDisplacement:
         # Reihenfolge: tol, angle, simplify_factor, iterations, split_before, only_even_endpoints
         return [float(tol), float(ang), float(simpl), it, bool(split), bool(evenonly)]
 
-    def _materialize(self, target_layer, expr_text, replace=True):
-        _log_to_file(t("Materialisierung starten", "Materialize START"))
-        #_dump_expr(expr_text)
-
-        # Sichtbarkeit / Bearbeitbarkeit
-        root = QgsProject.instance().layerTreeRoot()
-        node = root.findLayer(target_layer.id())
-        if node:
-            node.setItemVisibilityChecked(False)
-        target_layer.startEditing()
-        if node:
-            node.setItemVisibilityChecked(True)
-
-        # Platzhalter-Feature sicherstellen
-        prov = target_layer.dataProvider()
-        if replace:
-            ids = [f.id() for f in target_layer.getFeatures()]
-            if ids:
-                _log_to_file(t(f"Objekte löschen: {len(ids)}", f"deleteFeatures: {len(ids)}"))
-                prov.deleteFeatures(ids)
-        if target_layer.featureCount() == 0:
-            _log_to_file(t("Platzhalter-Objekt hinzufügen", "add placeholder feature"))
-            prov.addFeatures([QgsFeature()])
-
-        feat = next(target_layer.getFeatures(), None)
-        if feat is None:
-            _log_to_file(t("Platzhalter fehlt, nochmals hinzufügen", "placeholder missing, add again"))
-            prov.addFeatures([QgsFeature()])
-            feat = next(target_layer.getFeatures(), None)
-
-        # Ausdruck auswerten
-        expr = QgsExpression(expr_text)
-        if expr.hasParserError():
-            perr = expr.parserErrorString()
-            _log_to_file(t("Parserfehler: ", "parserError: ") + perr)
-            _bar(self, "crit", t("Parserfehler im Ausdruck (Details im Log).", "Parser error in expression (see log for details)."))
-            target_layer.rollBack()
-            return False
-
-        ctx = QgsExpressionContext()
-        ctx.appendScopes(QgsExpressionContextUtils.globalProjectLayerScopes(target_layer))
-        if feat is not None:
-            ctx.setFeature(feat)
-
-        _log_to_file(t("Ausdruck auswerten …", "evaluate expr() …"))
-        _ = expr.evaluate(ctx)
-        if expr.hasEvalError():
-            e = expr.evalErrorString()
-            _log_to_file(t("Auswertungsfehler: " + e, "evalError: " + e))
-            _bar(self, "crit", t("Auswertung fehlgeschlagen (Details im Log).", "Evaluation failed (see log for details)."))
-            target_layer.rollBack()
-            return False
-
-        # Commit
-        _log_to_file(t("Änderungen schreiben()", "commitChanges()"))
-        target_layer.commitChanges()
-        _log_to_file(t("Materialisierung fertig", "Materialize DONE"))
-        return True
-
     def run(self):
         _log_to_file(t("Plugin run() starten", "Plugin run() START"))
+        if self.task is not None:
+            _bar(self, "warn", t("Es läuft bereits eine Verdrängung (siehe Taskmanager).",
+                                 "A displacement is already running (see task manager)."))
+            return
         d = LineDisplacementDialog(self.iface.mainWindow())
 
         # vorhandene Vektorebenen in die beiden Listen übernehmen (mit Geometrietyp-Filter)
@@ -531,6 +507,7 @@ class LineDisplacement:
             smooth_enabled=d.chk_fixed_smooth.isChecked(),
             smooth_offset=(d.spin_fixed_smooth_off.value() if d.chk_fixed_smooth.isChecked() else None),
             smooth_iter=(d.spin_fixed_smooth_iter.value()  if d.chk_fixed_smooth.isChecked() else None),
+            make_subset=leave_symbol,
         )
 
         moving = self._collect_layers_from_list(
@@ -540,6 +517,7 @@ class LineDisplacement:
             smooth_enabled=d.chk_move_smooth.isChecked(),
             smooth_offset=(d.spin_move_smooth_off.value() if d.chk_move_smooth.isChecked() else None),
             smooth_iter=(d.spin_move_smooth_iter.value()  if d.chk_move_smooth.isChecked() else None),
+            make_subset=leave_symbol,
         )
 
         # Ziel-CRS bestimmen
@@ -603,46 +581,122 @@ class LineDisplacement:
         # --- Insert/Append-Option aus dem GUI an die Zielebene hängen ---
         tlyr.setCustomProperty("LineDisplacement/append_new", d.radio_append.isChecked())
 
-        # Ausdruck bauen
-        target_authid = target_crs.authid() if target_crs and target_crs.isValid() else None
-        expr = build_line_displacement_call(
-            to_move_layers=moving,
-            fixed_layers=fixed,
-            target_layer_name=tlyr.name(),
-            buf_dist=d.spin_buf.value(),
-            min_repl_len=d.spin_minlen.value(),
-            pre_params=pre_params,      # unverändert
-            fin_params=fin_params,      # unverändert
-            debug_stage=dbg_key,        # << nur der Schlüssel (z. B. "pre_final")
-            log_to_desktop=d.chk_log.isChecked(),
-            target_authid=target_authid
-        )
-        _dump_expr(expr)
+        # --- Optionen (10. Argument) ---
+        options = {}
+        if d.chk_tiles.isChecked():
+            options['tiles'] = True
+            options['workers'] = d.spin_workers.value()
+        export_path = d.file_export.filePath().strip()
+        if d.chk_export.isChecked() and export_path:
+            options['export_gpkg'] = export_path
+        if d.chk_profile.isChecked():
+            options['profile'] = True
+        if d.chk_memory.isChecked():
+            options['memory'] = True
+        metrics_offset = None
+        if d.chk_metrics.isChecked():
+            options['metrics'] = _metrics_path()
+            try:
+                metrics_offset = os.path.getsize(options['metrics'])
+            except OSError:
+                metrics_offset = 0
+
+        # Verdrängungs-Abstand und ggf. weitere (ein Durchgang, je Abstand ein Objekt)
+        buf_dists = [d.spin_buf.value()]
+        for v in _parse_distances(d.edit_more_dists.text()):
+            if v not in buf_dists:
+                buf_dists.append(v)
+
+        # Ausdruck nur für den dynamischen Geometriegenerator (Symbolebene hinterlassen)
+        expr = None
+        if leave_symbol:
+            expr = build_line_displacement_call(
+                to_move_layers=moving,
+                fixed_layers=fixed,
+                target_layer_name=tlyr.name(),
+                buf_dist=buf_dists if len(buf_dists) > 1 else buf_dists[0],
+                min_repl_len=d.spin_minlen.value(),
+                pre_params=pre_params,      # unverändert
+                fin_params=fin_params,      # unverändert
+                debug_stage=dbg_key,        # << nur der Schlüssel (z. B. "pre_final")
+                log_to_desktop=d.chk_log.isChecked(),
+                target_authid=target_crs.authid() if target_crs and target_crs.isValid() else None,
+                options=options
+            )
+            _dump_expr(expr)
+
+        # Eingaben direkt aus den Ebenen lesen (Hauptthread); die Hintergrundaufgabe
+        # arbeitet danach nur noch mit diesen Geometrien
+        to_move_geom = collect_source_geometry(moving, target_crs)
+        fixed_geom = collect_source_geometry(fixed, target_crs)
+        if to_move_geom.isEmpty() or fixed_geom.isEmpty():
+            _bar(self, "warn", t("Keine Geometrien in den gewählten Ebenen.",
+                                 "No geometries in the selected layers."))
+            return
 
-        # Geometriegenerator anhängen
-        _add_geomgen_symbol(tlyr, expr)
+        import Linienverdraengung as LV
+        log_enabled = d.chk_log.isChecked()
+        with LV.log_scope(log_enabled):   # nur dieser Lauf, LOG_ENABLED bleibt unberührt
+            LV.log_init()
+
+        replace = d.radio_replace.isChecked()
+        tlyr_id = tlyr.id()
+
+        def _finished(task, ok):
+            self.task = None
+            tl = QgsProject.instance().mapLayer(tlyr_id)
+            if task.canceled:
+                _log_to_file(t("Verdrängung abgebrochen.", "Displacement canceled."))
+                _bar(self, "warn", t("Verdrängung abgebrochen – nichts geschrieben.",
+                                     "Displacement canceled – nothing written."))
+                return
+            if not ok or task.geometry is None:
+                _log_to_file(t(f"Verdrängung fehlgeschlagen: {task.error}",
+                               f"Displacement failed: {task.error}"), ld_logging.ERROR)
+                _bar(self, "warn", t("Ausgabe fehlgeschlagen.", "Output failed."))
+                return
+            if task.stage != "final":
+                # Debug-Stufen zeigen auch vorzeitig geendete Zwischenstände (wie der Ausdruck)
+                results = [r for r in task.results if r[1] is not None and not r[1].isEmpty()]
+                skipped = []
+            else:
+                # vorzeitig geendete Abstände schreiben nichts – wie Ausdruck und Stapelbetrieb
+                results, skipped = ld_core.results_to_write(task.results)
+            if skipped:
+                _log_to_file(t(f"Vorzeitig beendet, nicht geschrieben: {', '.join(f'{d:g}' for d in skipped)}.",
+                               f"Ended early, not written: {', '.join(f'{d:g}' for d in skipped)}."))
+            if not results:
+                _bar(self, "warn", t("Ergebnis leer oder vorzeitig beendet – nichts geschrieben (Details im Log).",
+                                     "Result is empty or ended early – nothing written (see log for details)."))
+                return
+            if task.stage != "final":
+                for dist, geom, _early in results:
+                    _add_stage_layer(geom, task.stage, target_crs, f" ({dist:g})" if len(task.results) > 1 else "")
+            elif tl is None or not _write_result(tl, results, replace):
+                _bar(self, "warn", t("Ausgabe fehlgeschlagen.", "Output failed."))
+                return
 
-        # Materialisieren
-        ok2 = False
-        try:
-            replace = d.radio_replace.isChecked()
-            ok2 = self._materialize(tlyr, expr, replace=replace)
-        except Exception as e:
-            _log_to_file(t(f"Fehler in _materialize(): {e}", f"_materialize() Exception: {e}"))
-            ok2 = False
-
-        if ok2:
-            def _do_cleanup():
-                try:
-                    _cleanup_geomgen(tlyr, leave_symbol=leave_symbol)
-                finally:
-                    if leave_symbol:
-                        _log_to_file(t("Skripte verbleiben (Geometriegenerator hinterlassen).", "Scripts remain (geometry generator left)."))
-                    else:
-                        ok_un, msg_un = registrar.uninstall_scripts(remove_expr=True, remove_proc=True)
-                        _log_to_file(t("Deinstallation: ", "Uninstall: ") + msg_un)
-
-            QtCore.QTimer.singleShot(500, _do_cleanup)
-            _bar(self, "ok", t("Ausgabe erstellt.", "Output created."))
-        else:
-            _bar(self, "warn", t("Ausgabe fehlgeschlagen.", "Output failed."))
+            # Geometriegenerator als abgeschaltete Symbolebene hinterlassen oder Skripte wieder entfernen
+            if leave_symbol and tl is not None:
+                _add_geomgen_symbol(tl, expr, active=False)
+                _log_to_file(t("Skripte verbleiben (Geometriegenerator hinterlassen).", "Scripts remain (geometry generator left)."))
+            elif not leave_symbol:
+                ok_un, msg_un = registrar.uninstall_scripts(remove_expr=True, remove_proc=True)
+                _log_to_file(t("Deinstallation: ", "Uninstall: ") + msg_un)
+
+            if skipped:
+                _bar(self, "info", t("Ausgabe erstellt, vorzeitig geendete Abstände nicht geschrieben (siehe Log).",
+                                     "Output created; distances that ended early were not written (see log)."))
+            else:
+                _bar(self, "ok", t("Ausgabe erstellt.", "Output created."))
+            if metrics_offset is not None:
+                self._show_metrics(options['metrics'], metrics_offset)
+
+        self.task = DisplacementTask(
+            t("Linienverdrängung", "Line displacement"),
+            to_move_geom, fixed_geom, target_crs,
+            buf_dists, d.spin_minlen.value(),
+            pre_params, fin_params, dbg_key, options, _finished, log_enabled=log_enabled)
+        QgsApplication.taskManager().addTask(self.task)
+        _bar(self, "info", t("Verdrängung läuft im Hintergrund (Taskmanager).",
+                             "Displacement is running in the background (task manager)."))
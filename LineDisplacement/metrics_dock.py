@@ -0,0 +1,65 @@
+# metrics_dock.py
+import json
+
+from qgis.PyQt import QtWidgets, QtCore
+from .i18n import t
+
+
+def read_metrics(path, offset=0):
+    """Liest JSON-Zeilen ab Byte-Position offset; defekte Zeilen werden übersprungen."""
+    records = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            f.seek(offset)
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    pass
+    except OSError:
+        pass
+    return records
+
+
+class MetricsDock(QtWidgets.QDockWidget):
+    """Andockbare Übersicht der Kennzahlen je Stufe/Phase eines Laufs."""
+
+    COLUMNS = [
+        ("source",        t("Quelle", "Source")),
+        ("stage",         t("Stufe/Phase", "Stage/phase")),
+        ("seconds",       t("Sekunden", "Seconds")),
+        ("in_parts",      t("Teile ein", "Parts in")),
+        ("in_vertices",   t("Stützpunkte ein", "Vertices in")),
+        ("out_parts",     t("Teile aus", "Parts out")),
+        ("out_vertices",  t("Stützpunkte aus", "Vertices out")),
+        ("geos_prepared", t("GEOS vorbereitet", "GEOS prepared")),
+        ("geos_plain",    t("GEOS direkt", "GEOS plain")),
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(t("Linienverdrängung – Kennzahlen", "Line Displacement – metrics"), parent)
+        self.setObjectName("LineDisplacementMetricsDock")
+        self.table = QtWidgets.QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels([label for _, label in self.COLUMNS])
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.setWidget(self.table)
+
+    def show_records(self, records):
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(records))
+        for row, rec in enumerate(records):
+            for col, (key, _) in enumerate(self.COLUMNS):
+                val = rec.get(key)
+                item = QtWidgets.QTableWidgetItem()
+                if isinstance(val, (int, float)) and not isinstance(val, bool):
+                    item.setData(QtCore.Qt.DisplayRole, val)   # numerisch sortierbar
+                else:
+                    item.setText("" if val is None else str(val))
+                self.table.setItem(row, col, item)
+        self.table.setSortingEnabled(True)
+        self.table.resizeColumnsToContents()
@@ -0,0 +1,28 @@
+# provider.py – Processing-Anbieter des Plugins
+# Stellt 'Linien verdrängen' (scripts/Linienverdraengung_algorithmus.py) in der
+# Werkzeugkiste und für qgis_process bereit, solange das Plugin geladen ist –
+# unabhängig davon, ob Skripte ins Profil kopiert wurden.
+
+import os
+
+from qgis.PyQt.QtGui import QIcon
+from qgis.core import QgsProcessingProvider
+
+from . import registrar  # noqa: F401  (nimmt den scripts-Ordner in sys.path auf)
+from .i18n import t
+
+
+class LineDisplacementProvider(QgsProcessingProvider):
+
+    def id(self):
+        return 'linedisplacement'
+
+    def name(self):
+        return t('Linienverdrängung', 'Line displacement')
+
+    def icon(self):
+        return QIcon(os.path.join(os.path.dirname(__file__), "icon.png"))
+
+    def loadAlgorithms(self):
+        from Linienverdraengung_algorithmus import LineDisplacementAlgorithm
+        self.addAlgorithm(LineDisplacementAlgorithm())
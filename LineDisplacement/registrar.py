@@ -2,6 +2,8 @@
 # Installiert / lädt die begleitenden Skripte:
 #  - Linienverdraengung.py           -> <Profil>\python\expressions\
 #  - Netzfragmente_verknuepfen.py    -> <Profil>\processing\scripts\    (ohne "python")
+# Linienverdraengung_algorithmus.py wird nicht kopiert: das Plugin registriert es
+# über seinen Processing-Anbieter (provider.py), solange es geladen ist.
 #
 # Außerdem: Sitzungsimport (sys.path-Anpassung + import), Deinstallation,
 #           sowie ein einfaches Log auf den Desktop.
@@ -9,7 +11,6 @@
 import os
 import sys
 import shutil
-from datetime import datetime
 from .i18n import t  # <-- zweisprachige Texte
 
 # ----------------- Logging auf den Desktop (gemeinsame Datei) -----------------
@@ -19,21 +20,31 @@ def set_logging_enabled(flag: bool):
     """Von außen aufgerufen (main.py), um Logging an/aus zu schalten."""
     global REG_LOG_ENABLED
     REG_LOG_ENABLED = bool(flag)
+    _LOG.enabled = REG_LOG_ENABLED
 
 def _logfile_path() -> str:
     home = os.path.expanduser("~")
     return os.path.join(home, "Desktop", "line_displacement.log")
 
-def _log(msg: str):
-    # immer in die Python-Konsole
-    print(f"[registrar] {msg}")
-    if not REG_LOG_ENABLED:
-        return
-    try:
-        with open(_logfile_path(), "a", encoding="utf-8") as f:
-            f.write(f"[registrar] {datetime.now().isoformat(timespec='seconds')}  {msg}\n")
-    except Exception:
-        pass
+# gemeinsames, gepuffertes Logging (scripts/ld_logging.py); der Ordner wird dafür
+# schon beim Laden in sys.path aufgenommen, damit Plugin und Skripte dasselbe Modul teilen
+_SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts")
+if _SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, _SCRIPTS_DIR)
+import ld_logging  # noqa: E402
+
+# immer in die Python-Konsole, in die Datei nur wenn eingeschaltet
+_LOG = ld_logging.get_logger("registrar", _logfile_path(), echo=True)
+
+def _log(msg, level=ld_logging.INFO):
+    _LOG.log(msg, level)
+
+# Module, die neben Linienverdraengung.py im expressions-Ordner liegen müssen
+EXPR_HELPERS = ("ld_logging.py", "ld_geometry.py", "ld_core.py")
+# Processing-Skripte für <Profil>\processing\scripts
+PROC_SCRIPTS = ("Netzfragmente_verknuepfen.py",)
+# früher ebenfalls kopiert; wird beim Deinstallieren noch aufgeräumt
+OLD_PROC_SCRIPTS = ("Linienverdraengung_algorithmus.py",)
 
 # ----------------- Profilpfade ermitteln -----------------
 def qgis_profile_root() -> str | None:
@@ -71,7 +82,7 @@ def install_scripts_permanent(plugin_dir: str):
     Kopiert:
       - Linienverdraengung.py           -> <Profil>\\python\\expressions\\
       - Netzfragmente_verknuepfen.py    -> <Profil>\\processing\\scripts\\    (ohne "python")
-    und lädt beide Module für die laufende Sitzung.
+    und lädt die Module für die laufende Sitzung.
     """
     try:
         root = qgis_profile_root()
@@ -87,15 +98,19 @@ def install_scripts_permanent(plugin_dir: str):
         os.makedirs(proc_dir, exist_ok=True)
 
         src_expr = os.path.join(plugin_dir, "scripts", "Linienverdraengung.py")
-        src_proc = os.path.join(plugin_dir, "scripts", "Netzfragmente_verknuepfen.py")
 
         shutil.copy2(src_expr, os.path.join(expr_dir, "Linienverdraengung.py"))
         _log(t(f"Kopiert -> {os.path.join(expr_dir, 'Linienverdraengung.py')}",
                f"copied -> {os.path.join(expr_dir, 'Linienverdraengung.py')}"))
 
-        shutil.copy2(src_proc, os.path.join(proc_dir, "Netzfragmente_verknuepfen.py"))
-        _log(t(f"Kopiert -> {os.path.join(proc_dir, 'Netzfragmente_verknuepfen.py')}",
-               f"copied -> {os.path.join(proc_dir, 'Netzfragmente_verknuepfen.py')}"))
+        # Hilfsmodule neben das Ausdrucksskript (gemeinsames Logging, Geometrie-Backends + Kern)
+        for fname in EXPR_HELPERS:
+            shutil.copy2(os.path.join(plugin_dir, "scripts", fname), os.path.join(expr_dir, fname))
+
+        for fname in PROC_SCRIPTS:
+            shutil.copy2(os.path.join(plugin_dir, "scripts", fname), os.path.join(proc_dir, fname))
+            _log(t(f"Kopiert -> {os.path.join(proc_dir, fname)}",
+                   f"copied -> {os.path.join(proc_dir, fname)}"))
 
         ok, msg = import_scripts_session(plugin_dir)
 
@@ -135,6 +150,12 @@ def import_scripts_session(plugin_dir: str):
             import Netzfragmente_verknuepfen  # noqa: F401
             _log(t("Import Netzfragmente_verknuepfen OK", "import Netzfragmente_verknuepfen OK"))
 
+        try:
+            import Linienverdraengung_algorithmus
+            importlib.reload(Linienverdraengung_algorithmus)
+        except Exception:
+            import Linienverdraengung_algorithmus  # noqa: F401
+
         return (True, t(
             "Sitzungsimport: Linienverdraengung: OK (Linienverdraengung); Netzfragmente: OK (Netzfragmente_verknuepfen)",
             "Session import: Linienverdraengung: OK (Linienverdraengung); Fragments: OK (Netzfragmente_verknuepfen)"
@@ -147,6 +168,7 @@ def uninstall_scripts(remove_expr: bool = True, remove_proc: bool = True):
     Entfernt die dauerhaft installierten Dateien soweit möglich aus den **einzigen** Zielorten:
       - Expressions: <Profil>\\python\\expressions\\Linienverdraengung.py
       - Processing : <Profil>\\processing\\scripts\\Netzfragmente_verknuepfen.py
+                     (sowie eine früher kopierte Linienverdraengung_algorithmus.py)
     """
     removed = []
     errors = []
@@ -158,22 +180,24 @@ def uninstall_scripts(remove_expr: bool = True, remove_proc: bool = True):
                              "Path detection failed."))
 
         if remove_expr:
-            expr_path = os.path.join(user_py, "expressions", "Linienverdraengung.py")
-            if os.path.isfile(expr_path):
-                try:
-                    os.remove(expr_path)
-                    removed.append(expr_path)
-                except Exception as e:
-                    errors.append(f"{expr_path}: {e}")
+            for fname in ("Linienverdraengung.py",) + EXPR_HELPERS:
+                expr_path = os.path.join(user_py, "expressions", fname)
+                if os.path.isfile(expr_path):
+                    try:
+                        os.remove(expr_path)
+                        removed.append(expr_path)
+                    except Exception as e:
+                        errors.append(f"{expr_path}: {e}")
 
         if remove_proc:
-            proc_path = os.path.join(root, "processing", "scripts", "Netzfragmente_verknuepfen.py")
-            if os.path.isfile(proc_path):
-                try:
-                    os.remove(proc_path)
-                    removed.append(proc_path)
-                except Exception as e:
-                    errors.append(f"{proc_path}: {e}")
+            for fname in PROC_SCRIPTS + OLD_PROC_SCRIPTS:
+                proc_path = os.path.join(root, "processing", "scripts", fname)
+                if os.path.isfile(proc_path):
+                    try:
+                        os.remove(proc_path)
+                        removed.append(proc_path)
+                    except Exception as e:
+                        errors.append(f"{proc_path}: {e}")
 
         ok = (len(errors) == 0)
         if removed:
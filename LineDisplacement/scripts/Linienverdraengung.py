@@ -2,13 +2,25 @@
 # Linienverdraengung.py – eigenständig nutzbar, mit zweisprachigem Logging
 
 import os
+import sys
+import hashlib
+import json
+import math
+import threading
+import time
 import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from qgis.core import (
     QgsProject,
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCoordinateTransformContext,
     QgsGeometry,
-    QgsPointXY,
     QgsFeature,
+    QgsFeatureRequest,
+    QgsProcessingFeedback,
 )
 from qgis.utils import qgsfunction
 from qgis.PyQt.QtCore import QSettings  # für Sprachwahl
@@ -30,25 +42,158 @@ def t(de: str, en: str) -> str:
 # ------------------------------
 LOGFILE = os.path.join(os.path.expanduser("~"), "Desktop", "line_displacement.log")
 LOG_ENABLED = False   # Default: aus; Plugin schaltet per Funktionsparameter ein
+LOG_DEBUG, LOG_INFO, LOG_WARNING, LOG_ERROR = 10, 20, 30, 40
+LOG_LEVEL = LOG_INFO  # Meldungen unter diesem Level werden verworfen
 
-def log_init():
-    if not LOG_ENABLED:
+try:  # gemeinsames, gepuffertes Logging (Hintergrund-Thread); fehlt es, wird direkt geschrieben
+    import ld_logging
+except ImportError:
+    try:
+        from . import ld_logging   # als expressions.Linienverdraengung geladen
+    except ImportError:
+        ld_logging = None
+
+try:  # Geometrie-Backends (Option 'backend') und Bausteine der Schritte, liegen neben diesem Skript
+    import ld_geometry
+    import ld_core
+except ImportError:
+    from . import ld_geometry, ld_core
+
+def _log_write(msg: str):
+    line = f"[line_displacement] {datetime.now():%Y-%m-%d %H:%M:%S}  {msg}\n"
+    if ld_logging is not None:
+        ld_logging.write(LOGFILE, line)   # wartet nie; bei voller Warteschlange verworfen und gezählt
         return
     try:
         with open(LOGFILE, "a", encoding="utf-8") as f:
-            f.write(f"[line_displacement] {datetime.now():%Y-%m-%d %H:%M:%S}  "
-                    f"{t('*** Neuer Lauf gestartet ***', '*** New run started ***')}\n")
+            f.write(line)
     except Exception:
         pass
 
-def log(msg: str):
-    if not LOG_ENABLED:
+_LOG_LOCAL = threading.local()   # je Thread: Log-Schalter des laufenden Aufrufs (siehe log_scope)
+
+def _log_enabled() -> bool:
+    return getattr(_LOG_LOCAL, "enabled", LOG_ENABLED)
+
+@contextmanager
+def log_scope(enabled):
+    """
+    Schaltet das Log nur für den laufenden Thread und die Dauer des Aufrufs
+    (statt LOG_ENABLED zu ändern); parallele Auswertungen stören sich so nicht.
+    """
+    prev = getattr(_LOG_LOCAL, "enabled", None)
+    _LOG_LOCAL.enabled = bool(enabled)
+    try:
+        yield
+    finally:
+        if prev is None:
+            del _LOG_LOCAL.enabled
+        else:
+            _LOG_LOCAL.enabled = prev
+
+def log_init():
+    if not _log_enabled():
+        return
+    _log_write(t('*** Neuer Lauf gestartet ***', '*** New run started ***'))
+
+def log(msg, level=LOG_INFO):
+    """
+    msg darf eine Funktion ohne Argumente sein (z. B. lambda: t(f"…", f"…")); sie wird
+    nur aufgerufen, wenn tatsächlich geschrieben wird.
+    """
+    if not _log_enabled() or level < LOG_LEVEL:
+        return
+    if callable(msg):
+        msg = msg()
+    _log_write(msg)
+
+
+# ------------------------------
+# Kennzahlen je Stufe (JSON-Zeilen)
+# ------------------------------
+METRICSFILE = os.path.join(os.path.expanduser("~"), "Desktop", "line_displacement_metrics.jsonl")
+
+
+def _metrics_target(val) -> str:
+    """Option 'metrics': Pfad der JSON-Zeilen-Datei, True für METRICSFILE, sonst aus ('')."""
+    if val is None or val is False or val == "":
+        return ""
+    if isinstance(val, str) and val.lower() not in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+        return val
+    return METRICSFILE if _flag(val) else ""
+
+
+def _geom_size(val):
+    """(Teile, Stützpunkte) einer Geometrie bzw. einer (verschachtelten) Liste davon."""
+    if isinstance(val, QgsGeometry):
+        if val.isNull():
+            return 0, 0
+        g = val.constGet()
+        try:
+            parts = g.partCount()
+        except Exception:
+            parts = 1
+        return parts, g.nCoordinates()
+    if ld_geometry.shapely is not None and isinstance(val, ld_geometry.shapely.Geometry):
+        return (int(ld_geometry.shapely.get_num_geometries(val)),
+                int(ld_geometry.shapely.get_num_coordinates(val)))
+    if isinstance(val, (list, tuple)):
+        parts = verts = 0
+        for v in val:
+            p, n = _geom_size(v)
+            parts += p
+            verts += n
+        return parts, verts
+    return 0, 0
+
+
+def _write_metrics(path, records):
+    """Hängt Kennzahl-Datensätze als JSON-Zeilen an."""
+    if not path or not records:
         return
     try:
-        with open(LOGFILE, "a", encoding="utf-8") as f:
-            f.write(f"[line_displacement] {datetime.now():%Y-%m-%d %H:%M:%S}  {msg}\n")
-    except Exception:
+        with open(path, "a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    except Exception as e:
+        log(t(f"Kennzahlen nicht geschrieben: {e}", f"Metrics not written: {e}"))
+
+
+# ------------------------------
+# Speicher je Stufe (tracemalloc + Prozess-RSS)
+# ------------------------------
+MEMORY_TOP_N = 5   # so viele größte Zwischengeometrien (nach Stützpunkten) ins Log
+
+
+def _rss_bytes():
+    """Aktueller Arbeitsspeicher (RSS) des Prozesses in Byte, sonst None (ld_logging.rss_bytes)."""
+    return ld_logging.rss_bytes() if ld_logging is not None else None
+
+
+def _mem_begin():
+    """Startpunkt einer Speichermessung: (Python-Allokation, RSS). Startet tracemalloc bei Bedarf."""
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()   # ab Python 3.9
+    except AttributeError:
         pass
+    return tracemalloc.get_traced_memory()[0], _rss_bytes()
+
+
+def _mem_end(mem0):
+    """(Python-Spitze über dem Start, RSS-Differenz) seit _mem_begin; RSS-Differenz ggf. None.
+    GEOS-Speicher erscheint nur in der RSS-Differenz, nicht in der Python-Spitze."""
+    import tracemalloc
+    py0, rss0 = mem0
+    peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else py0
+    rss1 = _rss_bytes()
+    return max(peak - py0, 0), (rss1 - rss0 if rss0 is not None and rss1 is not None else None)
+
+
+def _mb(n) -> str:
+    return "–" if n is None else f"{n / 1048576.0:.1f} MB"
 
 
 # ------------------------------
@@ -78,97 +223,14 @@ def summarize_source(src):
         return str(src)
 
 
-def substring_by_distance(geom, start_dist, end_dist, tol=1e-9):
-    """Fallback für lineSubstring: extrahiert Abschnitt entlang einer einfachen Linie."""
-    if geom.isMultipart():
-        return QgsGeometry()
-    pts = geom.asPolyline()
-    if not pts:
-        return QgsGeometry()
-    seg_lens = [((pts[i+1].x() - pts[i].x())**2 + (pts[i+1].y() - pts[i].y())**2)**0.5 for i in range(len(pts)-1)]
-    cum = [0.0]
-    for L in seg_lens:
-        cum.append(cum[-1] + L)
-    total_len = cum[-1]
-    d1 = max(0.0, min(start_dist, total_len))
-    d2 = max(0.0, min(end_dist, total_len))
-    if d2 < d1:
-        d1, d2 = d2, d1
-
-    def interp(d):
-        for i, L in enumerate(seg_lens):
-            if cum[i] <= d <= cum[i+1] + tol:
-                if L < tol:
-                    return pts[i]
-                t_ = (d - cum[i]) / L
-                x = pts[i].x() + t_ * (pts[i+1].x() - pts[i].x())
-                y = pts[i].y() + t_ * (pts[i+1].y() - pts[i].y())
-                return QgsPointXY(x, y)
-        return pts[-1]
-
-    p1 = interp(d1)
-    p2 = interp(d2)
-    segment_pts = [p1]
-    for j in range(1, len(cum)-1):
-        if cum[j] > d1 + tol and cum[j] < d2 - tol:
-            segment_pts.append(pts[j])
-    segment_pts.append(p2)
-    return QgsGeometry.fromPolylineXY(segment_pts)
-
-
-def split_boundary_at_endpoints(boundary_geom: QgsGeometry, line_geoms, tol=1e-9):
+def split_boundary_at_endpoints(boundary_geom: QgsGeometry, line_geoms, tol=1e-9, geo=None):
     """
     Zerschneidet boundary_geom dort, wo line_geoms mit ihren Start-/Endpunkten
-    an die Kontur projizieren.
-    """
-    pts = []
-    for g in line_geoms:
-        if g.isMultipart():
-            for part in g.asMultiPolyline():
-                if len(part) >= 1:
-                    pts.append(QgsPointXY(part[0]))
-                    pts.append(QgsPointXY(part[-1]))
-        else:
-            line = g.asPolyline()
-            if len(line) >= 1:
-                pts.append(QgsPointXY(line[0]))
-                pts.append(QgsPointXY(line[-1]))
-
-    if boundary_geom.isMultipart():
-        all_pts = []
-        for part in boundary_geom.asMultiPolyline():
-            all_pts += part
-        flat_boundary = QgsGeometry.fromPolylineXY(all_pts)
-    else:
-        flat_boundary = boundary_geom
-
-    total_len = flat_boundary.length()
-    if total_len == 0:
-        return [flat_boundary]
-
-    dists = [0.0, total_len]
-    for p in pts:
-        d = flat_boundary.lineLocatePoint(QgsGeometry.fromPointXY(p))
-        if d is None:
-            continue
-        d = max(0.0, min(d, total_len))
-        dists.append(d)
-    dists = sorted(set([round(d, 9) for d in dists]))
-
-    segments = []
-    for i in range(len(dists) - 1):
-        d1, d2 = dists[i], dists[i+1]
-        if d2 - d1 < tol:
-            continue
-        if hasattr(flat_boundary, "lineSubstring"):
-            seg = flat_boundary.lineSubstring(d1, d2)
-        else:
-            seg = substring_by_distance(flat_boundary, d1, d2)
-        if seg and not seg.isEmpty():
-            segments.append(seg)
-    if not segments:
-        return [flat_boundary]
-    return segments
+    an die Kontur projizieren (siehe ld_core.split_boundary_at_endpoints).
+    geo: Geometrie-Backend der Eingaben; ohne Angabe QgsGeometry.
+    """
+    geo = geo if geo is not None else ld_geometry.get_backend("qgis")
+    return ld_core.split_boundary_at_endpoints(geo, boundary_geom, line_geoms, tol)
 
 
 # ------------------------------
@@ -183,16 +245,20 @@ def _merge_by_direction(
         simplify_value=None,   # SIMPLIFY_TOL (float)
         max_iters=None,        # MAX_ITERS (int)
         split_at_nodes=None,   # SPLIT_AT_NODES (bool)
-        even_only=None         # EVEN_ONLY (bool)
+        even_only=None,        # EVEN_ONLY (bool)
+        metrics_file=None,     # METRICS_FILE (JSON-Zeilen je Phase, optional)
+        trace_memory=False,    # TRACE_MEMORY (Speicher je Phase messen)
+        feedback=None          # Fortschritt/Abbruch (QgsProcessingFeedback), optional
     ):
     """
     Führt 'Netzfragmente_verknuepfen' aus und gibt die vereinheitlichte
-    Liniengeometrie (UnaryUnion) zurück, sonst None.
+    Liniengeometrie (UnaryUnion) zurück, sonst None. Wird feedback dabei
+    abgebrochen, endet der Aufruf mit DisplacementCanceled.
     """
     try:
         from qgis.core import (
             QgsVectorLayer, QgsFeature,
-            QgsProcessingContext, QgsProcessingFeedback, QgsFeatureRequest
+            QgsProcessingContext, QgsFeatureRequest
         )
 
         # Quelle bestimmen
@@ -222,23 +288,24 @@ def _merge_by_direction(
                 pass
 
         if src_layer is None:
-            logfunc(t("MergeByDirection: Keine gültige Quelle; übersprungen.",
-                      "MergeByDirection: No valid source; skipped."))
+            logfunc(lambda: t("MergeByDirection: Keine gültige Quelle; übersprungen.",
+                              "MergeByDirection: No valid source; skipped."))
             return None
 
-        # Parameter (mit Defaults)
+        # Parameter (mit Defaults aus ld_core.MERGE_DEFAULTS)
+        d_tol, d_ang, d_simpl, _d_iters, d_split, d_even = ld_core.MERGE_DEFAULTS
         try:
-            TOLERANCE    = float(tol_value)      if tol_value      is not None else 0.01
+            TOLERANCE    = float(tol_value)      if tol_value      is not None else d_tol
         except Exception:
-            TOLERANCE    = 0.01
+            TOLERANCE    = d_tol
         try:
-            ANGLE_TOL    = float(angle_value)    if angle_value    is not None else 90.0
+            ANGLE_TOL    = float(angle_value)    if angle_value    is not None else d_ang
         except Exception:
-            ANGLE_TOL    = 90.0
+            ANGLE_TOL    = d_ang
         try:
-            SIMPLIFY_TOL = float(simplify_value) if simplify_value is not None else 0.3
+            SIMPLIFY_TOL = float(simplify_value) if simplify_value is not None else d_simpl
         except Exception:
-            SIMPLIFY_TOL = 0.3
+            SIMPLIFY_TOL = d_simpl
         try:
             MAX_ITERS    = int(max_iters)        if max_iters      is not None else 0
         except Exception:
@@ -246,12 +313,12 @@ def _merge_by_direction(
         if MAX_ITERS < 0:
             MAX_ITERS = 0
         if MAX_ITERS < 1:
-            logfunc(t("MergeByDirection: MAX_ITERS < 1 → übersprungen.",
-                      "MergeByDirection: MAX_ITERS < 1 → skipped."))
+            logfunc(lambda: t("MergeByDirection: MAX_ITERS < 1 → übersprungen.",
+                              "MergeByDirection: MAX_ITERS < 1 → skipped."))
             return None
 
-        SPLIT_AT_NODES = bool(split_at_nodes) if split_at_nodes is not None else False
-        EVEN_ONLY      = bool(even_only)      if even_only      is not None else False
+        SPLIT_AT_NODES = bool(split_at_nodes) if split_at_nodes is not None else d_split
+        EVEN_ONLY      = bool(even_only)      if even_only      is not None else d_even
 
         common_params = {
             'INPUT': src_layer,
@@ -268,15 +335,19 @@ def _merge_by_direction(
             'WRITE_LOG': False,
             'OUTPUT': 'memory:'
         }
+        if metrics_file:
+            common_params['METRICS_FILE'] = str(metrics_file)
+        if trace_memory:
+            common_params['TRACE_MEMORY'] = True
 
         out_layer = None
 
         try:
             from Netzfragmente_verknuepfen import MergeLinesByDirection
-            alg = MergeLinesByDirection()
+            # create() legt die Parameterdefinitionen an; headless: ohne iface (Worker-/Renderthread)
+            alg = MergeLinesByDirection().create({'headless': True})
             params = {
                 alg.INPUT:           common_params['INPUT'],
-                alg.INPUTS:          common_params['INPUTS'],
                 alg.FILTER:          common_params['FILTER'],
                 alg.TOLERANCE:       common_params['TOLERANCE'],
                 alg.ANGLE_TOL:       common_params['ANGLE_TOL'],
@@ -289,8 +360,12 @@ def _merge_by_direction(
                 alg.WRITE_LOG:       common_params['WRITE_LOG'],
                 alg.OUTPUT:          common_params['OUTPUT'],
             }
+            if metrics_file and hasattr(alg, "METRICS_FILE"):
+                params[alg.METRICS_FILE] = common_params['METRICS_FILE']
+            if trace_memory and hasattr(alg, "TRACE_MEMORY"):
+                params[alg.TRACE_MEMORY] = True
             ctx = QgsProcessingContext()
-            fdb = QgsProcessingFeedback()
+            fdb = feedback if feedback is not None else QgsProcessingFeedback()
             results = alg.processAlgorithm(params, ctx, fdb)
             dest_id = results.get(alg.OUTPUT)
             if dest_id:
@@ -299,13 +374,15 @@ def _merge_by_direction(
             # Rückfall: Processing-Algorithmus
             try:
                 from qgis import processing
-                res = processing.run("script:merge_lines_by_direction", common_params)
+                res = processing.run("script:merge_lines_by_direction", common_params, feedback=feedback)
                 out_layer = res.get('OUTPUT')
             except Exception as e2:
                 logfunc(t(f"MergeByDirection nicht verfügbar (Klasse/Processing): {e1} / {e2}",
                           f"MergeByDirection not available (class/processing): {e1} / {e2}"))
                 out_layer = None
 
+        if feedback is not None and feedback.isCanceled():
+            raise DisplacementCanceled("merge_lines_by_direction")
         if out_layer is None:
             return None
 
@@ -318,401 +395,1862 @@ def _merge_by_direction(
             return None
         return QgsGeometry.unaryUnion(geoms)
 
+    except DisplacementCanceled:
+        raise
     except Exception as e:
         logfunc(t(f"MergeByDirection fehlgeschlagen: {e}",
-                  f"MergeByDirection failed: {e}"))
+                  f"MergeByDirection failed: {e}"), LOG_ERROR)
         return None
 
 
-@qgsfunction(
-    args="auto",
-    group=t("Kartografie", "Cartography"),  # Anzeigegruppe im Funktionseditor
-    register=True
-)
-def line_displacement(
-    to_move_src,            # 1
-    fixed_src,              # 2
-    target_layer_name,      # 3
-    buf_dist,               # 4
-    min_repl_len,           # 5
-    pre_params,             # 6
-    final_params,           # 7
-    debug_stage,            # 8
-    log_to_desktop,         # 9
-    feature, parent
-):
-    global LOG_ENABLED
-    LOG_ENABLED = bool(log_to_desktop)
+# ------------------------------
+# Hilfen für Optionen und Flags
+# ------------------------------
+def _flag(val) -> bool:
+    """Wahrheitswert aus Ausdrucks-/Einstellungswerten (bool, Zahl oder Text)."""
+    if isinstance(val, bool):
+        return val
+    return str(val).lower() in ("1", "true", "yes", "on")
+
+
+# Standardwerte des optionalen 10. Arguments (map) von line_displacement
+DEFAULT_OPTIONS = {
+    'tiles': False,               # Kachelmodus (Quadtree + Prozess-Pool)
+    'workers': 0,                 # Anzahl Prozesse; 0 = automatisch (Kerne − 1)
+    'tile_max_vertices': 20000,   # Stützpunkte je Kachel, ab denen weiter geteilt wird
+    'tile_overlap': None,         # Überlappung der Kacheln; None = 10 × Verdrängungs-Abstand
+    'fixed_strategy': 'auto',     # Puffer um bleibend: 'union', 'indexed' oder 'auto' (nach Größe)
+    'prefilter': True,            # weit entfernte weichende Teile direkt durchreichen
+    'export_gpkg': '',            # Pfad: alle Zwischenstufen eines Laufs als Ebenen in ein GeoPackage
+    'metrics': False,             # Kennzahlen je Stufe als JSON-Zeilen (True = METRICSFILE oder Pfad)
+    'profile': False,             # gesamte Auswertung unter cProfile; .prof neben der Logdatei
+    'profile_top': 25,            # so viele Funktionen des Profils ins Log
+    'memory': False,              # Python-Spitze (tracemalloc) und RSS-Differenz je Stufe messen
+    'backend': 'qgis',            # Geometrie-Backend der Schritte 3–15: 'qgis' (QgsGeometry), 'shapely' oder 'auto'
+    'render_safe': False,         # threadsicher zeichnen: kein Projektzugriff, kein Schreiben (siehe snapshot_layer)
+    'crs': '',                    # KBS (authid) für render_safe, wenn beide Quellen Geometrien sind
+    'extent': False,              # dynamisch: nur den sichtbaren Kartenausschnitt (+ Rand) verdrängen, nie schreiben
+    'extent_margin': None,        # Rand um den Ausschnitt bzw. jede Kachel; None = Verdrängungs-Abstand
+    'extent_tiles': True,         # 'extent' auf festem Kachelraster je Maßstabsband rechnen und Kacheln merken
+}
+
+
+def _read_options(opt_any) -> dict:
+    """Liest das optionale Options-Argument (map) und ergänzt Standardwerte."""
+    opts = dict(DEFAULT_OPTIONS)
+    if isinstance(opt_any, dict):
+        for k, v in opt_any.items():
+            opts[str(k)] = v
+    return opts
+
+
+def _backend_name(option) -> str:
+    """'shapely', wenn angefordert und Shapely 2 verfügbar ist, sonst 'qgis'."""
+    name = str(option or "qgis").lower()
+    if name == "auto":
+        name = "shapely" if ld_geometry.shapely is not None else "qgis"
+    if name == "qgis":
+        return name
+    if name == "shapely" and ld_geometry.shapely is not None:
+        return name
+    log(lambda: t(f"Geometrie-Backend '{name}' nicht verfügbar (Shapely 2 fehlt) – nutze QGIS.",
+                  f"Geometry backend '{name}' not available (Shapely 2 missing) – using QGIS."),
+        LOG_WARNING)
+    return "qgis"
+
+
+def _collect(geoms):
+    return QgsGeometry.collectGeometry(geoms) if geoms else QgsGeometry()
+
+
+# ------------------------------
+# Stufen-Graph: benannte Stufen mit Abhängigkeiten (lazy + memoisiert)
+# ------------------------------
+_STAGES = {}
+STAGE_ALIASES = {'loops_buffer': 'buffer_blobs'}
+PIPELINE_CACHE_SIZE = 4                   # so viele Parameterkombinationen bleiben im Speicher
+PIPELINE_CACHE_MAX_VERTICES = 5_000_000   # … solange ihre Zwischenergebnisse zusammen nicht mehr Stützpunkte haben
+RESULT_CACHE_SIZE = 16                    # gemerkte Endergebnisse (je Eingabestand, Debug-Stufe und Zielebene)
+RESULT_CACHE_MAX_VERTICES = 2_000_000     # … höchstens so viele Stützpunkte zusammen
+TILE_CACHE_SIZE = 512                     # gemerkte Kacheln des dynamischen Modus ('extent_tiles')
+TILE_CACHE_MAX_VERTICES = 4_000_000       # … höchstens so viele Stützpunkte zusammen
+DISTANCE_SHARED_STAGES = ("union_to_move", "fixed_input", "union_fixed", "fixed_strategy")   # abstandsunabhängig (mehrere Abstände)
+TILE_GRID_PER_VIEW = 2                    # Kachelgröße: kleinste Zweierpotenz ≥ Ausschnitt / so viele
+CANCEL_CHUNK = 256                        # Geometrien je Massenaufruf des Backends zwischen zwei Abbruchprüfungen
+_NON_GEOMETRY_OPTIONS = {'workers', 'export_gpkg', 'metrics', 'profile', 'profile_top', 'memory', 'render_safe', 'crs',
+                         'extent', 'extent_margin', 'extent_tiles'}     # Optionen ohne Einfluss auf das Ergebnis (nicht im Schlüssel)
+
+
+def _stage(name, *deps):
+    """Registriert fn(pipe, *Abhängigkeiten) als Stufe 'name'."""
+    def deco(fn):
+        _STAGES[name] = (deps, fn)
+        return fn
+    return deco
+
+
+class _EarlyResult(Exception):
+    """Eine Stufe beendet die Verarbeitung vorzeitig; value ist das Ergebnis (z. B. nur der Rest)."""
 
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+class DisplacementCanceled(Exception):
+    """Der Lauf wurde über das Feedback-Objekt der Pipeline abgebrochen (zwischen zwei Stufen)."""
+
+
+class _StageFeedback(QgsProcessingFeedback):
     """
-    Verdrängt eine zu verschiebende (to_move) Liniengeometrie von einer bleibenden (fixed) Geometrie.
+    Feedback für einen Teilschritt: Abbruch kommt vom übergeordneten Feedback,
+    der Fortschritt (0–100) wird in dessen Spanne lo…hi umgerechnet.
     """
 
-    try:
-        # Projekt & Debug
-        project = QgsProject.instance()
-        dbg = str(debug_stage) if debug_stage is not None else ""
+    def __init__(self, parent, lo, hi):
+        super().__init__()
+        self._parent, self._lo, self._hi = parent, lo, hi
 
-        # Zielebene holen – Sichtbarkeit immer erforderlich; Editierbarkeit nur für finalen Modus
-        target_layers = project.mapLayersByName(target_layer_name)
-        if not target_layers:
-            return QgsGeometry()
-        target_layer = target_layers[0]
-        node = project.layerTreeRoot().findLayer(target_layer.id())
-        if node is None or not node.isVisible():
-            return QgsGeometry()
-        # Editierbarkeit nur verlangen, wenn NICHT im 'pre_final'-Debugmodus
-        if dbg != "pre_final" and not target_layer.isEditable():
-            return QgsGeometry()
+    def isCanceled(self):
+        return self._parent.isCanceled()
 
-        # Log neu starten
-        log_init()
-        log(t(
-            f"--- line_displacement: weichend={summarize_source(to_move_src)}, bleibend={summarize_source(fixed_src)}, "
-            f"buf={buf_dist}, min_repl_len={min_repl_len}, ziel='{target_layer_name}', debug='{dbg}' ---",
-            f"--- line_displacement: to_move={summarize_source(to_move_src)}, fixed={summarize_source(fixed_src)}, "
-            f"buf={buf_dist}, min_repl_len={min_repl_len}, target='{target_layer_name}', debug='{dbg}' ---"
-        ))
-
-        # 0) Parameterbündel auslesen
-        def _read_params(seq_any):
-            t0=a=s=i=sn=eo=None
+    def setProgress(self, progress):
+        self._parent.setProgress(self._lo + (self._hi - self._lo) * float(progress) / 100.0)
+
+
+class _DisplacementPipeline:
+    """
+    Berechnet Stufen erst auf Anfrage und merkt sich jedes Zwischenergebnis.
+    Eine Stufe zieht nur ihre Abhängigkeiten nach; ein vorzeitiges Ende
+    (_EarlyResult) wird ebenfalls gemerkt und bei erneuter Anfrage wiederholt.
+    inputs belegt Stufen vorab (z. B. in den Kachel-Prozessen).
+    feedback (QgsFeedback o. Ä.) erhält den Fortschritt je Stufe; ist es
+    abgebrochen, endet der Lauf vor der nächsten Stufe mit DisplacementCanceled.
+    Die Schritte 3–15 rechnen über das Geometrie-Backend geo (Option 'backend');
+    Quellen, Vorverknüpfung und Schlussverknüpfung bleiben QgsGeometry.
+    """
+
+    def __init__(self, buf_dist, min_repl_len, to_move_src=None, fixed_src=None,
+                 pre_params=None, final_params=None, options=None, project=None, inputs=None):
+        self.buf_dist = buf_dist
+        self.min_repl_len = min_repl_len
+        self.to_move_src = to_move_src
+        self.fixed_src = fixed_src
+        self.pre = ld_core.read_params(pre_params)
+        self.fin = ld_core.read_params(final_params)
+        self.options = options if options is not None else dict(DEFAULT_OPTIONS)
+        self.project = project
+        self.backend = _backend_name(self.options.get('backend'))
+        self.geo = ld_geometry.get_backend(self.backend)   # zählt auch die (vorbereiteten) GEOS-Aufrufe
+        self.aliases = dict(STAGE_ALIASES)
+        if _flag(self.options.get('tiles')):
+            self.aliases['pre_final'] = 'pre_final_tiled'   # Kachelmodus ersetzt Schritte 3–15
+        self.evaluated = []
+        self.timings = {}      # Stufe → Sekunden (nur die Stufe selbst, ohne Abhängigkeiten)
+        self.exported = set()  # GeoPackage-Pfade, in die dieser Lauf schon geschrieben wurde
+        self.metrics = None    # Liste → Kennzahlen neu berechneter Stufen werden gesammelt
+        self.metrics_file = None
+        self.run_id = ""
+        self.memtrace = False  # True → Python-Spitze und RSS-Differenz je Stufe messen
+        self.memory = {}       # Stufe → (Python-Spitze, RSS-Differenz) in Byte
+        self.feedback = None   # Fortschritt und Abbruch (QgsFeedback/QgsProcessingFeedback)
+        self._planned = ()     # Stufen, die die angefragte Stufe braucht (für den Fortschritt)
+        self._memo = dict(inputs or {})
+
+    def get(self, name):
+        name = self.aliases.get(name, name)
+        if name in self._memo:
+            val = self._memo[name]
+            if isinstance(val, _EarlyResult):
+                raise val
+            return val
+        deps, fn = _STAGES[name]
+        args = [self.get(d) for d in deps]
+        self._check_canceled(name)
+        geos0 = (self.geo.prepared_calls, self.geo.plain_calls)
+        mem0 = _mem_begin() if self.memtrace else None
+        t0 = time.perf_counter()
+        try:
+            val = fn(self, *args)
+        except _EarlyResult as e:
+            self.timings[name] = time.perf_counter() - t0
+            self._memo[name] = e
+            self._measured(name, mem0)
+            self._record(name, args, e.value, geos0, early=True)
+            raise
+        self.timings[name] = time.perf_counter() - t0
+        self._measured(name, mem0)
+        self._record(name, args, val, geos0)
+        self._memo[name] = val
+        self.evaluated.append(name)
+        self._report_progress()
+        return val
+
+    def check_canceled(self, name=""):
+        """In längeren Schleifen einer Stufe aufrufen: bricht ab, wenn das Feedback abgebrochen ist."""
+        if self.feedback is not None and self.feedback.isCanceled():
+            raise DisplacementCanceled(name)
+
+    def _check_canceled(self, name):
+        self.check_canceled(name)
+        if self.feedback is not None and hasattr(self.feedback, "setProgressText"):
+            self.feedback.setProgressText(t(f"Stufe '{name}' …", f"Stage '{name}' …"))
+
+    def _progress_done(self) -> float:
+        if not self._planned:
+            return 0.0
+        return 100.0 * sum(1 for n in self._planned if n in self._memo) / len(self._planned)
+
+    def _report_progress(self):
+        if self.feedback is not None and self._planned:
+            self.feedback.setProgress(self._progress_done())
+
+    def stage_feedback(self):
+        """Feedback für einen Teilschritt der laufenden Stufe (z. B. Netzverknüpfung) oder None."""
+        if self.feedback is None:
+            return None
+        lo = self._progress_done()
+        hi = min(100.0, lo + 100.0 / max(len(self._planned), 1))
+        return _StageFeedback(self.feedback, lo, hi)
+
+    def _measured(self, name, mem0):
+        if mem0 is None:
+            return
+        py_peak, rss_delta = _mem_end(mem0)
+        self.memory[name] = (py_peak, rss_delta)
+        log(lambda: t(f"Speicher '{name}': Python-Spitze {_mb(py_peak)}, RSS Δ {_mb(rss_delta)}",
+                      f"Memory '{name}': Python peak {_mb(py_peak)}, RSS Δ {_mb(rss_delta)}"))
+
+    def shared_inputs(self) -> dict:
+        """Gemerkte abstandsunabhängige Stufen, als inputs für eine Pipeline mit kleinerem Abstand."""
+        return {n: self._memo[n] for n in DISTANCE_SHARED_STAGES if n in self._memo}
+
+    def vertices(self) -> int:
+        """Stützpunkte aller gemerkten Zwischenergebnisse (für die Speichergrenze des Caches)."""
+        vals = list(self._memo.values())   # Kopie: eine andere Auswertung kann die Pipeline gerade füllen
+        return _geom_size([v.value if isinstance(v, _EarlyResult) else v for v in vals])[1]
+
+    def largest(self, n=MEMORY_TOP_N):
+        """Die n größten gemerkten Zwischenergebnisse als (Stufe, Teile, Stützpunkte)."""
+        sizes = []
+        for name, val in self._memo.items():
+            if isinstance(val, _EarlyResult):
+                continue
+            parts, verts = _geom_size(val)
+            if verts:
+                sizes.append((name, parts, verts))
+        sizes.sort(key=lambda x: x[2], reverse=True)
+        return sizes[:n]
+
+    def _record(self, name, args, val, geos0, early=False):
+        if self.metrics is None:
+            return
+        in_parts, in_verts = _geom_size(list(args))
+        out_parts, out_verts = _geom_size(val)
+        rec = {
+            "source": "line_displacement",
+            "run": self.run_id,
+            "stage": name,
+            "seconds": round(self.timings.get(name, 0.0), 6),
+            "in_parts": in_parts,
+            "in_vertices": in_verts,
+            "out_parts": out_parts,
+            "out_vertices": out_verts,
+            "geos_prepared": self.geo.prepared_calls - geos0[0],
+            "geos_plain": self.geo.plain_calls - geos0[1],
+            "early": early,
+        }
+        if name in self.memory:
+            rec["py_peak_bytes"], rec["rss_delta_bytes"] = self.memory[name]
+        self.metrics.append(rec)
+
+    def result(self, name):
+        """(Geometrie, vorzeitig) einer Stufe; Listen werden zu einer Sammlung zusammengefasst."""
+        self._planned = self.closure(name)
+        try:
+            val = self.get(name)
+        except _EarlyResult as e:
+            return self.to_qgs(e.value), True
+        if isinstance(val, list):
+            val = _collect(self.to_qgs(val))
+        return (self.to_qgs(val) if val is not None else QgsGeometry()), False
+
+    def to_geo(self, geom):
+        """QgsGeometry (oder Liste davon) als Geometrie des Backends."""
+        if self.backend == "qgis" or not isinstance(geom, (QgsGeometry, list)):
+            return geom
+        if isinstance(geom, list):
+            return [self.to_geo(g) for g in geom]
+        return self.geo.from_wkb(bytes(geom.asWkb()) if not geom.isEmpty() else b"")
+
+    def to_qgs(self, geom):
+        """Geometrie des Backends (oder Liste davon) als QgsGeometry; andere Werte unverändert."""
+        if self.backend == "qgis" or isinstance(geom, QgsGeometry):
+            return geom
+        if isinstance(geom, list):
+            return [self.to_qgs(g) for g in geom]
+        if ld_geometry.shapely is not None and isinstance(geom, ld_geometry.shapely.Geometry):
+            return _geom_from_wkb(self.geo.to_wkb(geom))
+        return geom
+
+    def geos_summary(self) -> str:
+        """Logzeile: wie viele Prädikate/Overlays über vorbereitete Geometrien liefen (nur Prädikate können das)."""
+        prepared, total = self.geo.prepared_calls, self.geo.prepared_calls + self.geo.plain_calls
+        return t(f"Prädikate/Overlays ({self.geo.name}): {prepared} von {total} über vorbereitete Geometrien.",
+                 f"Predicates/overlays ({self.geo.name}): {prepared} of {total} via prepared geometries.")
+
+    def closure(self, name) -> set:
+        """Die Stufe samt aller (transitiven) Abhängigkeiten, Aliase aufgelöst."""
+        seen, stack = set(), [name]
+        while stack:
+            n = stack.pop()
+            n = self.aliases.get(n, n)
+            if n in seen or n not in _STAGES:
+                continue
+            seen.add(n)
+            stack.extend(_STAGES[n][0])
+        return seen
+
+    def cumulative_time(self, name) -> float:
+        """Sekunden der Stufe einschließlich aller (transitiven) Abhängigkeiten."""
+        return sum(self.timings.get(n, 0.0) for n in self.closure(name))
+
+
+_LAYER_REVISIONS = {}
+
+def _layer_revision(layer) -> int:
+    """Zähler, der bei jeder Daten- oder Geometrieänderung der Ebene hochgezählt wird."""
+    lid = layer.id()
+    if lid not in _LAYER_REVISIONS:
+        _LAYER_REVISIONS[lid] = 0
+
+        def bump(*_args, lid=lid):
+            _LAYER_REVISIONS[lid] = _LAYER_REVISIONS.get(lid, 0) + 1
+            _drop_source_entries("layer", lid)
+
+        for sig in ("dataChanged", "geometryChanged", "featureAdded", "featureDeleted"):
             try:
-                seq=list(seq_any) if seq_any is not None else []
+                getattr(layer, sig).connect(bump)
             except Exception:
-                seq=[]
-            if len(seq)>=1: t0 = seq[0]
-            if len(seq)>=2: a  = seq[1]
-            if len(seq)>=3: s  = seq[2]
-            if len(seq)>=4: i  = seq[3]
-            if len(seq)>=5: sn = seq[4]
-            if len(seq)>=6: eo = seq[5]
-            return t0,a,s,i,sn,eo
-
-        (pre_TOL, pre_ANG, pre_SIMPL, pre_MAX, pre_SPLIT, pre_EVEN) = _read_params(pre_params)
-        (fin_TOL, fin_ANG, fin_SIMPL, fin_MAX, fin_SPLIT, fin_EVEN) = _read_params(final_params)
-
-        # 1) zu verdrängende Quellgeometrie (Vorverknüpfen → Union)
-        if isinstance(to_move_src, QgsGeometry):
-            pre = _merge_by_direction(
-                to_move_src, project, log,
-                tol_value=pre_TOL, angle_value=pre_ANG, simplify_value=pre_SIMPL,
-                max_iters=pre_MAX, split_at_nodes=pre_SPLIT, even_only=pre_EVEN
-            )
-            if pre is not None and not pre.isEmpty():
-                union_to_move = pre
-                log(t("Weichende Geometrie vorverknüpft; vereinheitlichte Geometrie übernommen.",
-                      "To-move geometry pre-merged; unified geometry adopted."))
-            else:
-                union_to_move = to_move_src
-                log(t("Vorverknüpfung übersprungen/fehlgeschlagen – nutze Original-Geometrie.",
-                      "Pre-merge skipped/failed – using original geometry."))
-        else:
-            move_layers = project.mapLayersByName(str(to_move_src))
-            if not move_layers:
-                log(t(f"Weichender Layer '{to_move_src}' nicht gefunden.",
-                      f"To-move layer '{to_move_src}' not found."))
-                return QgsGeometry()
-            move_layer = move_layers[0]
-            pre = _merge_by_direction(
-                move_layer, project, log,
-                tol_value=pre_TOL, angle_value=pre_ANG, simplify_value=pre_SIMPL,
-                max_iters=pre_MAX, split_at_nodes=pre_SPLIT, even_only=pre_EVEN
-            )
-            if pre is not None and not pre.isEmpty():
-                union_to_move = pre
-                log(t("Weichender Layer vorverknüpft; vereinheitlichte Geometrie übernommen.",
-                      "To-move layer pre-merged; unified geometry adopted."))
-            else:
-                move_geoms = [f.geometry() for f in move_layer.getFeatures() if f.geometry() and not f.geometry().isEmpty()]
-                if not move_geoms:
-                    log(t("Keine weichenden Geometrien.", "No to-move geometries."))
-                    return QgsGeometry()
-                union_to_move = QgsGeometry.unaryUnion(move_geoms)
-                if union_to_move is None or union_to_move.isEmpty():
-                    log(t("Vereinigte weichende Geometrie leer.",
-                          "Unified to-move geometry is empty."))
-                    return QgsGeometry()
-                log(t("Weichende Geometrie vereinigt (ohne Vorverknüpfung).",
-                      "To-move geometry unified (no pre-merge)."))
-        if dbg == "union_to_move":
-            return union_to_move
-
-        # 2) bleibende Quellgeometrie (Union)
-        if isinstance(fixed_src, QgsGeometry):
-            union_fixed = fixed_src
-            log(t("Bleibende Geometrie direkt übergeben.", "Fixed geometry passed directly."))
-        else:
-            fixed_layers = project.mapLayersByName(str(fixed_src))
-            if not fixed_layers:
-                log(t(f"Bleibender Layer '{fixed_src}' nicht gefunden.",
-                      f"Fixed layer '{fixed_src}' not found."))
-                return QgsGeometry()
-            fixed_layer = fixed_layers[0]
-            fixed_geoms = [f.geometry() for f in fixed_layer.getFeatures() if f.geometry() and not f.geometry().isEmpty()]
-            if not fixed_geoms:
-                log(t("Keine bleibenden Geometrien.", "No fixed geometries."))
-                return QgsGeometry()
-            union_fixed = QgsGeometry.unaryUnion(fixed_geoms)
-            if union_fixed is None or union_fixed.isEmpty():
-                log(t("Vereinigte bleibende Geometrie leer.", "Unified fixed geometry is empty."))
-                return QgsGeometry()
-            log(t("Bleibende Geometrie vereinigt.", "Fixed geometry unified."))
-        if dbg == "union_fixed":
-            return union_fixed
-
-        # 3) Pufferfläche um bleibend
-        fixed_buffer_poly = union_fixed.buffer(buf_dist, 1)  # 1 Segment pro Viertelkreis
-        if fixed_buffer_poly is None or fixed_buffer_poly.isEmpty():
-            log(t("Pufferfläche (bleibend) leer.", "Buffer polygon (fixed) is empty."))
-            return QgsGeometry()
-        log(t("Pufferfläche (bleibend) erstellt.", "Buffer polygon (fixed) created."))
-        if dbg == "fixed_buffer_poly":
-            return fixed_buffer_poly
+                pass
+    return _LAYER_REVISIONS[lid]
 
-        # 4) Pufferkontur
-        if hasattr(fixed_buffer_poly, "boundary"):
-            fixed_boundary = fixed_buffer_poly.boundary()
-        else:
-            lines = []
-            if fixed_buffer_poly.isMultipart():
-                for poly in fixed_buffer_poly.asMultiPolygon():
-                    lines.append(QgsGeometry.fromPolylineXY(poly[0]))
-            else:
-                lines.append(QgsGeometry.fromPolylineXY(fixed_buffer_poly.asPolygon()[0]))
-            fixed_boundary = QgsGeometry.collectGeometry(lines)
 
-        # 5) Pufferkontur vereinfachen und Dubletten entfernen
+def _source_key(src, project):
+    """Fingerabdruck einer Quelle: WKB-Hash einer Geometrie bzw. Ebenen-ID + Änderungszähler."""
+    if isinstance(src, QgsGeometry):
+        return ("geom", hashlib.blake2b(bytes(src.asWkb()), digest_size=16).hexdigest())
+    layers = project.mapLayersByName(str(src))
+    if not layers:
+        return ("missing", str(src))
+    return ("layer", layers[0].id(), _layer_revision(layers[0]))
+
+
+def _input_key(project, to_move_src, fixed_src, buf_dist, min_repl_len,
+               pre_params, final_params, options, source_keys=None):
+    """
+    Fingerabdruck aller Eingaben, die das Ergebnis bestimmen; None, wenn er nicht bildbar ist.
+    source_keys ersetzt die Fingerabdrücke der beiden Quellen (z. B. aus Schnappschüssen).
+    """
+    try:
+        if source_keys is None:
+            source_keys = (_source_key(to_move_src, project), _source_key(fixed_src, project))
+        return (*source_keys,
+                repr(buf_dist), repr(min_repl_len), repr(ld_core.read_params(pre_params)),
+                repr(ld_core.read_params(final_params)),
+                repr(sorted((k, repr(v)) for k, v in options.items() if k not in _NON_GEOMETRY_OPTIONS)))
+    except Exception:
+        return None
+
+
+def _rect_key(rect):
+    """Schlüsselteil eines Ausschnitts (gerundete Ecken) oder None."""
+    if rect is None:
+        return None
+    return tuple(round(v, 6) for v in (rect.xMinimum(), rect.yMinimum(), rect.xMaximum(), rect.yMaximum()))
+
+
+def _visible_window(context, crs_authid, buf_dist, options):
+    """
+    Option 'extent': (sichtbarer Kartenausschnitt im KBS crs_authid, Rand, crs_authid)
+    aus @map_extent des Ausdruckskontexts; None ohne Kartenkontext (z. B. im
+    Feldrechner) – dann wird wie bisher die ganze Ebene verdrängt.
+    """
+    if not _flag(options.get('extent')) or context is None:
+        return None
+    try:
+        ext = context.variable('map_extent')
+        map_authid = str(context.variable('map_crs') or "")
+    except Exception:
+        return None
+    if not isinstance(ext, QgsGeometry) or ext.isEmpty():
+        return None
+    rect = ext.boundingBox()
+    if map_authid and crs_authid and map_authid != crs_authid:
         try:
-            simp_tol = abs(float(buf_dist)) * 0.20  # 20 % des Pufferradius
+            tr = QgsCoordinateTransform(QgsCoordinateReferenceSystem(map_authid),
+                                        QgsCoordinateReferenceSystem(crs_authid),
+                                        QgsCoordinateTransformContext())
+            rect = tr.transformBoundingBox(rect)
         except Exception:
-            simp_tol = 0.0
-        if simp_tol <= 0.0:
-            simp_tol = 1e-9
+            return None
+    try:
+        margin = float(options.get('extent_margin'))
+    except (TypeError, ValueError):
+        margin = abs(float(buf_dist))
+    return rect, margin, crs_authid
+
+
+def _rect_in_crs(rect, authid, crs, project):
+    """rect (im KBS authid) als Umring im KBS crs; unverändert ohne authid oder bei gleichem KBS."""
+    if not authid or not crs.isValid() or crs.authid() == authid:
+        return rect
+    try:
+        tr = QgsCoordinateTransform(QgsCoordinateReferenceSystem(authid), crs, project.transformContext())
+        return tr.transformBoundingBox(rect)
+    except Exception:
+        return rect
+
+
+def _windowed_source(src, rect, project, rect_crs=""):
+    """
+    Nur die Objekte einer Quelle, deren Umring rect schneidet, als Sammelgeometrie:
+    Ebenen fragen beim Provider per Rechteckfilter an (rect dafür aus rect_crs ins
+    KBS der Ebene umgerechnet), Geometrien behalten ihre Teile (je Objekt eines
+    aus aggregate(…, 'collect', …)).
+    """
+    if isinstance(src, QgsGeometry):
+        parts = [p for p in src.asGeometryCollection() if p.boundingBox().intersects(rect)]
+    else:
+        layers = project.mapLayersByName(str(src)) if project is not None else []
+        if not layers:
+            return QgsGeometry()
+        layer = layers[0]
+        req = QgsFeatureRequest().setFilterRect(_rect_in_crs(rect, rect_crs, layer.crs(), project))
+        parts = [f.geometry() for f in layer.getFeatures(req) if f.geometry() and not f.geometry().isEmpty()]
+    return QgsGeometry.collectGeometry(parts) if parts else QgsGeometry()
+
+
+def _displace_window(key, project, to_move_src, fixed_src, rect, buf_dist, min_repl_len,
+                     pre_params, final_params, options, stage, rect_crs=""):
+    """
+    Verdrängt nur den Ausschnitt rect (bleibend zusätzlich um den Puffer vergrößert).
+    Rückgabe (Geometrie, vorzeitig) der Stufe stage.
+    """
+    move_geom = _windowed_source(to_move_src, rect, project, rect_crs)
+    if move_geom.isEmpty():
+        return QgsGeometry(), True
+    fixed_geom = _windowed_source(fixed_src, rect.buffered(abs(float(buf_dist))), project, rect_crs)
+    if fixed_geom.isEmpty():
+        log(lambda: t("Ausschnitt: keine bleibenden Geometrien; weichende unverändert.",
+                      "Window: no fixed geometries; to-move unchanged."))
+        return move_geom, True
+    log(lambda: t(f"Ausschnitt {rect.toString(1)}: weichend={summarize_source(move_geom)}, "
+                  f"bleibend={summarize_source(fixed_geom)}",
+                  f"Window {rect.toString(1)}: to_move={summarize_source(move_geom)}, "
+                  f"fixed={summarize_source(fixed_geom)}"))
+    pipe = _pipeline_for(key, project, move_geom, fixed_geom, buf_dist, min_repl_len,
+                         pre_params, final_params, options)
+    stage = stage if (stage in _STAGES or stage in pipe.aliases) else "final"
+    return pipe.result(stage)
+
+
+def _displace_visible(in_key, project, to_move_src, fixed_src, view, buf_dist, min_repl_len,
+                      pre_params, final_params, options, stage):
+    """Option 'extent': view = (Ausschnitt, Rand, KBS) aus _visible_window; auf Kacheln oder als ein Fenster."""
+    rect, margin, rect_crs = view
+    if isinstance(to_move_src, QgsGeometry) or isinstance(fixed_src, QgsGeometry):
+        # Rechteckfilter beim Provider nur für Ebenennamen; aggregate(…) hat die ganze Ebene schon gelesen
+        log(lambda: t("'extent': Quellen als Geometrie (z. B. aggregate) werden vollständig gelesen und "
+                      "erst danach zugeschnitten – für kurze Zeichenzeiten Ebenennamen übergeben.",
+                      "'extent': sources given as geometry (e.g. aggregate) are read in full and only "
+                      "clipped afterwards – pass layer names for short rendering times."),
+            LOG_WARNING)
+    if _flag(options.get('extent_tiles')):
+        return _displace_tiles(in_key, project, to_move_src, fixed_src, rect, margin, buf_dist,
+                               min_repl_len, pre_params, final_params, options, stage, rect_crs)
+    window = rect.buffered(margin)
+    key = (in_key, _rect_key(window)) if in_key is not None else None
+    return _displace_window(key, project, to_move_src, fixed_src, window, buf_dist, min_repl_len,
+                            pre_params, final_params, options, stage, rect_crs)
+
+
+# Kachel-Cache des dynamischen Modus: Schlüssel (Eingabe-Schlüssel, Stufe, Maßstabsband,
+# Spalte, Zeile) → (auf die Kachel zugeschnittenes Ergebnis, Stützpunkte)
+_TILE_CACHE = OrderedDict()
+
+def _tile_grid(rect):
+    """(Maßstabsband, Kachelgröße): feste Zweierpotenz, damit sich Verschieben und leichtes Zoomen Kacheln teilen."""
+    span = max(rect.width(), rect.height(), 1e-9)
+    band = math.ceil(math.log2(span / TILE_GRID_PER_VIEW))
+    return band, 2.0 ** band
+
+
+def _cached_tile(key):
+    if key is None:
+        return None
+    with _CACHE_LOCK:
+        if key not in _TILE_CACHE:
+            return None
+        _TILE_CACHE.move_to_end(key)
+        return QgsGeometry(_TILE_CACHE[key][0])
+
+
+def _remember_tile(key, geom):
+    if key is None:
+        return
+    verts = _geom_size(geom)[1]
+    with _CACHE_LOCK:
+        _TILE_CACHE[key] = (QgsGeometry(geom), verts)
+        total = sum(v[1] for v in _TILE_CACHE.values())
+        while len(_TILE_CACHE) > TILE_CACHE_SIZE or total > TILE_CACHE_MAX_VERTICES:
+            _key, (_g, n) = _TILE_CACHE.popitem(last=False)
+            total -= n
+
+
+def _drop_source_entries(kind, ident):
+    """
+    Nach einer Änderung einer Quelle ('layer' + Ebenen-ID bzw. 'snapshot' + Name):
+    Kacheln und Endergebnisse, die auf ihr beruhen, verwerfen. Als Geometrie
+    übergebene Quellen bekommen bei Änderungen einen neuen Fingerabdruck; ihre
+    alten Einträge fallen nach und nach aus dem LRU.
+    """
+    def uses(key):
+        in_key = key[0] if isinstance(key, tuple) and key else None
+        return isinstance(in_key, tuple) and any(
+            isinstance(sk, tuple) and len(sk) > 1 and sk[0] == kind and sk[1] == ident for sk in in_key[:2])
+    with _CACHE_LOCK:
+        for cache in (_TILE_CACHE, _RESULT_CACHE):
+            for key in [k for k in cache if uses(k)]:
+                del cache[key]
+
+
+def _displace_tiles(in_key, project, to_move_src, fixed_src, rect, margin, buf_dist, min_repl_len,
+                    pre_params, final_params, options, stage, rect_crs=""):
+    """
+    Verdrängt den Ausschnitt auf dem festen Kachelraster seines Maßstabsbands. Jede
+    Kachel rechnet auf einem um margin vergrößerten Fenster und wird auf ihr Rechteck
+    zugeschnitten; gemerkte Kacheln werden nicht neu gerechnet, beim Verschieben also
+    nur die neu sichtbaren. Rückgabe (Sammlung der Kacheln, False).
+    """
+    from qgis.core import QgsRectangle
+    band, size = _tile_grid(rect)
+    ix0, ix1 = math.floor(rect.xMinimum() / size), math.floor(rect.xMaximum() / size)
+    iy0, iy1 = math.floor(rect.yMinimum() / size), math.floor(rect.yMaximum() / size)
+    pieces, computed = [], 0
+    for ix in range(ix0, ix1 + 1):
+        for iy in range(iy0, iy1 + 1):
+            key = (in_key, stage, band, ix, iy) if in_key is not None else None
+            geom = _cached_tile(key)
+            if geom is None:
+                with _TILE_LOCKS[hash(key) % len(_TILE_LOCKS)]:
+                    geom = _cached_tile(key)   # ein anderer Thread kann sie inzwischen gerechnet haben
+                    if geom is None:
+                        tile = QgsRectangle(ix * size, iy * size, (ix + 1) * size, (iy + 1) * size)
+                        piece, _early = _displace_window(None, project, to_move_src, fixed_src,
+                                                         tile.buffered(margin), buf_dist, min_repl_len,
+                                                         pre_params, final_params, options, stage, rect_crs)
+                        geom = piece.clipped(tile) if piece is not None and not piece.isEmpty() else None
+                        geom = geom if geom is not None else QgsGeometry()
+                        _remember_tile(key, geom)
+                        computed += 1
+            if not geom.isEmpty():
+                pieces.append(geom)
+    n_tiles = (ix1 - ix0 + 1) * (iy1 - iy0 + 1)
+    log(lambda: t(f"Kacheln (Band {band}, Größe {size:g}): {computed} von {n_tiles} neu berechnet.",
+                  f"Tiles (band {band}, size {size:g}): {computed} of {n_tiles} computed."))
+    return _collect(pieces), False
+
+
+# Die Caches werden auch aus Zeichen-Threads benutzt (render_safe): Zugriffe auf die
+# Verzeichnisse nur unter _CACHE_LOCK; dieselbe Pipeline rechnet immer nur ein Thread.
+_CACHE_LOCK = threading.RLock()
+_KEY_LOCKS = tuple(threading.Lock() for _ in range(16))
+_TILE_LOCKS = tuple(threading.Lock() for _ in range(16))   # eigene Sperren: Kacheln rechnen unter der Eingabe-Sperre
+
+def _key_lock(key):
+    """Sperre für einen Eingabe-Schlüssel (feste Anzahl, nach Hash verteilt)."""
+    return _KEY_LOCKS[hash(key) % len(_KEY_LOCKS)]
+
+
+_PIPELINE_CACHE = OrderedDict()
+
+def _pipeline_for(key, project, to_move_src, fixed_src, buf_dist, min_repl_len,
+                  pre_params, final_params, options, inputs=None):
+    """
+    Liefert die gemerkte Pipeline für denselben Eingabe-Schlüssel (_input_key) oder legt
+    sie an; inputs belegt eine neue Pipeline vorab (siehe shared_inputs).
+    """
+    with _CACHE_LOCK:
+        pipe = _PIPELINE_CACHE.get(key) if key is not None else None
+        if pipe is not None:
+            _PIPELINE_CACHE.move_to_end(key)
+    if pipe is not None:
+        log(lambda: t("Zwischenergebnisse für dieselben Eingaben wiederverwendet.",
+                      "Intermediate results reused for identical inputs."))
+        return pipe
+    pipe = _DisplacementPipeline(buf_dist, min_repl_len, to_move_src, fixed_src,
+                                 pre_params, final_params, options, project, inputs=inputs)
+    if key is not None:
+        with _CACHE_LOCK:
+            _PIPELINE_CACHE[key] = pipe
+            while len(_PIPELINE_CACHE) > PIPELINE_CACHE_SIZE:
+                _PIPELINE_CACHE.popitem(last=False)
+    return pipe
+
+
+def _trim_pipeline_cache():
+    """Verwirft die ältesten Pipelines, bis alle zusammen unter PIPELINE_CACHE_MAX_VERTICES liegen (die neueste bleibt)."""
+    with _CACHE_LOCK:
+        sizes = {key: pipe.vertices() for key, pipe in _PIPELINE_CACHE.items()}
+        total = sum(sizes.values())
+        while len(_PIPELINE_CACHE) > 1 and total > PIPELINE_CACHE_MAX_VERTICES:
+            key, _pipe = _PIPELINE_CACHE.popitem(last=False)
+            total -= sizes[key]
+
+
+# Endergebnisse für wiederholte Aufrufe aus dem Geometriegenerator: QGIS wertet den
+# Ausdruck je Zielobjekt und bei jedem Neuzeichnen aus; bei gleichem Eingabestand
+# kommt die Geometrie von hier (ohne Log-Neustart, Stufenlauf oder erneutes Schreiben).
+_RESULT_CACHE = OrderedDict()
+
+def _cached_result(key):
+    """(Geometrie, vorzeitig) zum Schlüssel oder None; ein Treffer gilt als zuletzt benutzt."""
+    if key is None:
+        return None
+    with _CACHE_LOCK:
+        if key not in _RESULT_CACHE:
+            return None
+        _RESULT_CACHE.move_to_end(key)
+        geom, early, _verts = _RESULT_CACHE[key]
+    return QgsGeometry(geom), early
+
+
+def _remember_result(key, geom, early):
+    """Merkt ein Endergebnis; älteste Einträge fallen nach Anzahl und Stützpunkten heraus."""
+    if key is None:
+        return
+    verts = _geom_size(geom)[1]
+    if verts > RESULT_CACHE_MAX_VERTICES:
+        return
+    with _CACHE_LOCK:
+        _RESULT_CACHE[key] = (QgsGeometry(geom), early, verts)
+        _RESULT_CACHE.move_to_end(key)
+        total = sum(v[2] for v in _RESULT_CACHE.values())
+        while len(_RESULT_CACHE) > RESULT_CACHE_SIZE or total > RESULT_CACHE_MAX_VERTICES:
+            _key, (_g, _e, n) = _RESULT_CACHE.popitem(last=False)
+            total -= n
+
+
+# Render-sicherer Modus (Option 'render_safe'): Ebenen werden vorab im Hauptthread
+# eingelesen; die Auswertung im Zeichen-Thread sieht nur diese Schnappschüsse.
+_RENDER_SNAPSHOTS = {}     # Ebenenname → (Geometrie, KBS-authid, Fingerabdruck)
+_SNAPSHOT_WATCHED = set()  # Ebenen-IDs, deren Speichern den Schnappschuss erneuert
+
+def snapshot_layer(name, project=None, crs=None) -> int:
+    """
+    Nur im Hauptthread: liest die Ebene 'name' (optional nach crs transformiert) als
+    Sammelgeometrie für den render_safe-Modus ein. Nach jedem Speichern von Änderungen
+    an der Ebene wird der Schnappschuss erneuert. Rückgabe: Anzahl der Objekte.
+    """
+    project = project or QgsProject.instance()
+    layers = project.mapLayersByName(str(name))
+    if not layers:
+        raise ValueError(t(f"Ebene '{name}' nicht gefunden.", f"Layer '{name}' not found."))
+    layer = layers[0]
+    if crs is None or not crs.isValid():
+        crs = layer.crs()
+    req = QgsFeatureRequest()
+    if layer.crs().isValid() and crs.isValid() and layer.crs().authid() != crs.authid():
+        req.setDestinationCrs(crs, project.transformContext())
+    geoms = [f.geometry() for f in layer.getFeatures(req) if f.geometry() and not f.geometry().isEmpty()]
+    geom = QgsGeometry.collectGeometry(geoms) if geoms else QgsGeometry()
+    fp = hashlib.blake2b(bytes(geom.asWkb()), digest_size=16).hexdigest()
+    with _CACHE_LOCK:
+        _RENDER_SNAPSHOTS[str(name)] = (geom, crs.authid(), fp)
+    _drop_source_entries("snapshot", str(name))
+    if layer.id() not in _SNAPSHOT_WATCHED:
+        _SNAPSHOT_WATCHED.add(layer.id())
         try:
-            fb_simpl = fixed_boundary.simplify(simp_tol)
-            if fb_simpl and not fb_simpl.isEmpty():
-                fixed_boundary = fb_simpl
+            layer.afterCommitChanges.connect(lambda n=str(name), p=project, c=crs: snapshot_layer(n, p, c))
         except Exception:
             pass
+    return len(geoms)
+
+
+def _render_source(src):
+    """render_safe: (Geometrie, Fingerabdruck, authid) einer Quelle oder None, wenn kein Schnappschuss da ist."""
+    if isinstance(src, QgsGeometry):
+        return src, ("geom", hashlib.blake2b(bytes(src.asWkb()), digest_size=16).hexdigest()), ""
+    with _CACHE_LOCK:
+        snap = _RENDER_SNAPSHOTS.get(str(src))
+    if snap is None:
+        return None
+    geom, authid, fp = snap
+    return geom, ("snapshot", str(src), fp), authid
+
+
+# ------------------------------
+# Stufen 1–2: Quellgeometrien, Vorfilter
+# ------------------------------
+@_stage("union_to_move")
+def _st_union_to_move(pipe):
+    # 1) zu verdrängende Quellgeometrie (Vorverknüpfen → Union)
+    pre_TOL, pre_ANG, pre_SIMPL, pre_MAX, pre_SPLIT, pre_EVEN = pipe.pre
+    src = pipe.to_move_src
+    if isinstance(src, QgsGeometry):
+        pre = _merge_by_direction(
+            src, pipe.project, log,
+            tol_value=pre_TOL, angle_value=pre_ANG, simplify_value=pre_SIMPL,
+            max_iters=pre_MAX, split_at_nodes=pre_SPLIT, even_only=pre_EVEN,
+            metrics_file=pipe.metrics_file, trace_memory=pipe.memtrace,
+            feedback=pipe.stage_feedback()
+        )
+        if pre is not None and not pre.isEmpty():
+            log(lambda: t("Weichende Geometrie vorverknüpft; vereinheitlichte Geometrie übernommen.",
+                          "To-move geometry pre-merged; unified geometry adopted."))
+            return pre
+        log(lambda: t("Vorverknüpfung übersprungen/fehlgeschlagen – nutze Original-Geometrie.",
+                      "Pre-merge skipped/failed – using original geometry."))
+        return src
+
+    move_layers = pipe.project.mapLayersByName(str(src))
+    if not move_layers:
+        log(lambda: t(f"Weichender Layer '{src}' nicht gefunden.",
+                      f"To-move layer '{src}' not found."))
+        raise _EarlyResult(QgsGeometry())
+    move_layer = move_layers[0]
+    pre = _merge_by_direction(
+        move_layer, pipe.project, log,
+        tol_value=pre_TOL, angle_value=pre_ANG, simplify_value=pre_SIMPL,
+        max_iters=pre_MAX, split_at_nodes=pre_SPLIT, even_only=pre_EVEN,
+        metrics_file=pipe.metrics_file, trace_memory=pipe.memtrace,
+        feedback=pipe.stage_feedback()
+    )
+    if pre is not None and not pre.isEmpty():
+        log(lambda: t("Weichender Layer vorverknüpft; vereinheitlichte Geometrie übernommen.",
+                      "To-move layer pre-merged; unified geometry adopted."))
+        return pre
+    move_geoms = [f.geometry() for f in move_layer.getFeatures() if f.geometry() and not f.geometry().isEmpty()]
+    if not move_geoms:
+        log(lambda: t("Keine weichenden Geometrien.", "No to-move geometries."))
+        raise _EarlyResult(QgsGeometry())
+    union_to_move = QgsGeometry.unaryUnion(move_geoms)
+    if union_to_move is None or union_to_move.isEmpty():
+        log(lambda: t("Vereinigte weichende Geometrie leer.",
+                      "Unified to-move geometry is empty."))
+        raise _EarlyResult(QgsGeometry())
+    log(lambda: t("Weichende Geometrie vereinigt (ohne Vorverknüpfung).",
+                  "To-move geometry unified (no pre-merge)."))
+    return union_to_move
+
+
+def _pick_fixed_strategy(option, n_parts, n_vertices) -> str:
+    """ld_core.choose_fixed_strategy; bei 'auto' steht die Entscheidung samt Grund im Log."""
+    strategy = ld_core.choose_fixed_strategy(option, n_parts, n_vertices)
+    if str(option or "auto").lower() == "auto":
+        log(lambda: t(f"Pufferstrategie 'auto' → {strategy} ({n_parts} Teile, {n_vertices} Stützpunkte; 'indexed' ab "
+                      f"{ld_core.FIXED_INDEX_MIN_PARTS} Teilen oder {ld_core.FIXED_INDEX_MIN_VERTICES} Stützpunkten).",
+                      f"Buffer strategy 'auto' → {strategy} ({n_parts} parts, {n_vertices} vertices; 'indexed' from "
+                      f"{ld_core.FIXED_INDEX_MIN_PARTS} parts or {ld_core.FIXED_INDEX_MIN_VERTICES} vertices)."))
+    return strategy
+
+
+@_stage("fixed_input", "union_to_move")
+def _st_fixed_input(pipe, union_to_move):
+    # 2) bleibende Quellgeometrie (Union bzw. bei 'indexed' nur gesammelt)
+    src, options, buf_dist = pipe.fixed_src, pipe.options, pipe.buf_dist
+    if isinstance(src, QgsGeometry):
         try:
-            eps = max(simp_tol * 0.5, 1e-12)
-            rb = fixed_boundary.removeDuplicateNodes(eps)
-            if rb and not rb.isEmpty():
-                fixed_boundary = rb
+            fixed_strategy = _pick_fixed_strategy(options.get('fixed_strategy'),
+                                                  src.constGet().partCount(), src.constGet().nCoordinates())
         except Exception:
-            pass
+            fixed_strategy = "union"
+        log(lambda: t("Bleibende Geometrie direkt übergeben.", "Fixed geometry passed directly."))
+        return src, fixed_strategy
+
+    fixed_layers = pipe.project.mapLayersByName(str(src))
+    if not fixed_layers:
+        log(lambda: t(f"Bleibender Layer '{src}' nicht gefunden.",
+                      f"Fixed layer '{src}' not found."))
+        raise _EarlyResult(QgsGeometry())
+    fixed_layer = fixed_layers[0]
+    req = QgsFeatureRequest()
+    if _flag(options.get('prefilter')):
+        # nur bleibende Objekte in Reichweite der weichenden Geometrie beim Provider anfordern
+        req.setFilterRect(union_to_move.boundingBox().buffered(abs(float(buf_dist))))
+    fixed_geoms = [f.geometry() for f in fixed_layer.getFeatures(req) if f.geometry() and not f.geometry().isEmpty()]
+    if not fixed_geoms and not req.filterRect().isNull():
+        log(lambda: t("Keine bleibenden Geometrien in Reichweite; Rest zurückgeben.",
+                      "No fixed geometries in range; returning the rest."))
+        raise _EarlyResult(union_to_move)
+    if not fixed_geoms:
+        log(lambda: t("Keine bleibenden Geometrien.", "No fixed geometries."))
+        raise _EarlyResult(QgsGeometry())
+    fixed_strategy = _pick_fixed_strategy(options.get('fixed_strategy'), len(fixed_geoms),
+                                          sum(g.constGet().nCoordinates() for g in fixed_geoms))
+    if fixed_strategy == "indexed":
+        # keine globale Union: Einzelpuffer werden in Schritt 3 indiziert
+        log(lambda: t("Bleibende Geometrie gesammelt (indizierte Einzelpuffer).",
+                      "Fixed geometry collected (indexed individual buffers)."))
+        return QgsGeometry.collectGeometry(fixed_geoms), fixed_strategy
+    union_fixed = QgsGeometry.unaryUnion(fixed_geoms)
+    if union_fixed is None or union_fixed.isEmpty():
+        log(lambda: t("Vereinigte bleibende Geometrie leer.", "Unified fixed geometry is empty."))
+        raise _EarlyResult(QgsGeometry())
+    log(lambda: t("Bleibende Geometrie vereinigt.", "Fixed geometry unified."))
+    return union_fixed, fixed_strategy
+
+
+@_stage("union_fixed", "fixed_input")
+def _st_union_fixed(pipe, fixed_input):
+    # ab hier rechnen die Stufen über das Geometrie-Backend (pipe.geo)
+    return pipe.to_geo(fixed_input[0])
+
+
+@_stage("fixed_strategy", "fixed_input")
+def _st_fixed_strategy(pipe, fixed_input):
+    strategy = fixed_input[1]
+    log(lambda: t(f"Pufferstrategie (bleibend): {strategy}", f"Buffer strategy (fixed): {strategy}"))
+    return strategy
+
+
+@_stage("prefilter", "union_to_move", "union_fixed")
+def _st_prefilter(pipe, union_to_move, union_fixed):
+    # Vorfilter: weit entfernte weichende Teile gehen direkt in die Ausgabe
+    to_move = pipe.to_geo(union_to_move)
+    if not _flag(pipe.options.get('prefilter')):
+        return to_move, []
+    near_to_move, passthrough = ld_core.prefilter(pipe.geo, to_move, union_fixed, pipe.buf_dist)
+    log(lambda: t(f"Vorfilter: {len(pipe.geo.parts(near_to_move))} weichende Teile in Reichweite, "
+                  f"{len(passthrough)} direkt durchgereicht.",
+                  f"Prefilter: {len(pipe.geo.parts(near_to_move))} to-move parts in range, "
+                  f"{len(passthrough)} passed straight through."))
+    if pipe.geo.is_empty(near_to_move):
+        log(lambda: t("Keine weichenden Anteile in Reichweite; Rest zurückgeben.",
+                      "No to-move parts in range; returning the rest."))
+        raise _EarlyResult(union_to_move)
+    return near_to_move, passthrough
+
+
+@_stage("near_to_move", "prefilter")
+def _st_near_to_move(pipe, prefilter):
+    return prefilter[0]
+
+
+@_stage("passthrough", "prefilter")
+def _st_passthrough(pipe, prefilter):
+    return prefilter[1]
 
-        log(t("Pufferkontur extrahiert.", "Buffer boundary extracted."))
-        if dbg == "fixed_boundary":
-            return fixed_boundary
-
-        # 6) weichende Anteile im Puffer
-        to_move_in_buffer = union_to_move.intersection(fixed_buffer_poly)
-        if to_move_in_buffer is None or to_move_in_buffer.isEmpty():
-            log(t("Keine weichenden Anteile im Puffer; Rest zurückgeben.",
-                  "No to-move parts inside the buffer; returning the rest."))
-            rest_only = union_to_move.difference(fixed_buffer_poly)
-            if dbg in ("to_move_in_buffer", "rest"):
-                return rest_only
-            return rest_only
-        log(t("Weichende Anteile im Puffer extrahiert.",
-              "To-move parts inside buffer extracted."))
-        if dbg == "to_move_in_buffer":
-            return to_move_in_buffer
-
-        # 7) Teilstücke im Puffer (Liste) + Union (nur für Debug)
-        loops_list = []
-        if to_move_in_buffer.isMultipart():
-            for part in to_move_in_buffer.asMultiPolyline():
-                if len(part) >= 2:
-                    loops_list.append(QgsGeometry.fromPolylineXY(part))
+
+# ------------------------------
+# Stufen 3–15 (Puffer … vorfinale Geometrie), über das Geometrie-Backend
+# ------------------------------
+@_stage("fixed_buffer_poly", "union_fixed", "near_to_move", "fixed_strategy")
+def _st_fixed_buffer_poly(pipe, union_fixed, union_to_move, fixed_strategy):
+    # 3) Pufferfläche um bleibend
+    geo = pipe.geo
+    if fixed_strategy == "indexed":
+        fixed_buffer_poly, n_parts, n_used = ld_core.fixed_buffer_indexed(
+            geo, union_fixed, union_to_move, pipe.buf_dist)
+        log(lambda: t(f"Bleibend indiziert: {n_used} von {n_parts} Teilen in Reichweite gepuffert und vereinigt.",
+                      f"Fixed indexed: {n_used} of {n_parts} parts within reach buffered and unified."))
+        if geo.is_empty(fixed_buffer_poly):
+            return fixed_buffer_poly   # nichts in Reichweite; buffer_clip liefert den Rest
+    else:
+        fixed_buffer_poly = geo.buffer(union_fixed, pipe.buf_dist, 1)  # 1 Segment pro Viertelkreis
+    if geo.is_empty(fixed_buffer_poly):
+        log(lambda: t("Pufferfläche (bleibend) leer.", "Buffer polygon (fixed) is empty."))
+        raise _EarlyResult(geo.empty())
+    log(lambda: t("Pufferfläche (bleibend) erstellt.", "Buffer polygon (fixed) created."))
+    return fixed_buffer_poly
+
+
+# Zuschnitt der Overlay-Operanden: Außerhalb der (um den Puffer vergrößerten)
+# Box des jeweils anderen Operanden kann kein Ergebnis entstehen. Die Kontur
+# wird nur so weit behalten, wie Blasen um Schlaufen reichen können.
+@_stage("buffer_clip", "fixed_buffer_poly", "near_to_move", "passthrough")
+def _st_buffer_clip(pipe, fixed_buffer_poly, union_to_move, passthrough):
+    if pipe.geo.is_empty(fixed_buffer_poly):
+        log(lambda: t("Keine weichenden Anteile im Puffer; Rest zurückgeben.",
+                      "No to-move parts inside the buffer; returning the rest."))
+        raise _EarlyResult(ld_core.with_passthrough(pipe.geo, union_to_move, passthrough))
+    return ld_core.clip_to(pipe.geo, fixed_buffer_poly, union_to_move, abs(float(pipe.buf_dist)))
+
+
+@_stage("to_move_clip", "near_to_move", "buffer_clip")
+def _st_to_move_clip(pipe, union_to_move, buffer_clip):
+    return ld_core.clip_to(pipe.geo, union_to_move, buffer_clip, abs(float(pipe.buf_dist)))
+
+
+@_stage("fixed_boundary", "fixed_buffer_poly", "near_to_move")
+def _st_fixed_boundary(pipe, fixed_buffer_poly, union_to_move):
+    # 4) Pufferkontur
+    geo, buf_dist = pipe.geo, pipe.buf_dist
+    reach = abs(float(buf_dist)) * (ld_core.BLOB_FACTOR + 1.0)
+    fixed_boundary = ld_core.clip_to(geo, geo.boundary(fixed_buffer_poly), union_to_move, reach)
+
+    # 5) Pufferkontur vereinfachen und Dubletten entfernen
+    try:
+        simp_tol = abs(float(buf_dist)) * 0.20  # 20 % des Pufferradius
+    except Exception:
+        simp_tol = 0.0
+    if simp_tol <= 0.0:
+        simp_tol = 1e-9
+    try:
+        fb_simpl = geo.simplify(fixed_boundary, simp_tol)
+        if not geo.is_empty(fb_simpl):
+            fixed_boundary = fb_simpl
+    except Exception:
+        pass
+    try:
+        rb = geo.remove_duplicate_nodes(fixed_boundary, max(simp_tol * 0.5, 1e-12))
+        if not geo.is_empty(rb):
+            fixed_boundary = rb
+    except Exception:
+        pass
+
+    log(lambda: t("Pufferkontur extrahiert.", "Buffer boundary extracted."))
+    return fixed_boundary
+
+
+@_stage("rest", "near_to_move", "buffer_clip", "passthrough")
+def _st_rest(pipe, union_to_move, buffer_clip, passthrough):
+    # 14) Rest ohne Puffer (einmal berechnet, auch für vorzeitige Enden)
+    rest = pipe.geo.difference(union_to_move, buffer_clip, key="to_move")
+    return ld_core.with_passthrough(pipe.geo, rest, passthrough)
+
+
+@_stage("to_move_in_buffer", "to_move_clip", "buffer_clip")
+def _st_to_move_in_buffer(pipe, to_move_clip, buffer_clip):
+    # 6) weichende Anteile im Puffer
+    to_move_in_buffer = pipe.geo.intersection(to_move_clip, buffer_clip, key="to_move_clip")
+    if pipe.geo.is_empty(to_move_in_buffer):
+        log(lambda: t("Keine weichenden Anteile im Puffer; Rest zurückgeben.",
+                      "No to-move parts inside the buffer; returning the rest."))
+        raise _EarlyResult(pipe.get("rest"))
+    log(lambda: t("Weichende Anteile im Puffer extrahiert.",
+                  "To-move parts inside buffer extracted."))
+    return to_move_in_buffer
+
+
+@_stage("loops", "to_move_in_buffer")
+def _st_loops(pipe, to_move_in_buffer):
+    # 7) Teilstücke im Puffer (Liste)
+    loops_list = [pipe.geo.from_line(c) for c in pipe.geo.lines(to_move_in_buffer) if len(c) >= 2]
+    if not loops_list:
+        log(lambda: t("Keine Linien-Teilstücke im Puffer; Rest zurückgeben.",
+                      "No line segments inside the buffer; returning the rest."))
+        raise _EarlyResult(pipe.get("rest"))
+    return loops_list
+
+
+@_stage("loops_union", "loops")
+def _st_loops_union(pipe, loops_list):
+    # Union der Teilstücke (nur für Debug)
+    return pipe.geo.union(loops_list)
+
+
+@_stage("buffer_blobs", "loops")
+def _st_buffer_blobs(pipe, loops_list):
+    # 8) je Teilstück direkt puffern und in Blasen zerlegen (keine Verbundbildung)
+    geo, buffer_blobs = pipe.geo, []
+    for start in range(0, len(loops_list), CANCEL_CHUNK):
+        pipe.check_canceled("buffer_blobs")
+        chunk = loops_list[start:start + CANCEL_CHUNK]
+        for comp_buf in geo.buffer_each(chunk, pipe.buf_dist * ld_core.BLOB_FACTOR, 2):
+            if not geo.is_empty(comp_buf):
+                buffer_blobs.extend(geo.polygons(comp_buf))
+
+    log(lambda: t(f"{len(buffer_blobs)} Puffer-Blasen (segmentweise) extrahiert.",
+                  f"{len(buffer_blobs)} buffer blobs (per segment) extracted."))
+    return buffer_blobs
+
+
+@_stage("blob_index", "buffer_blobs")
+def _st_blob_index(pipe, buffer_blobs):
+    # Bounding-Box-Index über die Blasen; Schlüssel ist die Position in der Liste
+    return pipe.geo.index(buffer_blobs)
+
+
+@_stage("boundary_segments", "fixed_boundary", "to_move_in_buffer", "loops")
+def _st_boundary_segments(pipe, fixed_boundary, to_move_in_buffer, loops_list):
+    # 9) Pufferkontur an Endpunkten zerschneiden
+    reach = abs(float(pipe.buf_dist)) * (ld_core.BLOB_FACTOR + 1.0)
+    boundary_segments = ld_core.split_boundary_at_endpoints(
+        pipe.geo, ld_core.clip_to(pipe.geo, fixed_boundary, to_move_in_buffer, reach), loops_list)
+    log(lambda: t(f"Pufferkontur in {len(boundary_segments)} Segmente zerteilt (an projizierten Endpunkten).",
+                  f"Buffer boundary split into {len(boundary_segments)} segments (at projected endpoints)."))
+    return boundary_segments
+
+
+@_stage("candidate_segments", "boundary_segments", "buffer_blobs", "blob_index")
+def _st_candidate_segments(pipe, boundary_segments, buffer_blobs, blob_idx):
+    # 10) Kandidaten: vollständig innerhalb einer Blase
+    #     (Kandidaten-Blasen über Bounding-Box-Index; enthaltende Blasen je Segment merken)
+    candidates = []
+    for start in range(0, len(boundary_segments), CANCEL_CHUNK):
+        pipe.check_canceled("candidate_segments")
+        chunk = boundary_segments[start:start + CANCEL_CHUNK]
+        for seg, hosts in zip(chunk, pipe.geo.contains_pairs(buffer_blobs, chunk, "blob", index=blob_idx)):
+            if hosts:
+                candidates.append((seg, hosts))
+    return candidates
+
+
+@_stage("replacement_split", "candidate_segments")
+def _st_replacement_split(pipe, candidate_segments):
+    # 10) Ersatzsegmente: Mindestlänge
+    try:
+        min_len = float(pipe.min_repl_len)
+    except Exception:
+        min_len = 0.0
+    if min_len < 0:
+        min_len = 0.0
+
+    replacement_segments = []
+    rejected_replacements = []
+    used_ids = set()
+    for seg, hosts in candidate_segments:
+        try:
+            L = pipe.geo.length(seg)
+        except Exception:
+            L = None
+        if L is not None and L >= min_len:
+            replacement_segments.append(seg)
+            used_ids.update(hosts)
         else:
-            part = to_move_in_buffer.asPolyline()
-            if len(part) >= 2:
-                loops_list.append(QgsGeometry.fromPolylineXY(part))
-        if not loops_list:
-            log(t("Keine Linien-Teilstücke im Puffer; Rest zurückgeben.",
-                  "No line segments inside the buffer; returning the rest."))
-            rest_only = union_to_move.difference(fixed_buffer_poly)
-            if dbg == "rest":
-                return rest_only
-            return rest_only
-
-        if dbg == "loops":
-            return QgsGeometry.collectGeometry(loops_list) if loops_list else QgsGeometry()
-
-        loops_union = QgsGeometry.unaryUnion(loops_list)
-        if dbg == "loops_union":
-            return loops_union if loops_union else QgsGeometry()
-
-        # 8) je Teilstück direkt puffern und in Blasen zerlegen (keine Verbundbildung)
-        buffer_blobs = []
-        for g in loops_list:
-            comp_buf = g.buffer(buf_dist * 2.2, 2)
-            if comp_buf is None or comp_buf.isEmpty():
-                continue
-            if comp_buf.isMultipart():
-                for poly in comp_buf.asMultiPolygon():
-                    buffer_blobs.append(QgsGeometry.fromPolygonXY(poly))
-            else:
-                buffer_blobs.append(comp_buf)
-
-        log(t(f"{len(buffer_blobs)} Puffer-Blasen (segmentweise) extrahiert.",
-              f"{len(buffer_blobs)} buffer blobs (per segment) extracted."))
-        if dbg == "loops_buffer":
-            return QgsGeometry.collectGeometry(buffer_blobs) if buffer_blobs else QgsGeometry()
-        if dbg == "buffer_blobs":
-            return QgsGeometry.collectGeometry(buffer_blobs) if buffer_blobs else QgsGeometry()
-
-        # 9) Pufferkontur an Endpunkten zerschneiden
-        boundary_segments = split_boundary_at_endpoints(fixed_boundary, loops_list)
-        log(t(f"Pufferkontur in {len(boundary_segments)} Segmente zerteilt (an projizierten Endpunkten).",
-              f"Buffer boundary split into {len(boundary_segments)} segments (at projected endpoints)."))
-        if dbg == "boundary_segments":
-            return QgsGeometry.collectGeometry(boundary_segments) if boundary_segments else QgsGeometry()
-
-        # 10) Ersatzsegmente: vollständig innerhalb einer Blase + Mindestlänge
-        candidate_segments = []
-        for seg in boundary_segments:
-            if any(blob.contains(seg) for blob in buffer_blobs):
-                candidate_segments.append(seg)
+            rejected_replacements.append(seg)
+
+    log(lambda: t(f"{len(replacement_segments)} Ersatzsegmente ≥ {min_len:.4f}; "
+                  f"{len(rejected_replacements)} verworfen (zu kurz).",
+                  f"{len(replacement_segments)} replacement segments ≥ {min_len:.4f}; "
+                  f"{len(rejected_replacements)} rejected (too short)."))
+    return replacement_segments, rejected_replacements, used_ids
+
+
+@_stage("replacement_segments", "replacement_split")
+def _st_replacement_segments(pipe, split):
+    return split[0]
+
+
+@_stage("rejected_replacements", "replacement_split")
+def _st_rejected_replacements(pipe, split):
+    return split[1]
+
+
+@_stage("unused_ids", "buffer_blobs", "replacement_split")
+def _st_unused_ids(pipe, buffer_blobs, split):
+    # 11) genutzte / verwaiste Blasen (über ganzzahlige IDs statt Geometrievergleich)
+    used_ids = split[2]
+    unused_ids = set(range(len(buffer_blobs))) - used_ids
+    log(lambda: t(f"{len(used_ids)} genutzte Blasen, {len(unused_ids)} verwaiste Blasen.",
+                  f"{len(used_ids)} used blobs, {len(unused_ids)} orphaned blobs."))
+    return unused_ids
+
+
+@_stage("used_blobs", "buffer_blobs", "replacement_split")
+def _st_used_blobs(pipe, buffer_blobs, split):
+    return [buffer_blobs[i] for i in sorted(split[2])]
+
+
+@_stage("unused_blobs", "buffer_blobs", "unused_ids")
+def _st_unused_blobs(pipe, buffer_blobs, unused_ids):
+    return [buffer_blobs[i] for i in sorted(unused_ids)]
+
+
+@_stage("segments_to_move", "to_move_in_buffer")
+def _st_segments_to_move(pipe, to_move_in_buffer):
+    # 12) alle weichenden Segmente im Puffer (für Durchgänger-Prüfung)
+    segments_to_move = [pipe.geo.from_line(c) for c in pipe.geo.lines(to_move_in_buffer) if len(c) >= 2]
+    log(lambda: t(f"{len(segments_to_move)} weichende Teilstücke im Puffer.",
+                  f"{len(segments_to_move)} to-move segments inside the buffer."))
+    return segments_to_move
+
+
+@_stage("crossers", "segments_to_move", "buffer_blobs", "blob_index", "unused_ids")
+def _st_crossers(pipe, segments_to_move, buffer_blobs, blob_idx, unused_ids):
+    # 13) Durchgänger = Segmente in verwaisten Blasen
+    crossers = []
+    for start in range(0, len(segments_to_move), CANCEL_CHUNK):
+        pipe.check_canceled("crossers")
+        chunk = segments_to_move[start:start + CANCEL_CHUNK]
+        hosts = pipe.geo.contains_pairs(buffer_blobs, chunk, "blob", index=blob_idx,
+                                        allowed=unused_ids, first_only=True)
+        crossers.extend(seg for seg, h in zip(chunk, hosts) if h)
+    log(lambda: t(f"{len(crossers)} Querungs-Segmente (Durchgänger) erkannt.",
+                  f"{len(crossers)} crossing segments detected."))
+    return crossers
+
+
+@_stage("pre_final", "rest", "replacement_segments", "crossers")
+def _st_pre_final(pipe, rest, replacement_segments, crossers):
+    # 15) Vorfinale Geometrie sammeln (Rest + Ersatz + Durchgänger)
+    pre_final_geom = pipe.geo.collect([rest] + replacement_segments + crossers)
+    log(lambda: t("Vorfinale Geometrie zusammengesetzt (Rest + Ersatz + Durchgänger).",
+                  "Pre-final geometry assembled (rest + replacement + crossers)."))
+    return pre_final_geom
+
+
+@_stage("pre_final_tiled", "near_to_move", "union_fixed", "fixed_strategy", "passthrough")
+def _st_pre_final_tiled(pipe, near_to_move, union_fixed, fixed_strategy, passthrough):
+    # 3)–15) im Kachelmodus (ersetzt 'pre_final', wenn die Option 'tiles' gesetzt ist)
+    options = pipe.options
+    pre_final_geom = _displace_tiled(
+        pipe.to_qgs(near_to_move), pipe.to_qgs(union_fixed), pipe.buf_dist, pipe.min_repl_len,
+        workers=options.get('workers'),
+        max_vertices=options.get('tile_max_vertices'),
+        overlap=options.get('tile_overlap'),
+        fixed_strategy=fixed_strategy,
+        backend=pipe.backend,
+    )
+    return ld_core.with_passthrough(pipe.geo, pipe.to_geo(pre_final_geom), passthrough)
+
+
+@_stage("final", "pre_final")
+def _st_final(pipe, pre_final_geom):
+    # 16) Schlussverknüpfung per Netzfragmente_verknuepfen (wieder als QgsGeometry)
+    pre_final_geom = pipe.to_qgs(pre_final_geom)
+    fin_TOL, fin_ANG, fin_SIMPL, fin_MAX, fin_SPLIT, fin_EVEN = pipe.fin
+    final_merged = _merge_by_direction(
+        pre_final_geom, pipe.project, log,
+        tol_value=fin_TOL, angle_value=fin_ANG, simplify_value=fin_SIMPL,
+        max_iters=fin_MAX, split_at_nodes=fin_SPLIT, even_only=fin_EVEN,
+        metrics_file=pipe.metrics_file, trace_memory=pipe.memtrace,
+        feedback=pipe.stage_feedback()
+    )
+    return final_merged if (final_merged and not final_merged.isEmpty()) else pre_final_geom
+
+
+def _displace_geometry(union_to_move, union_fixed, buf_dist, min_repl_len,
+                       fixed_strategy="union", passthrough=None, backend="qgis"):
+    """
+    Führt die Schritte 3–15 auf bereits vereinigten Geometrien aus (z. B. je Kachel).
+    Rückgabe (Geometrie, vorzeitig): 'vorzeitig' ist True, wenn nur der Rest übrig
+    bleibt; sonst ist die Geometrie die vorfinale Sammlung aus Rest,
+    Ersatzsegmenten und Durchgängern.
+    fixed_strategy: 'union' puffert union_fixed als Ganzes, 'indexed' nur die
+    Einzelpuffer in Reichweite (siehe ld_core.fixed_buffer_indexed).
+    passthrough: vom Vorfilter durchgereichte Teile; sie werden jedem Rest zugeschlagen.
+    backend: Geometrie-Backend der Schritte; Ein- und Ausgabe bleiben QgsGeometry.
+    """
+    pipe = _DisplacementPipeline(buf_dist, min_repl_len, options=dict(DEFAULT_OPTIONS, backend=backend))
+    pipe._memo.update({
+        'near_to_move': pipe.to_geo(union_to_move),
+        'union_fixed': pipe.to_geo(union_fixed),
+        'fixed_strategy': fixed_strategy,
+        'passthrough': pipe.to_geo(list(passthrough or [])),
+    })
+    result = pipe.result("pre_final")
+    log(pipe.geos_summary)
+    return result
+
+
+# ------------------------------
+# Export aller Zwischenstufen in ein GeoPackage
+# ------------------------------
+EXPORT_STAGES = (
+    "union_to_move", "union_fixed", "fixed_buffer_poly", "fixed_boundary", "to_move_in_buffer",
+    "loops", "loops_union", "buffer_blobs", "boundary_segments", "replacement_segments",
+    "rejected_replacements", "used_blobs", "unused_blobs", "segments_to_move", "crossers",
+    "rest", "pre_final", "final",
+)
 
+
+def _stage_parts(val):
+    """Einzelteile eines Stufenergebnisses (Geometrie oder Liste) als Liste von Geometrien."""
+    geoms = val if isinstance(val, list) else [val]
+    parts = []
+    for g in geoms:
+        if g is None or g.isEmpty():
+            continue
+        parts.extend(p for p in g.asGeometryCollection() if p and not p.isEmpty())
+    return parts
+
+
+def _export_stages_gpkg(pipe, path, crs):
+    """
+    Schreibt alle Zwischenstufen (EXPORT_STAGES) als eigene Ebenen in ein GeoPackage.
+    Die Stufen kommen aus derselben (memoisierten) Pipeline, also aus einem Durchlauf.
+    Laufzeiten stehen als JSON in der Ebenenbeschreibung und in den Ebenen-Metadaten.
+    """
+    from qgis.core import QgsVectorLayer, QgsVectorFileWriter, QgsWkbTypes, QgsLayerMetadata
+
+    path = str(path)
+    if not path.lower().endswith(".gpkg"):
+        path += ".gpkg"
+    first = True
+    written = []
+    for name in EXPORT_STAGES:
+        try:
+            val = pipe.get(name)
+        except _EarlyResult:
+            log(lambda: t(f"Export: Stufe '{name}' nicht erreicht (vorzeitiges Ende).",
+                          f"Export: stage '{name}' not reached (early end)."))
+            continue
+        parts = _stage_parts(pipe.to_qgs(val))
+        if not parts:
+            log(lambda: t(f"Export: Stufe '{name}' leer.", f"Export: stage '{name}' is empty."))
+            continue
+
+        gtype = QgsWkbTypes.multiType(parts[0].wkbType())
+        lyr = QgsVectorLayer(f"{QgsWkbTypes.displayString(gtype)}?crs={crs.authid()}", name, "memory")
+        feats = []
+        for p in parts:
+            g = QgsGeometry(p)
+            g.convertToMultiType()
+            if QgsWkbTypes.flatType(g.wkbType()) != QgsWkbTypes.flatType(gtype):
+                continue
+            f = QgsFeature(lyr.fields())
+            f.setGeometry(g)
+            feats.append(f)
+        lyr.dataProvider().addFeatures(feats)
+
+        timing = {
+            "stage": name,
+            "seconds": round(pipe.timings.get(pipe.aliases.get(name, name), 0.0), 6),
+            "seconds_with_dependencies": round(pipe.cumulative_time(name), 6),
+            "features": len(feats),
+        }
+        desc = json.dumps(timing)
+        opts = QgsVectorFileWriter.SaveVectorOptions()
+        opts.driverName = "GPKG"
+        opts.layerName = name
+        opts.actionOnExistingFile = (QgsVectorFileWriter.CreateOrOverwriteFile if first
+                                     else QgsVectorFileWriter.CreateOrOverwriteLayer)
+        opts.layerOptions = [f"DESCRIPTION={desc}"]
         try:
-            min_len = float(min_repl_len)
+            md = QgsLayerMetadata()
+            md.setIdentifier(name)
+            md.setTitle(name)
+            md.setAbstract(desc)
+            md.addKeywords("line_displacement", [f"{k}={v}" for k, v in timing.items()])
+            opts.layerMetadata = md
+            opts.saveMetadata = True
         except Exception:
-            min_len = 0.0
-        if min_len < 0:
-            min_len = 0.0
+            pass  # ältere QGIS-Versionen: nur DESCRIPTION
+        ctx = QgsProject.instance().transformContext()
+        if hasattr(QgsVectorFileWriter, "writeAsVectorFormatV3"):
+            res = QgsVectorFileWriter.writeAsVectorFormatV3(lyr, path, ctx, opts)
+        else:
+            res = QgsVectorFileWriter.writeAsVectorFormatV2(lyr, path, ctx, opts)
+        if res[0] != QgsVectorFileWriter.NoError:
+            log(lambda: t(f"Export: Stufe '{name}' nicht geschrieben: {res[1]}",
+                          f"Export: stage '{name}' not written: {res[1]}"))
+            continue
+        first = False
+        written.append(name)
+
+    log(lambda: t(f"{len(written)} Zwischenstufen nach '{path}' exportiert.",
+                  f"{len(written)} intermediate stages exported to '{path}'."))
+    return written
+
+
+# ------------------------------
+# Kachelmodus: Quadtree nach Stützpunktdichte (ld_core.quadtree_tiles) + Prozess-Pool
+# ------------------------------
+TILE_OVERLAP_FACTOR = 10.0  # Standard-Überlappung als Vielfaches des Verdrängungs-Abstands
+
+
+def _geom_from_wkb(wkb) -> QgsGeometry:
+    g = QgsGeometry()
+    if wkb:
+        g.fromWkb(wkb)
+    return g
+
 
-        replacement_segments = []
-        rejected_replacements = []
-        for seg in candidate_segments:
+def _vertex_xy(geom):
+    """Alle Stützpunkte einer Geometrie als (x, y)-Tupel."""
+    if geom is None or geom.isEmpty():
+        return []
+    return [(v.x(), v.y()) for v in geom.vertices()]
+
+
+def _tile_worker(task):
+    """
+    Einstieg für den Prozess-Pool: verdrängt eine Kachel (Schritte 3–15) und
+    schneidet das Ergebnis auf das Kern-Rechteck der Kachel zu.
+    Ein- und Ausgabe als WKB, damit nur Bytes zwischen Prozessen wandern.
+    """
+    from qgis.core import QgsRectangle
+    move_wkb, fixed_wkb, core, buf_dist, min_repl_len, fixed_strategy, backend = task
+    to_move = _geom_from_wkb(move_wkb)
+    if to_move.isEmpty():
+        return b""
+    fixed = _geom_from_wkb(fixed_wkb)
+    if fixed.isEmpty():
+        piece = to_move  # keine bleibende Geometrie in Reichweite: unverändert
+    else:
+        piece, _ = _displace_geometry(to_move, fixed, buf_dist, min_repl_len,
+                                      fixed_strategy=fixed_strategy, backend=backend)
+    if piece is None or piece.isEmpty():
+        return b""
+    clipped = piece.clipped(QgsRectangle(*core))
+    if clipped is None or clipped.isEmpty():
+        return b""
+    return bytes(clipped.asWkb())
+
+
+def _python_executable():
+    """Python-Interpreter für Kindprozesse (innerhalb von QGIS ist sys.executable die QGIS-Anwendung)."""
+    exe = sys.executable or ""
+    if os.path.basename(exe).lower().startswith("python"):
+        return exe
+    for name in ("pythonw.exe", "python.exe", "python3", "python"):
+        for base in (sys.exec_prefix, os.path.join(sys.exec_prefix, "bin")):
+            cand = os.path.join(base, name)
+            if os.path.isfile(cand):
+                return cand
+    return None
+
+
+def _run_tiles(tasks, workers):
+    """Führt die Kachelaufgaben im Prozess-Pool aus; bei Problemen sequenziell im eigenen Prozess."""
+    if workers > 1 and len(tasks) > 1:
+        try:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            mp_ctx = multiprocessing.get_context("spawn")
+            exe = _python_executable()
+            if exe:
+                mp_ctx.set_executable(exe)
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=mp_ctx) as pool:
+                return list(pool.map(_tile_worker, tasks))
+        except Exception as e:
+            log(t(f"Prozess-Pool nicht verfügbar ({e}); Kacheln werden nacheinander berechnet.",
+                  f"Process pool unavailable ({e}); tiles are computed sequentially."))
+    return [_tile_worker(task) for task in tasks]
+
+
+def _displace_tiled(union_to_move, union_fixed, buf_dist, min_repl_len,
+                    workers=0, max_vertices=20000, overlap=None, fixed_strategy="union", backend="qgis"):
+    """
+    Kachelmodus der Schritte 3–15: Die Ausdehnung der weichenden Geometrie wird per
+    Quadtree nach Stützpunktdichte in Kacheln geteilt. Jede Kachel rechnet auf einem
+    um 'overlap' vergrößerten Ausschnitt (bleibend zusätzlich um den Puffer), ihr
+    Ergebnis wird exakt auf die Kachel zugeschnitten. Da die Kacheln die Ausdehnung
+    lückenlos und überschneidungsfrei teilen, treffen sich die Teilstücke genau an
+    den Nähten und werden dort wieder zu durchgehenden Linien verschmolzen.
+    backend: Geometrie-Backend, mit dem jede Kachel die Schritte rechnet.
+    """
+    from qgis.core import QgsRectangle
+
+    buf = abs(float(buf_dist))
+    try:
+        overlap = float(overlap) if overlap is not None else TILE_OVERLAP_FACTOR * buf
+    except Exception:
+        overlap = TILE_OVERLAP_FACTOR * buf
+    overlap = max(overlap, 1e-9)
+    try:
+        max_vertices = max(int(max_vertices), 1)
+    except Exception:
+        max_vertices = int(DEFAULT_OPTIONS['tile_max_vertices'])
+    try:
+        workers = int(workers)
+    except Exception:
+        workers = 0
+    if workers <= 0:
+        workers = max((os.cpu_count() or 1) - 1, 1)
+
+    # quadratische Ausdehnung, damit auch langgestreckte Netze geteilt werden
+    bb = union_to_move.boundingBox()
+    cx, cy = bb.center().x(), bb.center().y()
+    half = max(bb.width(), bb.height()) / 2.0 + 1e-9
+    extent = (cx - half, cy - half, cx + half, cy + half)
+
+    pts = [p for p in _vertex_xy(union_to_move) + _vertex_xy(union_fixed)
+           if extent[0] <= p[0] <= extent[2] and extent[1] <= p[1] <= extent[3]]
+    tiles = ld_core.quadtree_tiles(extent, pts, max_vertices, min_size=overlap)
+
+    tasks = []
+    for core in tiles:
+        ctx_rect = QgsRectangle(core[0] - overlap, core[1] - overlap, core[2] + overlap, core[3] + overlap)
+        move_part = union_to_move.clipped(ctx_rect)
+        if move_part is None or move_part.isEmpty():
+            continue
+        fixed_part = union_fixed.clipped(ctx_rect.buffered(buf))
+        fixed_wkb = bytes(fixed_part.asWkb()) if fixed_part and not fixed_part.isEmpty() else b""
+        tasks.append((bytes(move_part.asWkb()), fixed_wkb, core, buf_dist, min_repl_len, fixed_strategy, backend))
+
+    log(lambda: t(f"Kachelmodus: {len(tiles)} Kacheln (Quadtree), {len(tasks)} mit weichender Geometrie, "
+                  f"Überlappung {overlap:.3f}, {workers} Prozess(e).",
+                  f"Tiling mode: {len(tiles)} tiles (quadtree), {len(tasks)} with to-move geometry, "
+                  f"overlap {overlap:.3f}, {workers} process(es)."))
+
+    results = _run_tiles(tasks, workers)
+    pieces = [g for g in (_geom_from_wkb(w) for w in results if w) if not g.isEmpty()]
+    if not pieces:
+        return QgsGeometry()
+
+    # Nähte schließen: Teilstücke vereinigen und an den Schnittpunkten verschmelzen
+    stitched = QgsGeometry.unaryUnion(pieces)
+    merged = stitched.mergeLines() if stitched and not stitched.isEmpty() else None
+    log(lambda: t(f"Kachelergebnisse zusammengefügt ({len(pieces)} Teilstücke).",
+                  f"Tile results stitched ({len(pieces)} pieces)."))
+    return merged if (merged and not merged.isEmpty()) else stitched
+
+
+# ------------------------------
+# Direkter Aufruf (ohne Ausdruck, Zielebene und Neuzeichnen)
+# ------------------------------
+def run_line_displacement(to_move_src, fixed_src, buf_dist, min_repl_len,
+                          pre_params=None, final_params=None, options=None, project=None,
+                          stage="final", feedback=None, log_enabled=None):
+    """
+    Rechnet die Stufen 1–16 genau einmal und gibt (Geometrie, vorzeitig) zurück,
+    ohne in eine Ebene zu schreiben. Quellen sind Ebenennamen in project
+    (Standard: QgsProject.instance()) oder Geometrien; options wie das 10.
+    Argument von line_displacement. Jeder Aufruf hat seine eigene Pipeline
+    (kein gemeinsamer Zwischenspeicher) und kann mit eigenem project parallel
+    zu anderen laufen. stage wählt eine Debug-Stufe; feedback meldet den
+    Fortschritt und kann zwischen den Stufen abbrechen (DisplacementCanceled).
+    log_enabled schaltet das Log nur für diesen Aufruf (None: LOG_ENABLED).
+    """
+    opts = _read_options(options)
+    args = (to_move_src, fixed_src, buf_dist, min_repl_len, pre_params, final_params,
+            opts, project or QgsProject.instance(), stage, feedback)
+    with log_scope(_log_enabled() if log_enabled is None else log_enabled):
+        if _flag(opts.get('profile')):
+            return _profiled(_run_line_displacement, opts, *args)
+        return _run_line_displacement(*args)
+
+
+def run_line_displacement_multi(to_move_src, fixed_src, buf_dists, min_repl_len,
+                                pre_params=None, final_params=None, options=None, project=None,
+                                stage="final", feedback=None, log_enabled=None):
+    """
+    Wie run_line_displacement für mehrere Verdrängungs-Abstände (z. B. je Maßstab):
+    die abstandsunabhängigen Stufen (DISTANCE_SHARED_STAGES: Vorverknüpfung,
+    Vereinigungen, bleibende Eingabe) rechnen nur einmal, für den größten Abstand.
+    Rückgabe [(Abstand, Geometrie, vorzeitig), …] in der Reihenfolge von buf_dists;
+    bei mehreren Abständen erhält export_gpkg den Abstand als Namenszusatz.
+    """
+    dists = ld_core.read_distances(buf_dists)
+    opts = _read_options(options)
+    args = (to_move_src, fixed_src, dists, min_repl_len, pre_params, final_params,
+            opts, project or QgsProject.instance(), stage, feedback)
+    with log_scope(_log_enabled() if log_enabled is None else log_enabled):
+        if _flag(opts.get('profile')):
+            return _profiled(_run_distances, opts, *args)
+        return _run_distances(*args)
+
+
+def _run_line_displacement(to_move_src, fixed_src, buf_dist, min_repl_len,
+                           pre_params, final_params, opts, project, stage, feedback,
+                           inputs=None, shared=None, pipe=None, crs=None):
+    # inputs: vorab belegte Stufen; shared (dict) erhält danach die abstandsunabhängigen Stufen;
+    # pipe: gemerkte Pipeline (Ausdruck) statt einer neuen; crs: KBS des Exports (Standard: Projekt)
+    if pipe is None:
+        pipe = _DisplacementPipeline(buf_dist, min_repl_len, to_move_src, fixed_src,
+                                     pre_params, final_params, opts, project, inputs=inputs)
+    pipe.feedback = feedback
+    pipe.metrics_file = _metrics_target(opts.get('metrics')) or None
+    pipe.metrics = [] if pipe.metrics_file else None
+    pipe.run_id = datetime.now().isoformat(timespec="seconds")
+    pipe.memtrace = _flag(opts.get('memory'))
+    mem_started = False
+    if pipe.memtrace:
+        import tracemalloc
+        mem_started = not tracemalloc.is_tracing()
+    stage = stage if (stage in _STAGES or stage in pipe.aliases) else "final"
+    try:
+        n_before = len(pipe.evaluated)
+        geom, early = pipe.result(stage)
+        computed = pipe.evaluated[n_before:]
+        log(lambda: t(f"Stufe '{stage}': {len(computed)} Stufe(n) berechnet ({', '.join(computed) or '–'}).",
+                      f"Stage '{stage}': {len(computed)} stage(s) computed ({', '.join(computed) or '–'})."))
+        log(pipe.geos_summary)
+        # optional: alle Zwischenstufen desselben Laufs in ein GeoPackage (einmal je Lauf und Pfad)
+        export_path = str(opts.get('export_gpkg') or "").strip()
+        if export_path and export_path not in pipe.exported:
+            pipe.exported.add(export_path)
             try:
-                L = seg.length()
-            except Exception:
-                L = None
-            if L is not None and L >= min_len:
-                replacement_segments.append(seg)
-            else:
-                rejected_replacements.append(seg)
-
-        log(t(f"{len(replacement_segments)} Ersatzsegmente ≥ {min_len:.4f}; "
-              f"{len(rejected_replacements)} verworfen (zu kurz).",
-              f"{len(replacement_segments)} replacement segments ≥ {min_len:.4f}; "
-              f"{len(rejected_replacements)} rejected (too short)."))
-        if dbg == "replacement_segments":
-            return QgsGeometry.collectGeometry(replacement_segments) if replacement_segments else QgsGeometry()
-        if dbg == "rejected_replacements":
-            return QgsGeometry.collectGeometry(rejected_replacements) if rejected_replacements else QgsGeometry()
-
-        # 11) genutzte / verwaiste Blasen
-        used_blobs = [blob for blob in buffer_blobs if any(blob.contains(seg) for seg in replacement_segments)]
-        unused_blobs = [blob for blob in buffer_blobs if blob not in used_blobs]
-        log(t(f"{len(used_blobs)} genutzte Blasen, {len(unused_blobs)} verwaiste Blasen.",
-              f"{len(used_blobs)} used blobs, {len(unused_blobs)} orphaned blobs."))
-        if dbg == "used_blobs":
-            return QgsGeometry.collectGeometry(used_blobs) if used_blobs else QgsGeometry()
-        if dbg == "unused_blobs":
-            return QgsGeometry.collectGeometry(unused_blobs) if unused_blobs else QgsGeometry()
-
-        # 12) alle weichenden Segmente im Puffer (für Durchgänger-Prüfung)
-        segments_to_move = []
-        if to_move_in_buffer.isMultipart():
-            for part in to_move_in_buffer.asMultiPolyline():
-                segments_to_move.append(QgsGeometry.fromPolylineXY(part))
+                _export_stages_gpkg(pipe, export_path, crs or pipe.project.crs())
+            except DisplacementCanceled:
+                raise
+            except Exception as e:
+                log(t(f"Export ins GeoPackage fehlgeschlagen: {e}",
+                      f"GeoPackage export failed: {e}"), LOG_ERROR)
+        # Kennzahlen der in diesem Aufruf berechneten Stufen (inkl. der für den Export nötigen)
+        if pipe.metrics:
+            _write_metrics(pipe.metrics_file, pipe.metrics)
+            log(lambda: t(f"Kennzahlen von {len(pipe.metrics)} Stufe(n) nach '{pipe.metrics_file}' geschrieben.",
+                          f"Metrics of {len(pipe.metrics)} stage(s) written to '{pipe.metrics_file}'."))
+        if shared is not None:
+            shared.update(pipe.shared_inputs())
+    finally:
+        pipe.metrics = None
+        pipe.feedback = None
+        # Speichermodus: größte Zwischengeometrien melden, tracemalloc wieder beenden
+        if pipe.memtrace:
+            for name, parts, verts in pipe.largest():
+                log(lambda: t(f"Große Zwischengeometrie '{name}': {verts} Stützpunkte, {parts} Teile",
+                              f"Large intermediate geometry '{name}': {verts} vertices, {parts} parts"))
+            if mem_started:
+                import tracemalloc
+                tracemalloc.stop()
+            pipe.memtrace = False
+    return geom, early
+
+
+def _run_distances(to_move_src, fixed_src, dists, min_repl_len, pre_params, final_params,
+                   opts, project, stage, feedback, cached=False, crs=None):
+    """
+    Ein oder mehrere Abstände in einem Durchgang: der größte rechnet zuerst (die
+    bleibende Eingabe deckt so alle Abstände ab) und gibt seine abstandsunabhängigen
+    Stufen (DISTANCE_SHARED_STAGES) an die übrigen weiter. Bei mehreren Abständen
+    erhält export_gpkg den Abstand als Namenszusatz. cached: Pipelines bleiben je
+    Abstand in _PIPELINE_CACHE gemerkt (Ausdruck). Rückgabe [(Abstand, Geometrie,
+    vorzeitig), …] in der Reihenfolge von dists.
+    """
+    order = sorted(set(dists), key=lambda d: -abs(d))
+    export_path = str(opts.get('export_gpkg') or "").strip()
+    source_keys = (_source_key(to_move_src, project), _source_key(fixed_src, project)) if cached else None
+    shared, results = {}, {}
+    for n, dist in enumerate(order):
+        sub = opts
+        if export_path and len(order) > 1:
+            root, ext = os.path.splitext(export_path)
+            sub = dict(opts, export_gpkg=f"{root}_{dist:g}{ext or '.gpkg'}")
+        fdb = _StageFeedback(feedback, 100.0 * n / len(order), 100.0 * (n + 1) / len(order)) \
+            if feedback is not None else None
+        if len(order) > 1:
+            log(lambda: t(f"Abstand {dist:g} ({n + 1} von {len(order)})", f"Distance {dist:g} ({n + 1} of {len(order)})"))
+        pipe = None
+        if cached:
+            key = _input_key(project, to_move_src, fixed_src, dist, min_repl_len,
+                             pre_params, final_params, opts, source_keys=source_keys)
+            pipe = _pipeline_for(key, project, to_move_src, fixed_src, dist, min_repl_len,
+                                 pre_params, final_params, opts, inputs=dict(shared) or None)
+        results[dist] = _run_line_displacement(to_move_src, fixed_src, dist, min_repl_len, pre_params,
+                                               final_params, sub, project, stage, fdb, dict(shared),
+                                               shared if n == 0 else None, pipe, crs)
+    return [(d, *results[d]) for d in dists]
+
+
+def _line_displacement_render(parent, context, to_move_src, fixed_src, buf_dist, min_repl_len,
+                              pre_params, final_params, dbg, options):
+    """
+    render_safe: kein Zugriff auf das laufende Projekt, den Ebenenbaum oder die
+    Zielebene und nichts wird geschrieben (export_gpkg, metrics und memory bleiben
+    aus). Ebenennamen als Quellen müssen vorher per snapshot_layer() eingelesen
+    sein. Mehrere Karten und Layouts dürfen gleichzeitig auswerten; dieselben
+    Eingaben werden dabei nur einmal gerechnet. Mit 'extent' nur der sichtbare Ausschnitt.
+    """
+    sources = (_render_source(to_move_src), _render_source(fixed_src))
+    missing = [str(s) for s, r in zip((to_move_src, fixed_src), sources) if r is None]
+    if missing:
+        parent.setEvalErrorString(t(
+            f"render_safe: kein Schnappschuss für {', '.join(missing)} (snapshot_layer im Hauptthread aufrufen).",
+            f"render_safe: no snapshot for {', '.join(missing)} (call snapshot_layer on the main thread)."))
+        return QgsGeometry()
+    (move_geom, move_key, move_crs), (fixed_geom, fixed_key, fixed_crs) = sources
+    options = dict(options, export_gpkg='', metrics=False, memory=False)
+    crs_authid = move_crs or fixed_crs or str(options.get('crs') or "")
+    view = _visible_window(context, crs_authid, buf_dist, options)
+    in_key = _input_key(None, move_geom, fixed_geom, buf_dist, min_repl_len,
+                        pre_params, final_params, options, source_keys=(move_key, fixed_key))
+    res_key = (in_key, _rect_key(view and view[0]), dbg, None) if in_key is not None else None
+    hit = _cached_result(res_key)
+    if hit is not None:
+        return hit[0]
+
+    with _key_lock(in_key):
+        hit = _cached_result(res_key)   # ein anderer Thread kann es inzwischen gerechnet haben
+        if hit is not None:
+            return hit[0]
+        log_init()
+        log(lambda: t(
+            f"--- line_displacement (render_safe): weichend={summarize_source(to_move_src)}, "
+            f"bleibend={summarize_source(fixed_src)}, buf={buf_dist}, min_repl_len={min_repl_len}, debug='{dbg}' ---",
+            f"--- line_displacement (render_safe): to_move={summarize_source(to_move_src)}, "
+            f"fixed={summarize_source(fixed_src)}, buf={buf_dist}, min_repl_len={min_repl_len}, debug='{dbg}' ---"))
+        project = QgsProject()   # eigenes Projekt nur für das KBS der Netzverknüpfung
+        crs = QgsCoordinateReferenceSystem(crs_authid)
+        if crs.isValid():
+            project.setCrs(crs)
+        if view is not None:
+            geom, early = _displace_visible(in_key, project, move_geom, fixed_geom, view, buf_dist,
+                                            min_repl_len, pre_params, final_params, options, dbg)
         else:
-            segments_to_move.append(QgsGeometry.fromPolylineXY(to_move_in_buffer.asPolyline()))
-        log(t(f"{len(segments_to_move)} weichende Teilstücke im Puffer.",
-              f"{len(segments_to_move)} to-move segments inside the buffer."))
-        if dbg == "segments_to_move":
-            return QgsGeometry.collectGeometry(segments_to_move) if segments_to_move else QgsGeometry()
-
-        # 13) Durchgänger = Segmente in verwaisten Blasen
-        crossers = []
-        for seg in segments_to_move:
-            if any(blob.contains(seg) for blob in unused_blobs):
-                crossers.append(seg)
-        log(t(f"{len(crossers)} Querungs-Segmente (Durchgänger) erkannt.",
-              f"{len(crossers)} crossing segments detected."))
-        if dbg == "crossers":
-            return QgsGeometry.collectGeometry(crossers) if crossers else QgsGeometry()
-
-        # 14) Rest ohne Puffer
-        rest = union_to_move.difference(fixed_buffer_poly)
-        if dbg == "rest":
-            return rest
-
-        # 15) Vorfinale Geometrie sammeln (Rest + Ersatz + Durchgänger)
-        pre_final_geom = QgsGeometry.collectGeometry([rest] + replacement_segments + crossers)
-        log(t("Vorfinale Geometrie zusammengesetzt (Rest + Ersatz + Durchgänger).",
-              "Pre-final geometry assembled (rest + replacement + crossers)."))
-
-        # 16) Schlussverknüpfung per Netzfragmente_verknuepfen
-        final_merged = _merge_by_direction(
-            pre_final_geom, project, log,
-            tol_value=fin_TOL, angle_value=fin_ANG, simplify_value=fin_SIMPL,
-            max_iters=fin_MAX, split_at_nodes=fin_SPLIT, even_only=fin_EVEN
-        )
-        final_geom = final_merged if (final_merged and not final_merged.isEmpty()) else pre_final_geom
+            pipe = _pipeline_for(in_key, project, move_geom, fixed_geom, buf_dist, min_repl_len,
+                                 pre_params, final_params, options)
+            stage = dbg if (dbg in _STAGES or dbg in pipe.aliases) else "final"
+            geom, early = pipe.result(stage)
+            log(pipe.geos_summary)
+        _trim_pipeline_cache()
+        _remember_result(res_key, geom, early)
+        return geom
 
-        # Debug: pre_final gibt die gesammelte Geometrie zurück, ohne zu schreiben
-        if dbg == "pre_final":
-            return pre_final_geom
 
-        # 17) Schreiben (nur im finalen Modus)
-        if dbg in ("", "final"):
-            # ------------------- GUI-Option ermitteln -------------------
-            append_new = False  # Default (Standalone/ohne GUI): ersetzen
+# ------------------------------
+# Laufzeitprofil (cProfile) je Auswertung
+# ------------------------------
+PROFILE_TOP_N = 25   # so viele Funktionen (nach kumulierter Zeit) landen im Log
+
+
+def _profiled(fn, options, *args):
+    """
+    Führt fn(*args) unter cProfile aus, legt das Profil als .prof neben der Logdatei ab
+    und schreibt die teuersten Funktionen (kumuliert) ins Log.
+    Kachel-Prozesse werden nicht erfasst, nur der aufrufende Prozess.
+    """
+    import cProfile
+    import io
+    import pstats
+
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn, *args)
+    finally:
+        try:
+            top_n = int(options.get('profile_top') or PROFILE_TOP_N)
+        except Exception:
+            top_n = PROFILE_TOP_N
+        fname = f"line_displacement_{datetime.now():%Y%m%d_%H%M%S}.prof"
+        path = os.path.join(os.path.dirname(LOGFILE), fname)
+        try:
             try:
-                # 1) bevorzugt: Ebene trägt die Entscheidung
-                val = target_layer.customProperty("LineDisplacement/append_new", None)
-                if val is None:
-                    # 2) Fallback: QSettings (falls das Plugin das hier abgelegt hat)
-                    try:
-                        from qgis.PyQt.QtCore import QSettings
-                        val = QSettings().value("LineDisplacement/append_new", "false")
-                    except Exception:
-                        val = "false"
-                append_new = str(val).lower() in ("1", "true", "yes", "on")
+                prof.dump_stats(path)
+            except OSError:
+                import tempfile
+                path = os.path.join(tempfile.gettempdir(), fname)
+                prof.dump_stats(path)
+            buf = io.StringIO()
+            pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top_n)
+            log(lambda: t(f"Laufzeitprofil gespeichert: {path}", f"Profile saved: {path}"))
+            log(buf.getvalue())
+        except Exception as e:
+            log(t(f"Laufzeitprofil nicht gespeichert: {e}", f"Profile not saved: {e}"))
+
+
+@qgsfunction(
+    args=-1,
+    group=t("Kartografie", "Cartography"),  # Anzeigegruppe im Funktionseditor
+    register=True
+)
+def line_displacement(values, feature, parent, context=None):
+    """
+    Verdrängt eine zu verschiebende (to_move) Liniengeometrie von einer bleibenden (fixed) Geometrie.
+    Argumente 1–9 wie gehabt; optional 10) map(...) mit Optionen (z. B. 'tiles', 'workers').
+    """
+    values = list(values)
+    options = _read_options(values[9] if len(values) > 9 else None)
+    with log_scope(values[8] if len(values) > 8 else False):   # 9) gilt nur für diesen Aufruf
+        if _flag(options.get('profile')):
+            return _profiled(_line_displacement, options, values, feature, parent, context)
+        return _line_displacement(values, feature, parent, context)
+
+
+def _append_new(target_layer) -> bool:
+    """GUI-Option 'anhängen' statt 'ersetzen' (Standard ohne GUI: ersetzen)."""
+    try:
+        # 1) bevorzugt: Ebene trägt die Entscheidung
+        val = target_layer.customProperty("LineDisplacement/append_new", None)
+        if val is None:
+            # 2) Fallback: QSettings (falls das Plugin das hier abgelegt hat)
+            try:
+                val = QSettings().value("LineDisplacement/append_new", "false")
             except Exception:
-                append_new = False
+                val = "false"
+        return str(val).lower() in ("1", "true", "yes", "on")
+    except Exception:
+        return False
 
-            # ------------------- Schreiben entsprechend Wahl -------------------
-            if append_new:
-                # Immer neues Feature anhängen
+
+def _result_key(in_key, view, dbg, target_layer, dists):
+    """
+    Schlüssel im Ergebnisspeicher. Der Änderungsstand der Zielebene gehört dazu:
+    ein Treffer schreibt nicht, daher müssen Bearbeitungen oder Löschungen dort
+    beim nächsten Auslösen zu einer neuen Auswertung (und Schreiben) führen.
+    """
+    if in_key is None:
+        return None
+    return (in_key, _rect_key(view and view[0]), dbg, target_layer.id(),
+            _layer_revision(target_layer), tuple(dists))
+
+
+def _write_distances(target_layer, results, append_new):
+    """
+    Mehrere Abstände: je Abstand ein Objekt, der Abstand im Feld 'buf_dist' (falls
+    vorhanden). Ersetzen überschreibt die ersten Objekte der Reihe nach und legt
+    fehlende an; anhängen legt immer neue an. Ein Abstand, der vorzeitig endet,
+    schreibt nichts; beim Ersetzen bleibt sein Objekt unverändert.
+    """
+    prov = target_layer.dataProvider()
+    idx = target_layer.fields().indexOf("buf_dist")
+    existing = [] if append_new else [f.id() for f in target_layer.getFeatures()]
+    new_feats, n_changed = [], 0
+    written, skipped = ld_core.results_to_write(results)
+    for n, (dist, geom, early) in enumerate(results):
+        if early or geom is None or geom.isEmpty():
+            continue
+        if n < len(existing):
+            prov.changeGeometryValues({existing[n]: geom})
+            if idx >= 0:
+                prov.changeAttributeValues({existing[n]: {idx: dist}})
+            n_changed += 1
+            continue
+        feat = QgsFeature(target_layer.fields())
+        feat.setGeometry(geom)
+        if idx >= 0:
+            feat.setAttribute(idx, dist)
+        new_feats.append(feat)
+    ok = prov.addFeatures(new_feats)[0] if new_feats else True
+    log(lambda: t(f"{len(written)} Abstände geschrieben ({n_changed} überschrieben, "
+                  f"{len(new_feats)} neu, ok={ok}).",
+                  f"{len(written)} distances written ({n_changed} overwritten, "
+                  f"{len(new_feats)} new, ok={ok})."))
+    if skipped:
+        log(lambda: t(f"Vorzeitig beendet, nicht geschrieben: {', '.join(f'{d:g}' for d in skipped)}.",
+                      f"Ended early, not written: {', '.join(f'{d:g}' for d in skipped)}."))
+
+
+def _line_displacement(values, feature, parent, context=None):
+    if len(values) < 9:
+        parent.setEvalErrorString(t(
+            "line_displacement erwartet mindestens 9 Argumente.",
+            "line_displacement expects at least 9 arguments."))
+        return QgsGeometry()
+    (to_move_src,            # 1
+     fixed_src,              # 2
+     target_layer_name,      # 3
+     buf_dist,               # 4
+     min_repl_len,           # 5
+     pre_params,             # 6
+     final_params,           # 7
+     debug_stage,            # 8
+     _log_to_desktop,        # 9 (siehe log_scope in line_displacement)
+     ) = values[:9]
+    options = _read_options(values[9] if len(values) > 9 else None)   # 10
+
+    # 4) Zahl oder array(…) mehrerer Abstände; dynamische Modi rechnen nur den ersten
+    try:
+        dists = ld_core.read_distances(buf_dist)
+    except (TypeError, ValueError):
+        dists = []
+    if not dists:
+        parent.setEvalErrorString(t(f"Ungültiger Verdrängungs-Abstand: {buf_dist!r}",
+                                    f"Invalid displacement distance: {buf_dist!r}"))
+        return QgsGeometry()
+    buf_dist = dists[0]
+
+    if _flag(options.get('render_safe')):
+        dbg = str(debug_stage) if debug_stage is not None else ""
+        try:
+            return _line_displacement_render(parent, context, to_move_src, fixed_src, buf_dist, min_repl_len,
+                                             pre_params, final_params, dbg, options)
+        except Exception as e:
+            log(t(f"Fehler in line_displacement (render_safe): {e}",
+                  f"Error in line_displacement (render_safe): {e}"), LOG_ERROR)
+            log(traceback.format_exc, LOG_ERROR)
+            return QgsGeometry()
+
+    try:
+        # Projekt & Debug
+        project = QgsProject.instance()
+        dbg = str(debug_stage) if debug_stage is not None else ""
+
+        # Zielebene holen – Sichtbarkeit immer erforderlich; Editierbarkeit nur für finalen Modus
+        target_layers = project.mapLayersByName(target_layer_name)
+        if not target_layers:
+            return QgsGeometry()
+        target_layer = target_layers[0]
+        node = project.layerTreeRoot().findLayer(target_layer.id())
+        if node is None or not node.isVisible():
+            return QgsGeometry()
+        # Option 'extent': nur der sichtbare Ausschnitt, dynamisch (ohne Bearbeitungsmodus, ohne Schreiben)
+        view = _visible_window(context, target_layer.crs().authid(), buf_dist, options)
+        # Editierbarkeit nur verlangen, wenn NICHT im 'pre_final'-Debugmodus
+        if dbg != "pre_final" and view is None and not target_layer.isEditable():
+            return QgsGeometry()
+
+        # derselbe Eingabestand wie bei einem früheren Aufruf → gemerktes Ergebnis, nichts neu rechnen
+        in_key = _input_key(project, to_move_src, fixed_src, buf_dist, min_repl_len,
+                            pre_params, final_params, options)
+        res_key = _result_key(in_key, view, dbg, target_layer, dists)
+        hit = _cached_result(res_key)
+        if hit is not None:
+            return hit[0]
+
+        # Log neu starten
+        log_init()
+        if view is not None:
+            log(lambda: t(f"--- line_displacement (Ausschnitt), debug='{dbg}' ---",
+                          f"--- line_displacement (window), debug='{dbg}' ---"))
+            geom, early = _displace_visible(in_key, project, to_move_src, fixed_src, view, buf_dist,
+                                            min_repl_len, pre_params, final_params, options, dbg)
+            _trim_pipeline_cache()
+            _remember_result(res_key, geom, early)
+            return geom
+        log(lambda: t(
+                    f"--- line_displacement: weichend={summarize_source(to_move_src)}, bleibend={summarize_source(fixed_src)}, "
+                    f"buf={dists if len(dists) > 1 else buf_dist}, min_repl_len={min_repl_len}, ziel='{target_layer_name}', debug='{dbg}' ---",
+                    f"--- line_displacement: to_move={summarize_source(to_move_src)}, fixed={summarize_source(fixed_src)}, "
+                    f"buf={dists if len(dists) > 1 else buf_dist}, min_repl_len={min_repl_len}, target='{target_layer_name}', debug='{dbg}' ---"
+                ))
+
+        # 1)–16) Stufen nur bei Bedarf berechnen; Zwischenergebnisse bleiben für
+        # dieselben Eingaben und Parameter gemerkt (Wechsel der Debug-Stufe ohne Neuberechnung).
+        # Mehrere Abstände teilen die gemeinsamen Stufen; angezeigt wird der erste.
+        stage = dbg if (dbg in _STAGES or dbg in STAGE_ALIASES) else "final"
+        results = _run_distances(to_move_src, fixed_src, dists, min_repl_len, pre_params, final_params,
+                                 options, project, stage, None, cached=True, crs=target_layer.crs())
+        _trim_pipeline_cache()
+        final_geom, early = results[0][1], results[0][2]
+
+        # Debug-Stufen und vorzeitige Enden geben die Geometrie zurück, ohne zu schreiben
+        if stage != "final" or all(r[2] for r in results):
+            _remember_result(res_key, final_geom, early)
+            return final_geom
+
+        # 17) Schreiben (nur im finalen Modus)
+        # ------------------- GUI-Option ermitteln -------------------
+        append_new = _append_new(target_layer)
+
+        # mehrere Abstände: je Abstand ein Objekt (vorzeitig geendete bleiben unverändert)
+        if len(dists) > 1:
+            _write_distances(target_layer, results, append_new)
+            _remember_result(_result_key(in_key, view, dbg, target_layer, dists), final_geom, early)
+            return final_geom
+
+        # ------------------- Schreiben entsprechend Wahl -------------------
+        if append_new:
+            # Immer neues Feature anhängen
+            new_feat = QgsFeature(target_layer.fields())
+            new_feat.setGeometry(final_geom)
+            success, added = target_layer.dataProvider().addFeatures([new_feat])
+            if success:
+                log(lambda: t(f"Neues Feature angehängt, ID(s): {[f.id() for f in added]}.",
+                              f"New feature appended, ID(s): {[f.id() for f in added]}."))
+            else:
+                log(lambda: t("Fehler beim Anhängen eines neuen Features.",
+                              "Error appending a new feature."))
+        else:
+            # Bisheriges Verhalten: erstes Feature überschreiben, sonst neu anlegen
+            feats = list(target_layer.getFeatures())
+            if feats:
+                target_id = feats[0].id()
+                target_layer.dataProvider().changeGeometryValues({target_id: final_geom})
+                log(lambda: t(f"Ursprüngliche Geometrie (ID {target_id}) überschrieben.",
+                              f"Original geometry (ID {target_id}) overwritten."))
+            else:
                 new_feat = QgsFeature(target_layer.fields())
                 new_feat.setGeometry(final_geom)
                 success, added = target_layer.dataProvider().addFeatures([new_feat])
                 if success:
-                    log(t(f"Neues Feature angehängt, ID(s): {[f.id() for f in added]}.",
-                          f"New feature appended, ID(s): {[f.id() for f in added]}."))
-                else:
-                    log(t("Fehler beim Anhängen eines neuen Features.",
-                          "Error appending a new feature."))
-            else:
-                # Bisheriges Verhalten: erstes Feature überschreiben, sonst neu anlegen
-                feats = list(target_layer.getFeatures())
-                if feats:
-                    target_id = feats[0].id()
-                    target_layer.dataProvider().changeGeometryValues({target_id: final_geom})
-                    log(t(f"Ursprüngliche Geometrie (ID {target_id}) überschrieben.",
-                          f"Original geometry (ID {target_id}) overwritten."))
+                    log(lambda: t(f"Neues Feature angelegt, ID(s): {[f.id() for f in added]}.",
+                                  f"New feature created, ID(s): {[f.id() for f in added]}."))
                 else:
-                    new_feat = QgsFeature(target_layer.fields())
-                    new_feat.setGeometry(final_geom)
-                    success, added = target_layer.dataProvider().addFeatures([new_feat])
-                    if success:
-                        log(t(f"Neues Feature angelegt, ID(s): {[f.id() for f in added]}.",
-                              f"New feature created, ID(s): {[f.id() for f in added]}."))
-                    else:
-                        log(t("Fehler beim Anlegen eines neuen Features.",
-                              "Error creating a new feature."))
+                    log(lambda: t("Fehler beim Anlegen eines neuen Features.",
+                                  "Error creating a new feature."))
 
+        # gemerkt für den Stand nach dem Schreiben; spätere Bearbeitungen der Zielebene rechnen neu
+        _remember_result(_result_key(in_key, view, dbg, target_layer, dists), final_geom, early)
         return final_geom
 
     except Exception as e:
         log(t(f"Fehler in line_displacement: {e}",
-              f"Error in line_displacement: {e}"))
-        log(traceback.format_exc())
+              f"Error in line_displacement: {e}"), LOG_ERROR)
+        log(traceback.format_exc, LOG_ERROR)
         return QgsGeometry()
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+# Linienverdraengung_algorithmus.py – Linienverdrängung als Processing-Algorithmus
+# (Werkzeugkiste, Modell-Designer, Stapelverarbeitung und qgis_process), ohne
+# Geometriegenerator-Symbol und ohne Neuzeichnen der Zielebene. Registriert wird er
+# über den Processing-Anbieter des Plugins (provider.py).
+#
+#   qgis_process run linedisplacement:line_displacement -- INPUT=strassen.gpkg FIXED=gewaesser.gpkg \
+#       BUF_DIST=12 MIN_REPL_LEN=5 OUTPUT=verdraengt.gpkg
+
+# 1) QGIS / PyQt
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (
+    QgsProcessing,
+    QgsProcessingAlgorithm,
+    QgsProcessingException,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterDefinition,
+    QgsProcessingParameterEnum,
+    QgsProcessingParameterFeatureSink,
+    QgsProcessingParameterFeatureSource,
+    QgsProcessingParameterFileDestination,
+    QgsProcessingParameterNumber,
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsFeatureSink,
+    QgsField,
+    QgsFields,
+    QgsGeometry,
+    QgsProject,
+    QgsSettings,
+    QgsWkbTypes,
+)
+
+# 2) Verdrängung selbst: aus dem Plugin-Ordner (Sitzungsimport) oder aus <Profil>/python/expressions
+try:
+    import Linienverdraengung as LV
+except ImportError:
+    try:
+        from expressions import Linienverdraengung as LV
+    except ImportError:
+        LV = None
+
+# Standardwerte der Fragmentverknüpfung, dieselben wie im Dialog (ld_core.MERGE_DEFAULTS)
+try:
+    import ld_core
+except ImportError:
+    from expressions import ld_core
+
+
+class LineDisplacementAlgorithm(QgsProcessingAlgorithm):
+    """
+    siehe unten bei shortHelpString
+    see below at shortHelpString
+    """
+
+    # ---------------- Sprachhilfen / Language helpers ----------------
+    @staticmethod
+    def _lang():
+        try:
+            loc = QgsSettings().value("locale/userLocale", "en")
+            return str(loc)[:2].lower()
+        except Exception:
+            return "en"
+
+    def _t(self, de: str, en: str) -> str:
+        return de if self._lang() == "de" else en
+
+    # ---------------- Parameter-Schlüssel / Parameter keys ----------------
+    INPUT = 'INPUT'
+    FIXED = 'FIXED'
+    BUF_DIST = 'BUF_DIST'
+    MIN_REPL_LEN = 'MIN_REPL_LEN'
+    DEBUG_STAGE = 'DEBUG_STAGE'
+    WRITE_LOG = 'WRITE_LOG'
+    PREFILTER = 'PREFILTER'
+    FIXED_STRATEGY = 'FIXED_STRATEGY'
+    BACKEND = 'BACKEND'
+    TILES = 'TILES'
+    WORKERS = 'WORKERS'
+    EXPORT_GPKG = 'EXPORT_GPKG'
+    METRICS_FILE = 'METRICS_FILE'
+    OUTPUT = 'OUTPUT'
+
+    # Parameterbündel der Vor- (PRE_) und Schlussverknüpfung (FINAL_), Reihenfolge wie im Ausdruck
+    MERGE_KEYS = ('TOLERANCE', 'ANGLE_TOL', 'SIMPLIFY_TOL', 'MAX_ITERS', 'SPLIT_AT_NODES', 'EVEN_ONLY')
+
+    # Debug-Stufen wie im Dialog (8. Argument von line_displacement)
+    DEBUG_STAGES = (
+        "final", "union_to_move", "union_fixed", "fixed_buffer_poly", "fixed_boundary",
+        "to_move_in_buffer", "loops", "loops_union", "loops_buffer", "buffer_blobs",
+        "used_blobs", "unused_blobs", "boundary_segments", "segments_to_move",
+        "replacement_segments", "rejected_replacements", "crossers", "rest", "pre_final",
+    )
+    FIXED_STRATEGIES = ('auto', 'union', 'indexed')
+    BACKENDS = ('qgis', 'shapely', 'auto')
+
+    # ---------------- Metadaten / Metadata ----------------
+    def name(self):
+        return 'line_displacement'
+
+    def displayName(self):
+        return self._t('Linien verdrängen', 'Displace lines')
+
+    def group(self):
+        return self._t('Kartografie', 'Cartography')
+
+    def groupId(self):
+        return 'kartografie'
+
+    def shortHelpString(self):
+        return self._t(
+            "Verdrängt Linien (z. B. Straßen) aus einem Puffer um bleibende Objekte (z. B. Gewässer): Abschnitte im Puffer werden durch Stücke der Pufferkontur ersetzt. Die Parameter entsprechen den Argumenten der Ausdrucksfunktion line_displacement; die Fragmente können vorher und nachher geradeaus verknüpft werden (0 Iterationen = aus).\nDas Ergebnis ist ein Objekt mit der gesamten verdrängten Geometrie. Mit einer Debug-Stufe wird stattdessen das Zwischenergebnis dieser Stufe ausgegeben.",
+            "Displaces lines (e.g. roads) out of a buffer around fixed features (e.g. rivers): sections inside the buffer are replaced by pieces of the buffer boundary. The parameters match the arguments of the expression function line_displacement; fragments can be connected straight ahead before and after (0 iterations = off).\nThe result is one feature holding the whole displaced geometry. With a debug stage, the intermediate result of that stage is written instead."
+        )
+
+    def createInstance(self):
+        return LineDisplacementAlgorithm()
+
+    # ---------------- Bedienoberfläche / GUI definition ----------------
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.INPUT,
+            self._t('Zu verdrängende Linien', 'Lines to be displaced'),
+            [QgsProcessing.TypeVectorLine]
+        ))
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.FIXED,
+            self._t('Bleibende Geometrie', 'Fixed geometry'),
+            [QgsProcessing.TypeVectorAnyGeometry]
+        ))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.BUF_DIST,
+            self._t('Verdrängungs-Abstand (Karteneinheiten)', 'Displacement distance (map units)'),
+            QgsProcessingParameterNumber.Double,
+            defaultValue=10.0, minValue=0.0
+        ))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.MIN_REPL_LEN,
+            self._t('Mindestlänge verdrängter Strecken', 'Minimum length of displaced segments'),
+            QgsProcessingParameterNumber.Double,
+            defaultValue=0.0, minValue=0.0
+        ))
+
+        # Vor- und Schlussverknüpfung (je 6 Werte wie array(...) im Ausdruck)
+        tol, ang, simpl, iters, split, even = ld_core.MERGE_DEFAULTS
+        for prefix, de, en in (('PRE_', 'vorher', 'before'), ('FINAL_', 'nachher', 'after')):
+            self.addParameter(QgsProcessingParameterNumber(
+                prefix + 'TOLERANCE',
+                self._t(f'Fragmente verknüpfen {de}: Toleranz gegenüber Löchern',
+                        f'Connect fragments {en}: tolerance for holes'),
+                QgsProcessingParameterNumber.Double,
+                defaultValue=tol, minValue=0.0
+            ))
+            self.addParameter(QgsProcessingParameterNumber(
+                prefix + 'ANGLE_TOL',
+                self._t(f'Fragmente verknüpfen {de}: maximale Winkelabweichung (Grad)',
+                        f'Connect fragments {en}: maximum angle deviation (degrees)'),
+                QgsProcessingParameterNumber.Double,
+                defaultValue=ang, minValue=0.0, maxValue=180.0
+            ))
+            self.addParameter(QgsProcessingParameterNumber(
+                prefix + 'SIMPLIFY_TOL',
+                self._t(f'Fragmente verknüpfen {de}: vereinfachende Betrachtung',
+                        f'Connect fragments {en}: simplified assessment'),
+                QgsProcessingParameterNumber.Double,
+                defaultValue=simpl, minValue=0.0
+            ))
+            self.addParameter(QgsProcessingParameterNumber(
+                prefix + 'MAX_ITERS',
+                self._t(f'Fragmente verknüpfen {de}: maximale Iterationen (0 = aus)',
+                        f'Connect fragments {en}: maximum iterations (0 = off)'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=iters, minValue=0
+            ))
+            self.addParameter(QgsProcessingParameterBoolean(
+                prefix + 'SPLIT_AT_NODES',
+                self._t(f'Fragmente verknüpfen {de}: vorab an Kreuzungen zerlegen',
+                        f'Connect fragments {en}: initially split at intersections'),
+                defaultValue=split
+            ))
+            self.addParameter(QgsProcessingParameterBoolean(
+                prefix + 'EVEN_ONLY',
+                self._t(f'Fragmente verknüpfen {de}: ungerade Kreuzungen nicht verknüpfen',
+                        f'Connect fragments {en}: don’t connect uneven intersections'),
+                defaultValue=even
+            ))
+
+        self.addParameter(QgsProcessingParameterBoolean(
+            self.WRITE_LOG,
+            self._t('Logdatei auf Desktop schreiben', 'Write log file to desktop'),
+            defaultValue=False
+        ))
+
+        # Fortgeschritten: Debug-Stufe und Optionen (10. Argument von line_displacement)
+        advanced = [
+            QgsProcessingParameterEnum(
+                self.DEBUG_STAGE,
+                self._t('Debug-Stufe (Zwischenergebnis ausgeben)', 'Debug stage (output intermediate result)'),
+                options=list(self.DEBUG_STAGES),
+                defaultValue=0
+            ),
+            QgsProcessingParameterBoolean(
+                self.PREFILTER,
+                self._t('Weit entfernte Teile direkt durchreichen', 'Pass far-away parts straight through'),
+                defaultValue=True
+            ),
+            QgsProcessingParameterEnum(
+                self.FIXED_STRATEGY,
+                self._t('Puffer um die bleibende Geometrie', 'Buffer around fixed geometry'),
+                options=list(self.FIXED_STRATEGIES),
+                defaultValue=0
+            ),
+            QgsProcessingParameterEnum(
+                self.BACKEND,
+                self._t('Geometrie-Backend', 'Geometry backend'),
+                options=list(self.BACKENDS),
+                defaultValue=0
+            ),
+            QgsProcessingParameterBoolean(
+                self.TILES,
+                self._t('In Kacheln parallel rechnen', 'Compute in parallel tiles'),
+                defaultValue=False
+            ),
+            QgsProcessingParameterNumber(
+                self.WORKERS,
+                self._t('Prozesse für Kacheln (0 = automatisch)', 'Processes for tiles (0 = automatic)'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=0, minValue=0
+            ),
+            QgsProcessingParameterFileDestination(
+                self.EXPORT_GPKG,
+                self._t('Alle Debug-Stufen ins GeoPackage exportieren', 'Export all debug stages to GeoPackage'),
+                fileFilter='GeoPackage (*.gpkg)',
+                optional=True,
+                createByDefault=False
+            ),
+            QgsProcessingParameterFileDestination(
+                self.METRICS_FILE,
+                self._t('Kennzahlen je Stufe (JSON-Zeilen)', 'Metrics per stage (JSON lines)'),
+                fileFilter='JSON Lines (*.jsonl)',
+                optional=True,
+                createByDefault=False
+            ),
+        ]
+        for p in advanced:
+            p.setFlags(p.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+            self.addParameter(p)
+
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT,
+            self._t('Verdrängte Linien', 'Displaced lines'),
+            type=QgsProcessing.TypeVectorAnyGeometry
+        ))
+
+    # ---------------- Hilfsfunktionen / Helper functions ----------------
+    def _merge_params(self, parameters, context, prefix):
+        """Parameterbündel [Toleranz, Winkel, Vereinfachung, Iterationen, zerlegen, nur gerade]."""
+        return [
+            self.parameterAsDouble(parameters, prefix + 'TOLERANCE', context),
+            self.parameterAsDouble(parameters, prefix + 'ANGLE_TOL', context),
+            self.parameterAsDouble(parameters, prefix + 'SIMPLIFY_TOL', context),
+            self.parameterAsInt(parameters, prefix + 'MAX_ITERS', context),
+            self.parameterAsBool(parameters, prefix + 'SPLIT_AT_NODES', context),
+            self.parameterAsBool(parameters, prefix + 'EVEN_ONLY', context),
+        ]
+
+    @staticmethod
+    def _collect_source(source, request, feedback):
+        """Alle nicht leeren Geometrien der Quelle als eine Sammlung (wie aggregate(..., 'collect'))."""
+        geoms = []
+        for feat in source.getFeatures(request):
+            if feedback.isCanceled():
+                break
+            g = feat.geometry()
+            if g and not g.isEmpty():
+                geoms.append(g)
+        return QgsGeometry.collectGeometry(geoms) if geoms else QgsGeometry()
+
+    # ---------------- Verarbeitung / Processing ----------------
+    def processAlgorithm(self, parameters, context, feedback):
+        if LV is None:
+            raise QgsProcessingException(self._t(
+                "Linienverdraengung.py nicht gefunden – bitte die Skripte über das Plugin installieren.",
+                "Linienverdraengung.py not found – please install the scripts via the plugin."))
+
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        if source is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+        fixed = self.parameterAsSource(parameters, self.FIXED, context)
+        if fixed is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.FIXED))
+
+        crs = source.sourceCrs()
+        buf_dist = self.parameterAsDouble(parameters, self.BUF_DIST, context)
+        min_repl_len = self.parameterAsDouble(parameters, self.MIN_REPL_LEN, context)
+        pre = self._merge_params(parameters, context, 'PRE_')
+        fin = self._merge_params(parameters, context, 'FINAL_')
+        stage = self.DEBUG_STAGES[self.parameterAsEnum(parameters, self.DEBUG_STAGE, context)]
+        options = {
+            'prefilter': self.parameterAsBool(parameters, self.PREFILTER, context),
+            'fixed_strategy': self.FIXED_STRATEGIES[self.parameterAsEnum(parameters, self.FIXED_STRATEGY, context)],
+            'backend': self.BACKENDS[self.parameterAsEnum(parameters, self.BACKEND, context)],
+            'tiles': self.parameterAsBool(parameters, self.TILES, context),
+            'workers': self.parameterAsInt(parameters, self.WORKERS, context),
+            'export_gpkg': self.parameterAsFileOutput(parameters, self.EXPORT_GPKG, context) or '',
+            'metrics': self.parameterAsFileOutput(parameters, self.METRICS_FILE, context) or False,
+        }
+
+        write_log = self.parameterAsBool(parameters, self.WRITE_LOG, context)
+        with LV.log_scope(write_log):   # Processing rechnet im Hintergrund-Thread: nur für diesen Lauf
+            LV.log_init()
+
+        # 1) Eingaben lesen: weichend im eigenen KBS, bleibend dorthin transformiert
+        to_move = self._collect_source(source, QgsFeatureRequest(), feedback)
+        if feedback.isCanceled():
+            return {}
+        if to_move.isEmpty():
+            raise QgsProcessingException(self._t("Keine zu verdrängenden Geometrien.", "No geometries to displace."))
+        req = QgsFeatureRequest().setDestinationCrs(crs, context.transformContext())
+        if options['prefilter']:
+            # nur bleibende Objekte in Reichweite beim Provider anfordern
+            req.setFilterRect(to_move.boundingBox().buffered(abs(buf_dist)))
+        fixed_geom = self._collect_source(fixed, req, feedback)
+        if feedback.isCanceled():
+            return {}
+        feedback.pushInfo(self._t(
+            f"Weichend: {LV.summarize_source(to_move)}, bleibend: {LV.summarize_source(fixed_geom)}",
+            f"To move: {LV.summarize_source(to_move)}, fixed: {LV.summarize_source(fixed_geom)}"))
+
+        # 2) Stufen 1–16; eigenes Projekt (nur KBS), damit nichts am laufenden Projekt hängt
+        if fixed_geom.isEmpty():
+            feedback.pushInfo(self._t("Keine bleibenden Geometrien in Reichweite; Eingabe unverändert.",
+                                      "No fixed geometries in range; input unchanged."))
+            geom, early = to_move, True
+        else:
+            project = QgsProject()
+            project.setCrs(crs)
+            try:
+                geom, early = LV.run_line_displacement(to_move, fixed_geom, buf_dist, min_repl_len,
+                                                       pre, fin, options, project, stage, feedback,
+                                                       log_enabled=write_log)
+            except LV.DisplacementCanceled:
+                raise QgsProcessingException(self._t("Abgebrochen.", "Canceled."))
+        if early:
+            feedback.pushInfo(self._t("Vorzeitiges Ende der Verdrängung (siehe Log).",
+                                      "Displacement ended early (see log)."))
+
+        # 3) Ausgabe: ein Objekt mit der gesamten Geometrie (wie in der Zielebene des Dialogs)
+        fields = QgsFields()
+        fields.append(QgsField('stage', QVariant.String))
+        fields.append(QgsField('buf_dist', QVariant.Double))
+        wkb_type = (QgsWkbTypes.multiType(geom.wkbType()) if geom and not geom.isEmpty()
+                    else QgsWkbTypes.MultiLineString)
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, fields, wkb_type, crs)
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+        if geom and not geom.isEmpty():
+            out = QgsGeometry(geom)
+            out.convertToMultiType()
+            feat = QgsFeature(fields)
+            feat.setGeometry(out)
+            feat.setAttributes([stage, buf_dist])
+            sink.addFeature(feat, QgsFeatureSink.FastInsert)
+        feedback.setProgress(100)
+        return {self.OUTPUT: dest_id}
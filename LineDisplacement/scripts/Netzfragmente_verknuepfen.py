@@ -1,14 +1,16 @@
 # -*- coding: utf-8 -*-
 # 1) Standardbibliothek
+import json
 import math
 import os
 import tempfile
+import time
 from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 
 # 2) QGIS / PyQt
-from qgis.PyQt.QtCore import QVariant
+from qgis.PyQt.QtCore import QCoreApplication, QThread, QVariant
 from qgis.core import (   # Ihre strukturierte Liste von oben
     QgsProcessing,
     QgsProcessingAlgorithm,
@@ -17,6 +19,7 @@ from qgis.core import (   # Ihre strukturierte Liste von oben
     QgsProcessingParameterEnum,
     QgsProcessingParameterExpression,
     QgsProcessingParameterFeatureSink,
+    QgsProcessingParameterFileDestination,
     QgsProcessingParameterNumber,
     QgsProcessingParameterVectorLayer,
     QgsFeature,
@@ -35,6 +38,12 @@ from qgis.core import (   # Ihre strukturierte Liste von oben
 # 3) QGIS utils (UI-spezifisch)
 from qgis.utils import iface
 
+# 4) gemeinsames, gepuffertes Logging des Plugins (falls geladen); sonst direktes Schreiben
+try:
+    import ld_logging
+except ImportError:
+    ld_logging = None
+
 class MergeLinesByDirection(QgsProcessingAlgorithm):
     """
     siehe unten bei shortHelpString
@@ -69,6 +78,8 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
     DRY_RUN = 'DRY_RUN'
     WRITE_LOG = 'WRITE_LOG'
     PRUNE_SHORT = 'PRUNE_SHORT'
+    METRICS_FILE = 'METRICS_FILE'
+    TRACE_MEMORY = 'TRACE_MEMORY'
 
     # ---------------- Metadaten / Metadata ----------------
     def name(self):
@@ -96,15 +107,23 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
         return MergeLinesByDirection()
 
     # ---------------- Bedienoberfläche / GUI definition ----------------
+    @staticmethod
+    def _on_main_thread():
+        app = QCoreApplication.instance()
+        return app is not None and QThread.currentThread() == app.thread()
+
     def initAlgorithm(self, config=None):
-        # Aktive Linienebene als Default ermitteln (falls vorhanden)
+        # Aktive Linienebene als Default ermitteln (falls vorhanden). Nicht bei
+        # create({'headless': True}) (Ausdruck, Benchmarks) und nicht außerhalb des
+        # Hauptthreads – iface ist dort (Worker, Rendering) nicht zu verwenden.
         default_layer = None
-        try:
-            al = iface.activeLayer()
-            if isinstance(al, QgsVectorLayer) and al.geometryType() == QgsWkbTypes.LineGeometry:
-                default_layer = al
-        except Exception:
-            pass
+        if not (config or {}).get('headless') and self._on_main_thread():
+            try:
+                al = iface.activeLayer()
+                if isinstance(al, QgsVectorLayer) and al.geometryType() == QgsWkbTypes.LineGeometry:
+                    default_layer = al
+            except Exception:
+                pass
 
         p_in = QgsProcessingParameterVectorLayer(
             self.INPUT,
@@ -200,6 +219,24 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
             self._t('Logdatei auf Desktop schreiben', 'Write log file to desktop'),
             defaultValue=False
         ))
+
+        p_metrics = QgsProcessingParameterFileDestination(
+            self.METRICS_FILE,
+            self._t('Kennzahlen je Phase (JSON-Zeilen)', 'Metrics per phase (JSON lines)'),
+            fileFilter='JSON Lines (*.jsonl)',
+            optional=True,
+            createByDefault=False
+        )
+        p_metrics.setFlags(p_metrics.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(p_metrics)
+
+        p_mem = QgsProcessingParameterBoolean(
+            self.TRACE_MEMORY,
+            self._t('Speicher je Phase messen (Python-Spitze, RSS)', 'Trace memory per phase (Python peak, RSS)'),
+            defaultValue=False
+        )
+        p_mem.setFlags(p_mem.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(p_mem)
         
         self.addParameter(QgsProcessingParameterEnum(
             'DEBUG_STAGE',
@@ -409,8 +446,33 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
             return home
         return Path(tempfile.gettempdir())
 
+    @staticmethod
+    def _rss_bytes():
+        """Aktueller Arbeitsspeicher (RSS) in Byte, sonst None. / Current resident set size in bytes, else None."""
+        return ld_logging.rss_bytes() if ld_logging is not None else None
+
     # ---------------- Hauptablauf / Main processing ----------------
     def processAlgorithm(self, parameters, context, feedback):
+        # tracemalloc nur beenden, wenn dieser Lauf es gestartet hat – auch bei Fehlern und Abbruch
+        # Stop tracemalloc only if this run started it – also on errors and cancel
+        trace_memory = bool(parameters.get(self.TRACE_MEMORY)) and \
+            self.parameterAsBoolean(parameters, self.TRACE_MEMORY, context)
+        mem_started = False
+        if trace_memory:
+            import tracemalloc
+            mem_started = not tracemalloc.is_tracing()
+            if mem_started:
+                tracemalloc.start()
+        try:
+            return self._process(parameters, context, feedback, trace_memory)
+        finally:
+            if mem_started:
+                import tracemalloc
+                tracemalloc.stop()
+            if ld_logging is not None:
+                ld_logging.flush()   # Protokoll vollständig, bevor Processing das Ergebnis meldet
+
+    def _process(self, parameters, context, feedback, trace_memory):
         # Parameter einlesen / Read parameters
         src = self.parameterAsVectorLayer(parameters, self.INPUT, context)
         selected_only = self.parameterAsBoolean(parameters, self.SELECTED_ONLY, context)
@@ -426,6 +488,9 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
         dry_run = self.parameterAsBoolean(parameters, self.DRY_RUN, context)
         write_log = self.parameterAsBoolean(parameters, self.WRITE_LOG, context)
         debug_stage = self.parameterAsEnum(parameters, 'DEBUG_STAGE', context)
+        metrics_path = ""
+        if parameters.get(self.METRICS_FILE):
+            metrics_path = self.parameterAsFileOutput(parameters, self.METRICS_FILE, context) or ""
 
         # Protokoll / Log file
         logf = None
@@ -439,15 +504,28 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
             except Exception:
                 log_path = Path(tempfile.gettempdir()) / f"MergeLines_Debug_{ts}.txt"
                 logf = open(log_path, "w", encoding="utf-8")
+            if ld_logging is not None:
+                # Datei ist angelegt; Zeilen schreibt ab hier der Hintergrund-Thread
+                # File exists now; lines are appended by the background writer from here on
+                logf.close()
+        log_on = logf is not None
+        lang_de = self._lang() == "de"
 
         def log(msg_de, msg_en=None):
-            """Schreibt mehrsprachige Meldungen; fällt auf DE/EN zurück.
-            Writes bilingual messages; falls back to DE/EN."""
-            if not logf:
+            """Schreibt mehrsprachige Meldungen; fällt auf DE/EN zurück. msg_de darf eine
+            Funktion sein, die (de, en) liefert – sie wird nur bei aktivem Log aufgerufen.
+            Writes bilingual messages; falls back to DE/EN. msg_de may be a function
+            returning (de, en) – it is only called when logging is on."""
+            if not log_on:
                 return
             try:
-                text = msg_de if self._lang() == "de" else (msg_en if msg_en is not None else msg_de)
-                logf.write(str(text) + "\n")
+                if callable(msg_de):
+                    msg_de, msg_en = msg_de()
+                text = msg_de if lang_de else (msg_en if msg_en is not None else msg_de)
+                if ld_logging is not None:
+                    ld_logging.write(log_path, str(text) + "\n")
+                else:
+                    logf.write(str(text) + "\n")
             except Exception:
                 pass
 
@@ -482,6 +560,62 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
         chains = {}  # chain_id -> list of QgsPointXY
         next_chain_id = 0
 
+        # Kennzahlen je Phase / Metrics per phase (JSON lines)
+        run_id = datetime.now().isoformat(timespec="seconds")
+        phase_state = {}
+
+        def chain_size():
+            return len(chains), sum(len(pts) for pts in chains.values())
+
+        def phase_begin():
+            if metrics_path or trace_memory:
+                phase_state['t0'] = time.perf_counter()
+                phase_state['in'] = chain_size()
+            if trace_memory:
+                import tracemalloc
+                try:
+                    tracemalloc.reset_peak()   # ab Python 3.9 / Python 3.9+
+                except AttributeError:
+                    pass
+                phase_state['mem'] = (tracemalloc.get_traced_memory()[0], self._rss_bytes())
+
+        def phase_end(name, **extra):
+            """Hängt Laufzeit und Ketten-/Stützpunktzahlen der Phase als JSON-Zeile an.
+            Appends wall time and chain/vertex counts of the phase as a JSON line."""
+            if not (metrics_path or trace_memory):
+                return
+            n_in, v_in = phase_state.get('in', (0, 0))
+            n_out, v_out = chain_size()
+            rec = {
+                "source": "merge_lines_by_direction",
+                "run": run_id,
+                "stage": name,
+                "seconds": round(time.perf_counter() - phase_state.get('t0', time.perf_counter()), 6),
+                "in_parts": n_in,
+                "in_vertices": v_in,
+                "out_parts": n_out,
+                "out_vertices": v_out,
+            }
+            rec.update(extra)
+            if trace_memory and 'mem' in phase_state:
+                import tracemalloc
+                py0, rss0 = phase_state.pop('mem')
+                rss1 = self._rss_bytes()
+                rec["py_peak_bytes"] = max(tracemalloc.get_traced_memory()[1] - py0, 0)
+                rec["rss_delta_bytes"] = (rss1 - rss0) if (rss0 is not None and rss1 is not None) else None
+                rss_txt = "–" if rec["rss_delta_bytes"] is None else f"{rec['rss_delta_bytes'] / 1048576.0:.1f} MB"
+                log(f"Speicher '{name}': Python-Spitze {rec['py_peak_bytes'] / 1048576.0:.1f} MB, RSS Δ {rss_txt}",
+                    f"Memory '{name}': Python peak {rec['py_peak_bytes'] / 1048576.0:.1f} MB, RSS Δ {rss_txt}")
+            if not metrics_path:
+                return
+            try:
+                with open(metrics_path, "a", encoding="utf-8") as mf:
+                    mf.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            except Exception as e:
+                log(f"Kennzahlen nicht geschrieben: {e}", f"Metrics not written: {e}")
+
+        phase_begin()
+
         def add_feature_geometry(g):
             nonlocal next_chain_id
             for pl in self._as_lines(g):
@@ -510,10 +644,20 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                 req.setFilterExpression(str(expr))
             count_src = 0
             for f in src.getFeatures(req):
+                if feedback.isCanceled():
+                    break
                 add_feature_geometry(f.geometry())
                 count_src += 1
             log(f"Eingabe-Ebene (einzeln): {count_src} Objekte gelesen.",
                 f"Input layer (single): read {count_src} features.")
+            phase_end("input", features=count_src)
+
+        # Abbruch beim Einlesen: nichts verarbeiten und keine Teilmenge ausgeben
+        if feedback.isCanceled():
+            log("Abgebrochen beim Einlesen – keine Ausgabe.", "Canceled while reading – no output.")
+            if logf:
+                logf.close()
+            return {}
 
         if not chains:
             log("Keine Liniengeometrien gefunden.", "No line geometries found.")
@@ -568,6 +712,7 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
 
         # ---------- Initiale Netzzerlegung (OHNE Vereinfachung: Originalgeometrie) ----------
         if split_at_nodes:
+            phase_begin()
             # 1) Alle Stützpunkte der Originalgeometrie sammeln
             verts = []  # {'chain_id','idx','pt','is_end'}
             for cid, pts in chains.items():
@@ -653,9 +798,11 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
             else:
                 log("Vorverarbeitung: keine Ketten zu trennen.",
                     "Pre-processing: nothing to split.")
+            phase_end("split", clusters_checked=considered, matches=matches)
 
         # ---- Nachbearbeitung Zerlegung: sehr kurze Segmente entfernen ----
         if split_at_nodes and prune_short:
+            phase_begin()
             removed_cnt = 0
             new_chains = {}
             new_id = 0
@@ -674,6 +821,7 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                           f"(< {tol}); remaining: {len(chains)}.")
                 log(msg_de, msg_en)
                 feedback.pushInfo(self._t(msg_de, msg_en))
+            phase_end("prune", removed=removed_cnt)
 
         # DEBUG-Stufe 2: nach Zerlegung ausgeben und beenden
         if debug_stage == 2:
@@ -693,7 +841,13 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
         eps = max(tol * 0.1, 1e-12)
 
         while iters_done < max_iters:
+            if feedback.isCanceled():
+                log("Abgebrochen – bisherige Ketten werden ausgegeben.",
+                    "Canceled – writing the chains so far.")
+                break
+            feedback.setProgress(100.0 * iters_done / max_iters)
             iters_done += 1
+            phase_begin()
 
             # Endpunkte sammeln; Winkel aus vereinfachter Geometrie / Collect endpoints; angles from simplified geometry
             stubs = []
@@ -712,6 +866,7 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
 
             if not stubs:
                 log("Keine Endpunkte mehr vorhanden.", "No endpoints left.")
+                phase_end(f"iteration_{iters_done}", merges=0)
                 break
 
             # Cluster bilden / Build clusters
@@ -739,8 +894,9 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
             for cl_id, lst in clusters.items():
                 # nur bei gerader Anzahl Endpunkte / only with even number of endpoints
                 if even_only and (len(lst) % 2 == 1):
-                    log(f"Parität: Cluster {cl_id} hat {len(lst)} Endpunkte (ungerade) – übersprungen.",
-                        f"Parity: cluster {cl_id} has {len(lst)} endpoints (odd) – skipped.")
+                    if log_on:
+                        log(f"Parität: Cluster {cl_id} hat {len(lst)} Endpunkte (ungerade) – übersprungen.",
+                            f"Parity: cluster {cl_id} has {len(lst)} endpoints (odd) – skipped.")
                     continue
                 if len(lst) == 2:
                     a, b = lst[0], lst[1]
@@ -749,7 +905,7 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                     if deviation <= ang_tol:
                         planned_pairs.append((a, b))
                         two_ct += 1
-                    else:
+                    elif log_on:
                         log(f"Zweierknoten übersprungen: Cluster {cl_id}, Abweichung {deviation:.2f}° > {ang_tol}°",
                             f"Two-end cluster skipped: cluster {cl_id}, deviation {deviation:.2f}° > {ang_tol}°")
             log(f"Zweifingerige Knoten (verbunden): {two_ct}",
@@ -761,38 +917,41 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
             for cl_id, lst in clusters.items():
                 # nur bei gerader Anzahl Endpunkte / only with even number of endpoints
                 if even_only and (len(lst) % 2 == 1):
-                    log(f"Parität: Cluster {cl_id} hat {len(lst)} Endpunkte (ungerade) – übersprungen.",
-                        f"Parity: cluster {cl_id} has {len(lst)} endpoints (odd) – skipped.")
+                    if log_on:
+                        log(f"Parität: Cluster {cl_id} hat {len(lst)} Endpunkte (ungerade) – übersprungen.",
+                            f"Parity: cluster {cl_id} has {len(lst)} endpoints (odd) – skipped.")
                     continue
                 if len(lst) >= 3:
                     multi_ct += 1
                     best_pair = None
                     best_dev = None
+                    best_delta = None
                     n = len(lst)
-                    best_descr_de = None
-                    best_descr_en = None
                     for i in range(n):
                         for j in range(i + 1, n):
-                            a_ang = lst[i]['angle']
-                            b_ang = lst[j]['angle']
-                            delta = self._angle_diff(a_ang, b_ang)
+                            delta = self._angle_diff(lst[i]['angle'], lst[j]['angle'])
                             deviation = abs(180.0 - delta)
                             if (best_dev is None) or (deviation < best_dev):
                                 best_dev = deviation
+                                best_delta = delta
                                 best_pair = (lst[i], lst[j])
-                                best_descr_de = (f"Cluster {cl_id}: Winkel A={a_ang:.2f}°, B={b_ang:.2f}°, "
-                                                 f"Δ={delta:.2f}°, Abweichung von 180°={deviation:.2f}°")
-                                best_descr_en = (f"Cluster {cl_id}: angle A={a_ang:.2f}°, B={b_ang:.2f}°, "
-                                                 f"Δ={delta:.2f}°, deviation from 180°={deviation:.2f}°")
                     if best_pair is not None:
                         if best_dev <= ang_tol:
                             planned_pairs.append(best_pair)
                             chosen_ct += 1
-                            log(f"Gewählt: {best_descr_de} (≤ {ang_tol}°)",
-                                f"Chosen: {best_descr_en} (≤ {ang_tol}°)")
-                        else:
-                            log(f"Übersprungen (zu „un-gerade“): {best_descr_de} (> {ang_tol}°)",
-                                f"Skipped (not straight enough): {best_descr_en} (> {ang_tol}°)")
+                        if log_on:
+                            # Beschreibung nur bei aktivem Log bauen / build description only when logging
+                            a_ang, b_ang = best_pair[0]['angle'], best_pair[1]['angle']
+                            best_descr_de = (f"Cluster {cl_id}: Winkel A={a_ang:.2f}°, B={b_ang:.2f}°, "
+                                             f"Δ={best_delta:.2f}°, Abweichung von 180°={best_dev:.2f}°")
+                            best_descr_en = (f"Cluster {cl_id}: angle A={a_ang:.2f}°, B={b_ang:.2f}°, "
+                                             f"Δ={best_delta:.2f}°, deviation from 180°={best_dev:.2f}°")
+                            if best_dev <= ang_tol:
+                                log(f"Gewählt: {best_descr_de} (≤ {ang_tol}°)",
+                                    f"Chosen: {best_descr_en} (≤ {ang_tol}°)")
+                            else:
+                                log(f"Übersprungen (zu „un-gerade“): {best_descr_de} (> {ang_tol}°)",
+                                    f"Skipped (not straight enough): {best_descr_en} (> {ang_tol}°)")
             log(f"Mehrfingrige Knoten: {multi_ct}, davon verbindbar: {chosen_ct}",
                 f"Multi-end clusters: {multi_ct}, connectable: {chosen_ct}")
 
@@ -803,6 +962,7 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                 else:
                     log("Keine geplanten Verschmelzungen – Ende.",
                         "No planned merges – stopping.")
+                phase_end(f"iteration_{iters_done}", clusters=len(clusters), merges=0)
                 break
 
             # Geplante Verschmelzungen anwenden (Distanzbremse + Snapping) / Apply planned merges (distance gate + snapping)
@@ -813,16 +973,19 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                 keyA = (a['chain_id'], a['end'])
                 keyB = (b['chain_id'], b['end'])
                 if keyA in used_stub or keyB in used_stub:
-                    log(f"Konflikt: Stub bereits verwendet, überspringe Paar {keyA} – {keyB}.",
-                        f"Conflict: stub already used, skipping pair {keyA} – {keyB}.")
+                    if log_on:
+                        log(f"Konflikt: Stub bereits verwendet, überspringe Paar {keyA} – {keyB}.",
+                            f"Conflict: stub already used, skipping pair {keyA} – {keyB}.")
                     continue
                 if a['chain_id'] == b['chain_id']:
-                    log(f"Selbstverbindung ignoriert: Kette {a['chain_id']} an sich selbst.",
-                        f"Self-connection ignored: chain {a['chain_id']} to itself.")
+                    if log_on:
+                        log(f"Selbstverbindung ignoriert: Kette {a['chain_id']} an sich selbst.",
+                            f"Self-connection ignored: chain {a['chain_id']} to itself.")
                     continue
                 if a['chain_id'] not in chains or b['chain_id'] not in chains:
-                    log(f"Nicht mehr vorhanden: {a['chain_id']} oder {b['chain_id']}.",
-                        f"Not present anymore: {a['chain_id']} or {b['chain_id']}.")
+                    if log_on:
+                        log(f"Nicht mehr vorhanden: {a['chain_id']} oder {b['chain_id']}.",
+                            f"Not present anymore: {a['chain_id']} or {b['chain_id']}.")
                     continue
 
                 ptsA = chains[a['chain_id']]
@@ -835,8 +998,9 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                 # Distanzbremse / Distance gate
                 gap = math.hypot(pA.x() - pB.x(), pA.y() - pB.y())
                 if gap > tol:
-                    log(f"Übersprungen wegen Distanz: {gap:.6f} > Toleranz {tol}",
-                        f"Skipped due to distance: {gap:.6f} > tolerance {tol}")
+                    if log_on:
+                        log(f"Übersprungen wegen Distanz: {gap:.6f} > Toleranz {tol}",
+                            f"Skipped due to distance: {gap:.6f} > tolerance {tol}")
                     continue
 
                 # Snap auf Cluster-Mittelpunkt / Snap to cluster center
@@ -853,12 +1017,12 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                 else:
                     ptsB[-1] = cpt
 
-                lenA = self._polyline_length(ptsA)
-                lenB = self._polyline_length(ptsB)
+                if log_on:
+                    lenA = self._polyline_length(ptsA)
+                    lenB = self._polyline_length(ptsB)
 
                 new_pts = self._connect_lines(ptsA, a['end'], ptsB, b['end'])
                 new_pts = self._dedupe_consecutive(new_pts, eps)
-                new_len = self._polyline_length(new_pts)
 
                 chains[a['chain_id']] = new_pts
                 del chains[b['chain_id']]
@@ -868,17 +1032,20 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                 merges_this_round += 1
                 merges_total += 1
 
-                log(
-                    f"Verbunden: Kette {a['chain_id']} ({a['end']}, {lenA:.3f}) + "
-                    f"Kette {b['chain_id']} ({b['end']}, {lenB:.3f}) -> neu {new_len:.3f} ; "
-                    f"Lücke vor dem Snapping: {gap:.6f}",
-                    f"Merged: chain {a['chain_id']} ({a['end']}, {lenA:.3f}) + "
-                    f"chain {b['chain_id']} ({b['end']}, {lenB:.3f}) -> new {new_len:.3f} ; "
-                    f"gap before snapping: {gap:.6f}"
-                )
+                if log_on:
+                    new_len = self._polyline_length(new_pts)
+                    log(
+                        f"Verbunden: Kette {a['chain_id']} ({a['end']}, {lenA:.3f}) + "
+                        f"Kette {b['chain_id']} ({b['end']}, {lenB:.3f}) -> neu {new_len:.3f} ; "
+                        f"Lücke vor dem Snapping: {gap:.6f}",
+                        f"Merged: chain {a['chain_id']} ({a['end']}, {lenA:.3f}) + "
+                        f"chain {b['chain_id']} ({b['end']}, {lenB:.3f}) -> new {new_len:.3f} ; "
+                        f"gap before snapping: {gap:.6f}"
+                    )
 
             log(f"Verschmelzungen in diesem Durchlauf: {merges_this_round}",
                 f"Merges in this iteration: {merges_this_round}")
+            phase_end(f"iteration_{iters_done}", clusters=len(clusters), merges=merges_this_round)
             feedback.pushInfo(self._t(
                 f"Durchlauf {iters_done}: {merges_this_round} Verschmelzungen.",
                 f"Iteration {iters_done}: {merges_this_round} merges."
@@ -896,6 +1063,7 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                 return {self.OUTPUT: dest_id}
 
         # Ausgabe schreiben / Write output
+        phase_begin()
         for pts in chains.values():
             if len(pts) >= 2:
                 feat = QgsFeature(out_fields)
@@ -921,12 +1089,17 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                 f.setAttributes([int(s['cluster'])])
                 rest_sink.addFeature(f, QgsFeatureSink.FastInsert)
                 unpaired_count += 1
+        phase_end("output", iterations=iters_done, merges=merges_total)
 
         # Statistik / Summary
         log("—— Zusammenfassung ——", "—— Summary ——")
         log(f"Durchläufe: {iters_done}", f"Iterations: {iters_done}")
         log(f"Verschmolzene Paare: {merges_total}", f"Merged pairs: {merges_total}")
         log(f"Ausgabeketten: {len(chains)}", f"Output chains: {len(chains)}")
+        if trace_memory:
+            largest = sorted(chains.items(), key=lambda kv: len(kv[1]), reverse=True)[:5]
+            for cid, pts in largest:
+                log(f"Große Kette {cid}: {len(pts)} Stützpunkte", f"Large chain {cid}: {len(pts)} vertices")
         if out_points:
             log(f"Rest-Endpunkte: {unpaired_count}", f"Leftover endpoints: {unpaired_count}")
 
@@ -948,6 +1121,8 @@ class MergeLinesByDirection(QgsProcessingAlgorithm):
                 pass
 
         results = {self.OUTPUT: dest_id}
+        if metrics_path:
+            results[self.METRICS_FILE] = metrics_path
         if out_points and (rest_sink is not None):
             results[self.OUTPUT + '_POINTS'] = rest_id
         return results
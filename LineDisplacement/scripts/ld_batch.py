@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ld_batch.py – Linienverdrängung als Stapellauf ohne Oberfläche
+#
+#   python ld_batch.py blaetter.toml --workers 4 --summary ergebnis.json
+#
+# Liest Aufträge aus einem Manifest (TOML oder JSON), startet QGIS einmal ohne
+# GUI und rechnet die Aufträge parallel in einem Thread-Pool. Jeder Auftrag hat
+# ein eigenes QgsProject mit seinen Ebenen und schreibt sein Ergebnis (ein
+# Linien-Objekt je Teilstück) in eine GeoPackage-Ebene.
+#
+# Manifest (Pfade relativ zum Manifest; [defaults] gilt für alle Aufträge):
+#
+#   [defaults]
+#   buf_dist = 12.0                           # oder [12.0, 20.0, 30.0]: ein Durchgang, je Abstand Objekte
+#   min_repl_len = 5.0
+#   pre = [0.5, 30, 1, 5, false, false]      # Vorverknüpfung (wie im Dialog)
+#   final = [0.5, 30, 1, 5, false, false]    # Schlussverknüpfung
+#   output = "out/{name}.gpkg"
+#   options = { prefilter = true }            # 10. Argument von line_displacement
+#
+#   [[jobs]]
+#   name = "blatt_01"
+#   to_move = "daten/blatt01.gpkg|layername=strassen"
+#   fixed = { path = "daten/blatt01.gpkg", layer = "gewaesser" }
+#   output_layer = "verdraengt"               # Standard: name
+#
+# Rückgabecode: 0 alle Aufträge erfolgreich, 1 mindestens einer fehlgeschlagen,
+# 2 Manifest unlesbar.
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+JOB_KEYS = ("name", "to_move", "fixed", "buf_dist", "min_repl_len", "pre", "final",
+            "output", "output_layer", "options")
+
+
+# ------------------------------
+# Manifest
+# ------------------------------
+def _read_toml(path):
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ValueError("TOML braucht Python 3.11 oder das Paket 'tomli' / "
+                             "TOML needs Python 3.11 or the 'tomli' package")
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def load_manifest(path):
+    """Liest das Manifest und gibt die vollständigen Aufträge (Defaults eingemischt) zurück."""
+    if path.lower().endswith(".toml"):
+        data = _read_toml(path)
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    defaults = data.get("defaults", {})
+    jobs = []
+    for i, raw in enumerate(data.get("jobs", [])):
+        job = {k: v for k, v in defaults.items() if k in JOB_KEYS}
+        job["options"] = dict(defaults.get("options", {}))
+        job.update({k: v for k, v in raw.items() if k != "options"})
+        job["options"].update(raw.get("options", {}))
+        job.setdefault("name", f"job_{i + 1}")
+        for key in ("to_move", "fixed", "buf_dist", "min_repl_len"):
+            if key not in job:
+                raise ValueError(f"Auftrag '{job['name']}': '{key}' fehlt / job '{job['name']}': '{key}' missing")
+        job["to_move"] = _layer_uri(job["to_move"], base)
+        job["fixed"] = _layer_uri(job["fixed"], base)
+        out = str(job.get("output") or "{name}.gpkg").format(name=job["name"])
+        job["output"] = out if os.path.isabs(out) else os.path.join(base, out)
+        job.setdefault("output_layer", job["name"])
+        jobs.append(job)
+    names = [j["name"] for j in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Auftragsnamen sind nicht eindeutig / job names are not unique")
+    return jobs
+
+
+def _layer_uri(spec, base):
+    """'pfad|layername=x' oder {path, layer} → OGR-URI mit absolutem Pfad."""
+    if isinstance(spec, dict):
+        path, layer = spec["path"], spec.get("layer")
+    else:
+        path, _, rest = str(spec).partition("|")
+        layer = rest.split("=", 1)[1] if rest.startswith("layername=") else None
+    if not os.path.isabs(path):
+        path = os.path.join(base, path)
+    return f"{path}|layername={layer}" if layer else path
+
+
+# ------------------------------
+# QGIS ohne Oberfläche
+# ------------------------------
+_QGS = None
+
+
+def init_qgis():
+    """Startet QgsApplication einmal ohne GUI (QGIS_PREFIX_PATH wird beachtet)."""
+    global _QGS
+    if _QGS is None:
+        from qgis.core import QgsApplication
+        prefix = os.environ.get("QGIS_PREFIX_PATH")
+        if prefix:
+            QgsApplication.setPrefixPath(prefix, True)
+        _QGS = QgsApplication([], False)
+        _QGS.initQgis()
+    return _QGS
+
+
+def exit_qgis():
+    """Beendet die mit init_qgis gestartete QgsApplication (Provider, Datenbankverbindungen)."""
+    global _QGS
+    if _QGS is not None:
+        _QGS.exitQgis()
+        _QGS = None
+
+
+# ------------------------------
+# Ein Auftrag
+# ------------------------------
+_OUTPUT_LOCKS = {}
+_OUTPUT_LOCKS_GUARD = threading.Lock()
+
+
+def _output_lock(path):
+    """Ein Lock je GeoPackage: mehrere Aufträge dürfen dieselbe Datei beschreiben, nur nicht gleichzeitig."""
+    with _OUTPUT_LOCKS_GUARD:
+        return _OUTPUT_LOCKS.setdefault(os.path.normcase(os.path.abspath(path)), threading.Lock())
+
+
+def write_lines_gpkg(results, path, layer_name, crs, job_name):
+    """
+    Schreibt jedes Linienteil der Ergebnisse [(Abstand, Geometrie, vorzeitig), …]
+    als Objekt (Felder job, buf_dist) in path/layer_name; vorzeitig geendete Abstände
+    schreiben nichts (ld_core.results_to_write, wie Ausdruck und Dialog).
+    """
+    import ld_core
+    from qgis.core import (QgsVectorLayer, QgsVectorFileWriter, QgsFeature, QgsField,
+                           QgsCoordinateTransformContext)
+    from qgis.PyQt.QtCore import QVariant
+
+    lyr = QgsVectorLayer(f"LineString?crs={crs.authid()}", layer_name, "memory")
+    prov = lyr.dataProvider()
+    prov.addAttributes([QgsField("job", QVariant.String), QgsField("buf_dist", QVariant.Double)])
+    lyr.updateFields()
+    feats = []
+    for buf_dist, geom, _early in ld_core.results_to_write(results)[0]:
+        for part in geom.asGeometryCollection():
+            f = QgsFeature(lyr.fields())
+            f.setGeometry(part)
+            f.setAttributes([job_name, float(buf_dist)])
+            feats.append(f)
+    prov.addFeatures(feats)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)) or ".", exist_ok=True)
+    opts = QgsVectorFileWriter.SaveVectorOptions()
+    opts.driverName = "GPKG"
+    opts.layerName = layer_name
+    opts.actionOnExistingFile = (QgsVectorFileWriter.CreateOrOverwriteLayer if os.path.exists(path)
+                                 else QgsVectorFileWriter.CreateOrOverwriteFile)
+    with _output_lock(path):
+        if hasattr(QgsVectorFileWriter, "writeAsVectorFormatV3"):
+            res = QgsVectorFileWriter.writeAsVectorFormatV3(lyr, path, QgsCoordinateTransformContext(), opts)
+        else:
+            res = QgsVectorFileWriter.writeAsVectorFormatV2(lyr, path, QgsCoordinateTransformContext(), opts)
+    if res[0] != QgsVectorFileWriter.NoError:
+        raise RuntimeError(res[1])
+    return len(feats)
+
+
+def run_job(job):
+    """Rechnet einen Auftrag; gibt eine Zusammenfassung (status ok/failed, Zeiten, Zahlen) zurück."""
+    from qgis.core import QgsProject, QgsVectorLayer
+    import Linienverdraengung as LV
+
+    t0 = time.perf_counter()
+    summary = {"name": job["name"], "status": "failed", "output": job["output"],
+               "output_layer": job["output_layer"]}
+    try:
+        move_lyr = QgsVectorLayer(job["to_move"], "to_move", "ogr")
+        fixed_lyr = QgsVectorLayer(job["fixed"], "fixed", "ogr")
+        for lyr, key in ((move_lyr, "to_move"), (fixed_lyr, "fixed")):
+            if not lyr.isValid():
+                raise RuntimeError(LV.t(f"Ebene '{job[key]}' ungültig oder nicht gefunden.",
+                                        f"Layer '{job[key]}' invalid or not found."))
+        project = QgsProject()          # eigenes Projekt je Auftrag: keine geteilten Ebenen zwischen Threads
+        project.setCrs(move_lyr.crs())
+        project.addMapLayers([move_lyr, fixed_lyr])
+        # mehrere Abstände: gemeinsame Stufen einmal, alle Abstände in dieselbe Ebene (Feld buf_dist)
+        results = LV.run_line_displacement_multi(
+            move_lyr.name(), fixed_lyr.name(), job["buf_dist"], float(job["min_repl_len"]),
+            job.get("pre"), job.get("final"), job.get("options"), project)
+        summary["features"] = write_lines_gpkg(results, job["output"], job["output_layer"], move_lyr.crs(),
+                                               job["name"])
+        summary["distances"] = [d for d, _g, _e in results]
+        summary["early"] = any(e for _d, _g, e in results)
+        summary["vertices"] = sum(g.constGet().nCoordinates() for _d, g, _e in results if g and not g.isEmpty())
+        summary["status"] = "ok"
+        project.removeAllMapLayers()
+    except Exception as e:
+        summary["error"] = str(e)
+        summary["traceback"] = traceback.format_exc()
+    summary["seconds"] = round(time.perf_counter() - t0, 3)
+    return summary
+
+
+# ------------------------------
+# Befehl
+# ------------------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Linienverdrängung als Stapellauf / line displacement batch runner")
+    ap.add_argument("manifest", help="Manifest (.toml oder .json)")
+    ap.add_argument("--workers", type=int, default=0, help="parallele Aufträge; 0 = Kerne − 1")
+    ap.add_argument("--jobs", nargs="*", help="nur diese Aufträge (Namen)")
+    ap.add_argument("--log", default="", help="Logdatei für line_displacement (Standard: aus)")
+    ap.add_argument("--summary", default="", help="Zusammenfassung aller Aufträge als JSON")
+    args = ap.parse_args(argv)
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except Exception as e:
+        print(f"Manifest '{args.manifest}': {e}", file=sys.stderr)
+        return 2
+    if args.jobs:
+        jobs = [j for j in jobs if j["name"] in set(args.jobs)]
+    if not jobs:
+        print("Keine Aufträge / no jobs.", file=sys.stderr)
+        return 2
+
+    init_qgis()
+    try:
+        import Linienverdraengung as LV
+        if args.log:
+            LV.LOGFILE = args.log
+            LV.LOG_ENABLED = True
+            LV.log_init()
+
+        workers = args.workers if args.workers > 0 else max((os.cpu_count() or 1) - 1, 1)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(run_job, jobs))
+        total = time.perf_counter() - t0
+
+        failed = [r for r in results if r["status"] != "ok"]
+        for r in results:
+            if r["status"] == "ok":
+                print(f"{r['name']:30s} ok      {r['seconds']:8.2f} s  {r['features']:6d} Objekte/features"
+                      f"{'  (vorzeitig/early)' if r.get('early') else ''}  -> {r['output']}|{r['output_layer']}")
+            else:
+                print(f"{r['name']:30s} FEHLER  {r['seconds']:8.2f} s  {r['error']}")
+        print(LV.t(f"{len(results) - len(failed)} von {len(results)} Aufträgen erfolgreich, {total:.1f} s gesamt.",
+                   f"{len(results) - len(failed)} of {len(results)} jobs succeeded, {total:.1f} s total."))
+        if args.summary:
+            with open(args.summary, "w", encoding="utf-8") as f:
+                json.dump({"seconds": round(total, 3), "jobs": results}, f, indent=2, ensure_ascii=False)
+    finally:
+        exit_qgis()   # erst nach der Zusammenfassung
+    return 1 if failed else 0   # ld_logging leert seine Warteschlange beim Beenden (atexit)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+# ld_core.py – Bausteine der Linienverdrängung ohne QGIS-Abhängigkeit
+#
+# Das Verfahren selbst steht nur einmal, in den Stufen von Linienverdraengung.py.
+# Hier liegen die Teile, die es über ein Geometrie-Backend (ld_geometry.py) oder
+# auf reinen Koordinaten rechnet: Parameter lesen, Vorfilter, indizierte
+# Einzelpuffer, Zuschnitt, Zerschneiden der Pufferkontur und die Kachelteilung.
+# Sie lassen sich ohne QGIS laden und prüfen.
+
+import math
+from bisect import bisect_left, bisect_right
+
+try:  # numpy ist optional; ohne numpy wird je Punkt projiziert
+    import numpy as np
+except ImportError:
+    np = None
+
+BLOB_FACTOR = 2.2                  # Radius der Schlaufen-Blasen als Vielfaches des Verdrängungs-Abstands
+FIXED_INDEX_MIN_PARTS = 200        # ab so vielen Teilen lohnt 'indexed' (Strategie 'auto')
+FIXED_INDEX_MIN_VERTICES = 50000   # … oder ab so vielen Stützpunkten
+TILE_MAX_DEPTH = 8                 # maximale Teilungstiefe des Quadtrees
+
+# Standardwerte der Fragmentverknüpfung für Dialog, Processing-Algorithmus und fehlende
+# Werte im Ausdruck, Reihenfolge wie read_params: Toleranz, Winkel (Grad), Vereinfachung,
+# Iterationen, an Kreuzungen zerlegen, nur gerade Kreuzungen. Fehlt im Ausdruck die
+# Anzahl der Iterationen, bleibt die Verknüpfung dort aus (wie bisher).
+MERGE_DEFAULTS = (0.01, 90.0, 0.3, 10, False, False)
+
+
+# ------------------------------
+# Parameter
+# ------------------------------
+def read_distances(val) -> list:
+    """Verdrängungs-Abstand als Liste: Zahl → [Zahl], array(…)/Liste → alle Einträge."""
+    vals = list(val) if isinstance(val, (list, tuple)) else [val]
+    return [float(v) for v in vals if v is not None]
+
+
+def read_params(seq_any):
+    """Parameterbündel (Toleranz, Winkel, Vereinfachung, Iterationen, Knoten teilen, nur gerade)."""
+    try:
+        seq = list(seq_any) if seq_any is not None else []
+    except Exception:
+        seq = []
+    seq = (seq + [None] * 6)[:6]
+    return tuple(seq)
+
+
+def choose_fixed_strategy(option, n_parts, n_vertices) -> str:
+    """Löst 'auto' anhand der Eingabegröße in 'union' oder 'indexed' auf."""
+    opt = str(option or "auto").lower()
+    if opt in ("union", "indexed"):
+        return opt
+    if n_parts > 1 and (n_parts >= FIXED_INDEX_MIN_PARTS or n_vertices >= FIXED_INDEX_MIN_VERTICES):
+        return "indexed"
+    return "union"
+
+
+# ------------------------------
+# Ergebnisse
+# ------------------------------
+def results_to_write(results):
+    """
+    Teilt [(Abstand, Geometrie, vorzeitig), …] in (zu schreibende Ergebnisse, Abstände
+    mit vorzeitigem Ende). Vorzeitig geendete Abstände schreiben in keinem Einstieg
+    etwas (Ausdruck, Dialog, Stapel); leere Geometrien fallen ebenfalls weg.
+    """
+    written, skipped = [], []
+    for res in results:
+        dist, geom, early = res
+        if early:
+            skipped.append(dist)
+        elif geom is not None and not geom.isEmpty():
+            written.append(res)
+    return written, skipped
+
+
+# ------------------------------
+# Kachelteilung (Quadtree nach Stützpunktdichte)
+# ------------------------------
+def quadtree_tiles(extent, pts, max_vertices, min_size, max_depth=TILE_MAX_DEPTH):
+    """
+    Teilt extent (xmin, ymin, xmax, ymax) in Quadranten, solange eine Zelle mehr
+    als max_vertices Stützpunkte enthält. Dichte Gebiete erhalten so kleine,
+    dünn besetzte Gebiete große Kacheln. Die Blätter überdecken extent lückenlos.
+    """
+    tiles = []
+    stack = [(extent, pts, 0)]
+    while stack:
+        (x0, y0, x1, y1), cell_pts, depth = stack.pop()
+        w, h = x1 - x0, y1 - y0
+        if len(cell_pts) <= max_vertices or depth >= max_depth or min(w, h) / 2.0 < min_size:
+            tiles.append((x0, y0, x1, y1))
+            continue
+        cx, cy = x0 + w / 2.0, y0 + h / 2.0
+        quads = ([], [], [], [])
+        for p in cell_pts:
+            quads[(1 if p[0] >= cx else 0) + (2 if p[1] >= cy else 0)].append(p)
+        rects = ((x0, y0, cx, cy), (cx, y0, x1, cy), (x0, cy, cx, y1), (cx, cy, x1, y1))
+        for r, q in zip(rects, quads):
+            stack.append((r, q, depth + 1))
+    return tiles
+
+
+# ------------------------------
+# Hilfen über das Backend
+# ------------------------------
+def clip_to(geo, geom, ref_geom, margin):
+    """
+    Schneidet geom auf die um margin vergrößerte Bounding-Box von ref_geom zu.
+    Liegt geom schon ganz darin, bleibt es unverändert.
+    """
+    if geo.is_empty(geom) or geo.is_empty(ref_geom):
+        return geom
+    x0, y0, x1, y1 = geo.bounds(ref_geom)
+    rect = (x0 - margin, y0 - margin, x1 + margin, y1 + margin)
+    g0, h0, g1, h1 = geo.bounds(geom)
+    if rect[0] <= g0 and rect[1] <= h0 and g1 <= rect[2] and h1 <= rect[3]:
+        return geom
+    return geo.clip(geom, rect)
+
+
+def with_passthrough(geo, geom, passthrough):
+    """Ergänzt eine Rest-Geometrie um die vom Vorfilter durchgereichten Teile."""
+    if not passthrough:
+        return geom
+    return geo.collect(([geom] if not geo.is_empty(geom) else []) + list(passthrough))
+
+
+def prefilter(geo, union_to_move, union_fixed, buf_dist):
+    """
+    Teilt die weichende Geometrie in Teile, die näher als buf_dist an bleibende
+    Teile herankommen (near), und solche, die davon unberührt bleiben (far).
+    Rückgabe: (near-Geometrie, Liste der far-Teile).
+    """
+    parts = geo.parts(union_to_move)
+    mask = geo.near_mask(parts, geo.parts(union_fixed), abs(float(buf_dist)))
+    near = [p for p, m in zip(parts, mask) if m]
+    far = [p for p, m in zip(parts, mask) if not m]
+    return geo.collect(near), far
+
+
+def fixed_buffer_indexed(geo, union_fixed, union_to_move, buf_dist):
+    """
+    Puffert nur die Teile der bleibenden Geometrie einzeln, deren Puffer in die
+    Reichweite der weichenden Geometrie kommt, und vereinigt diese Puffer.
+    Reichweite ist die Box von union_to_move, vergrößert um den Radius der
+    Blasen plus Puffer (Puffer × (BLOB_FACTOR + 1)) – so weit werten die
+    folgenden Schritte Pufferfläche und -kontur aus. Innerhalb dieser Box
+    stimmt das Ergebnis daher mit dem Puffer der Gesamt-Union ('union') überein,
+    auch für Teile, die nichts Weichendes berühren, deren Ring aber in die
+    Kontur eingeht. Rückgabe: (Pufferfläche, Anzahl Teile, davon gepuffert).
+    """
+    parts = geo.parts(union_fixed)
+    if not parts or geo.is_empty(union_to_move):
+        return geo.empty(), len(parts), 0
+    buf = abs(float(buf_dist))
+    margin = buf * (BLOB_FACTOR + 1.0) + buf   # Reichweite + Puffer um jedes Teil
+    x0, y0, x1, y1 = geo.bounds(union_to_move)
+    used = sorted(geo.index(parts).query((x0 - margin, y0 - margin, x1 + margin, y1 + margin)))
+    buffers = [b for b in geo.buffer_each([parts[i] for i in used], buf_dist, 1) if not geo.is_empty(b)]
+    if not buffers:
+        return geo.empty(), len(parts), 0
+    return geo.union(buffers), len(parts), len(buffers)
+
+
+# ------------------------------
+# Pufferkontur an Endpunkten zerschneiden (auf Koordinaten)
+# ------------------------------
+def _cumulative(ring_xy):
+    """Laufende Länge bis zu jedem Stützpunkt (beginnend mit 0.0)."""
+    cum = [0.0]
+    for (ax, ay), (bx, by) in zip(ring_xy, ring_xy[1:]):
+        cum.append(cum[-1] + math.hypot(bx - ax, by - ay))
+    return cum
+
+
+def _locate_point(ring_xy, cum, x, y):
+    """Abstand entlang des Rings bis zum Lotfußpunkt von (x, y) (nächstes Segment gewinnt)."""
+    best_d2, best = None, 0.0
+    for i, ((ax, ay), (bx, by)) in enumerate(zip(ring_xy, ring_xy[1:])):
+        dx, dy = bx - ax, by - ay
+        l2 = dx * dx + dy * dy
+        tt = min(max(((x - ax) * dx + (y - ay) * dy) / l2, 0.0), 1.0) if l2 > 0.0 else 0.0
+        px, py = ax + tt * dx - x, ay + tt * dy - y
+        d2 = px * px + py * py
+        if best_d2 is None or d2 < best_d2:
+            best_d2, best = d2, cum[i] + (cum[i + 1] - cum[i]) * tt
+    return best
+
+
+def locate_on_ring(ring_xy, pts_xy, chunk_cells=2_000_000):
+    """
+    Abstände entlang eines Rings (wie lineLocatePoint) für viele Punkte zugleich.
+    Mit numpy vektorisiert: jeder Punkt wird auf alle Ringsegmente projiziert,
+    das nächste Segment gewinnt (blockweise, um den Speicher zu begrenzen).
+    Ohne numpy dieselbe Projektion je Punkt.
+    """
+    if len(ring_xy) < 2:
+        return [0.0 for _ in pts_xy]
+    if np is None:
+        cum = _cumulative(ring_xy)
+        return [_locate_point(ring_xy, cum, x, y) for x, y in pts_xy]
+
+    R = np.asarray(ring_xy, dtype=float)
+    A, AB = R[:-1], R[1:] - R[:-1]
+    L2 = (AB * AB).sum(axis=1)
+    seg_len = np.sqrt(L2)
+    cum = np.concatenate(([0.0], np.cumsum(seg_len)[:-1]))
+    L2_safe = np.where(L2 > 0.0, L2, 1.0)
+
+    P_all = np.asarray(pts_xy, dtype=float)
+    rows = max(1, chunk_cells // max(len(A), 1))
+    out = []
+    for start in range(0, len(P_all), rows):
+        P = P_all[start:start + rows]
+        AP = P[:, None, :] - A[None, :, :]
+        tt = np.clip((AP * AB[None, :, :]).sum(axis=2) / L2_safe[None, :], 0.0, 1.0)
+        diff = AP - tt[:, :, None] * AB[None, :, :]
+        k = (diff * diff).sum(axis=2).argmin(axis=1)
+        rr = np.arange(len(P))
+        out.extend((cum[k] + tt[rr, k] * seg_len[k]).tolist())
+    return out
+
+
+def ring_substring(ring_xy, d1, d2, cum=None):
+    """
+    Abschnitt [d1, d2] eines Rings bzw. einer Linie als Koordinatenliste.
+    Bei geschlossenen Ringen darf d2 über die Gesamtlänge hinausgehen; der
+    Abschnitt läuft dann über den Ringanfang weiter.
+    """
+    cum = cum if cum is not None else _cumulative(ring_xy)
+    total = cum[-1]
+    if d2 > total and tuple(ring_xy[0]) == tuple(ring_xy[-1]):
+        head = ring_substring(ring_xy, d1, total, cum)
+        tail = ring_substring(ring_xy, 0.0, min(d2 - total, total), cum)
+        return head + tail[1:]
+    d1 = min(max(d1, 0.0), total)
+    d2 = min(max(d2, d1), total)
+
+    def point_at(d):
+        i = min(max(bisect_right(cum, d) - 1, 0), len(cum) - 2)
+        seg = cum[i + 1] - cum[i]
+        f = (d - cum[i]) / seg if seg > 0.0 else 0.0
+        (ax, ay), (bx, by) = ring_xy[i], ring_xy[i + 1]
+        return (ax + (bx - ax) * f, ay + (by - ay) * f)
+
+    inner = [tuple(p) for p in ring_xy[bisect_right(cum, d1):bisect_left(cum, d2)]]
+    return [point_at(d1)] + inner + [point_at(d2)]
+
+
+def split_boundary_at_endpoints(geo, boundary_geom, line_geoms, tol=1e-9):
+    """
+    Zerschneidet boundary_geom dort, wo line_geoms mit ihren Start-/Endpunkten
+    an die Kontur projizieren.
+    Jeder Ring (bzw. jedes Konturstück) wird einzeln behandelt: Ein räumlicher
+    Index ordnet jeden Endpunkt seinem nächstgelegenen Ring zu, dort wird er
+    vektorisiert auf die Segmente projiziert. Bei geschlossenen Ringen wird das
+    Stück über den (zufälligen) Ringanfang hinweg als ein Segment belassen.
+    """
+    rings = []
+    for rxy in geo.lines(boundary_geom):
+        if len(rxy) >= 2:
+            cum = _cumulative(rxy)
+            if cum[-1] > 0.0:
+                rings.append((rxy, cum))
+    if not rings:
+        return [boundary_geom]
+
+    # Endpunkte dem nächstgelegenen Ring zuordnen
+    pts = []
+    for g in line_geoms:
+        for coords in geo.lines(g):
+            pts.append(coords[0])
+            pts.append(coords[-1])
+    per_ring = [[] for _ in rings]
+    if len(rings) == 1:
+        per_ring[0] = pts
+    else:
+        idx = geo.index([geo.from_line(rxy) for rxy, _ in rings])
+        for x, y in pts:
+            i = idx.nearest(x, y)
+            if i is not None:
+                per_ring[i].append((x, y))
+
+    pieces = []
+    for (rxy, cum), rpts in zip(rings, per_ring):
+        total = cum[-1]
+        closed = tuple(rxy[0]) == tuple(rxy[-1])
+        dists = locate_on_ring(rxy, rpts) if rpts else []
+        cuts = sorted(set(round(max(0.0, min(d, total)), 9) for d in dists if d is not None))
+
+        if closed:
+            # Anfang/Ende fallen zusammen: Schnitt bei 'total' ist Schnitt bei 0
+            cuts = sorted(set(0.0 if total - d < tol else d for d in cuts))
+            if not cuts:
+                pieces.append(rxy)
+                continue
+            for d1, d2 in zip(cuts, cuts[1:]):
+                if d2 - d1 >= tol:
+                    pieces.append(ring_substring(rxy, d1, d2, cum))
+            # Stück über den Ringanfang hinweg
+            if total - cuts[-1] + cuts[0] >= tol:
+                pieces.append(ring_substring(rxy, cuts[-1], total + cuts[0], cum))
+        else:
+            cuts = sorted(set([0.0, round(total, 9)] + cuts))
+            for d1, d2 in zip(cuts, cuts[1:]):
+                if d2 - d1 >= tol:
+                    pieces.append(ring_substring(rxy, d1, d2, cum))
+
+    segments = [geo.from_line(c) for c in pieces if len(c) >= 2]
+    segments = [s for s in segments if not geo.is_empty(s)]
+    return segments or [boundary_geom]
@@ -0,0 +1,485 @@
+# -*- coding: utf-8 -*-
+# ld_geometry.py – kleine Geometrie-Schnittstelle mit QGIS- und Shapely-2-Umsetzung
+#
+# Die Stufen 3–15 in Linienverdraengung.py und die Bausteine in ld_core.py
+# rechnen nur über die Methoden eines Backends; welche Bibliothek die
+# Geometrien hält, bleibt ihnen verborgen. QGIS wird erst beim Anlegen von
+# QgisBackend importiert, Shapely erst bei ShapelyBackend – dieses Modul lässt
+# sich also auch in Prozessen ohne QGIS laden.
+#
+# Koordinaten wandern als Listen von (x, y)-Tupeln, Rechtecke als
+# (xmin, ymin, xmax, ymax), Geometrien zwischen Prozessen als WKB.
+
+try:  # Shapely 2 ist optional; ohne Shapely steht nur das QGIS-Backend bereit
+    import shapely
+    if int(shapely.__version__.split(".")[0]) < 2:
+        shapely = None
+except ImportError:
+    shapely = None
+
+
+class GeometryBackend:
+    """
+    Schnittstelle der Geometrie-Operationen, die die Verdrängungsstufen benötigen.
+    Die zusammengesetzten Operationen (buffer_each, contains_pairs, near_mask)
+    haben eine schlichte Grundfassung; Backends mit Massenoperationen
+    überschreiben sie.
+    'key' benennt eine wiederholt genutzte Geometrie, damit ein Backend sie
+    einmal vorbereiten kann (z. B. GEOS prepared geometry).
+    """
+
+    name = "abstract"
+
+    # --- Umwandlung ---
+    def from_wkb(self, wkb):
+        raise NotImplementedError
+
+    def to_wkb(self, geom) -> bytes:
+        raise NotImplementedError
+
+    def from_line(self, coords):
+        raise NotImplementedError
+
+    def empty(self):
+        raise NotImplementedError
+
+    # --- Abfragen ---
+    def is_empty(self, geom) -> bool:
+        raise NotImplementedError
+
+    def parts(self, geom):
+        """Einzelteile einer (Multi-)Geometrie als Liste."""
+        raise NotImplementedError
+
+    def lines(self, geom):
+        """Koordinatenlisten aller Linienteile."""
+        raise NotImplementedError
+
+    def polygons(self, geom):
+        """Alle Flächenteile als einzelne Polygone."""
+        raise NotImplementedError
+
+    def bounds(self, geom):
+        raise NotImplementedError
+
+    def length(self, geom) -> float:
+        raise NotImplementedError
+
+    def distance(self, a, b) -> float:
+        raise NotImplementedError
+
+    def intersects(self, a, b, key=None) -> bool:
+        raise NotImplementedError
+
+    def contains(self, a, b, key=None) -> bool:
+        raise NotImplementedError
+
+    # --- Konstruktion ---
+    def collect(self, geoms):
+        raise NotImplementedError
+
+    def union(self, geoms):
+        raise NotImplementedError
+
+    def buffer(self, geom, dist, quad_segs):
+        raise NotImplementedError
+
+    def boundary(self, geom):
+        raise NotImplementedError
+
+    def clip(self, geom, rect):
+        raise NotImplementedError
+
+    def simplify(self, geom, tol):
+        raise NotImplementedError
+
+    def remove_duplicate_nodes(self, geom, eps):
+        return geom
+
+    def intersection(self, a, b, key=None):
+        raise NotImplementedError
+
+    def difference(self, a, b, key=None):
+        raise NotImplementedError
+
+    def index(self, geoms):
+        """Bounding-Box-Index über geoms; query(rect) → Positionen, nearest(x, y) → Position oder None."""
+        raise NotImplementedError
+
+    # --- zusammengesetzte Operationen (Grundfassung) ---
+    def buffer_each(self, geoms, dist, quad_segs):
+        return [self.buffer(g, dist, quad_segs) for g in geoms]
+
+    def contains_pairs(self, containers, geoms, key_prefix="c", index=None, allowed=None, first_only=False):
+        """
+        Je Position in geoms die sortierten Positionen der containers, die sie
+        vollständig enthalten. index: vorhandener Index über containers;
+        allowed: nur diese Positionen prüfen; first_only: je Geometrie höchstens
+        die erste enthaltende.
+        """
+        idx = index if index is not None else self.index(containers)
+        out = []
+        for g in geoms:
+            hits = []
+            for i in sorted(idx.query(self.bounds(g))):
+                if allowed is not None and i not in allowed:
+                    continue
+                if self.contains(containers[i], g, key=(key_prefix, i)):
+                    hits.append(i)
+                    if first_only:
+                        break
+            out.append(hits)
+        return out
+
+    def near_mask(self, geoms, others, dist):
+        """Je Position in geoms: liegt ein Teil aus others höchstens dist entfernt?"""
+        idx = self.index(others)
+        out = []
+        for g in geoms:
+            x0, y0, x1, y1 = self.bounds(g)
+            cand = idx.query((x0 - dist, y0 - dist, x1 + dist, y1 + dist))
+            out.append(any(self.distance(others[i], g) <= dist for i in cand))
+        return out
+
+
+# ------------------------------
+# QGIS (QgsGeometry, GEOS-Engines, QgsSpatialIndex)
+# ------------------------------
+class _QgisIndex:
+    def __init__(self, geoms):
+        from qgis.core import QgsSpatialIndex, QgsFeature
+        self._idx = QgsSpatialIndex(QgsSpatialIndex.FlagStoreFeatureGeometries)
+        for i, g in enumerate(geoms):
+            f = QgsFeature(i)
+            f.setGeometry(g)
+            self._idx.addFeature(f)
+
+    def query(self, rect):
+        from qgis.core import QgsRectangle
+        return self._idx.intersects(QgsRectangle(*rect))
+
+    def nearest(self, x, y):
+        from qgis.core import QgsPointXY
+        nn = self._idx.nearestNeighbor(QgsPointXY(x, y), 1)
+        return min(nn) if nn else None
+
+
+class QgisBackend(GeometryBackend):
+    """QgsGeometry als Geometrietyp; Prädikate mit Schlüssel laufen über vorbereitete Engines, Overlays nicht."""
+
+    name = "qgis"
+
+    def __init__(self):
+        from qgis.core import QgsGeometry, QgsPointXY, QgsRectangle
+        self._G, self._P, self._R = QgsGeometry, QgsPointXY, QgsRectangle
+        self._engines = {}
+        self.prepared_calls = 0
+        self.plain_calls = 0
+
+    def _engine(self, key, geom):
+        if key is None:
+            return None
+        entry = self._engines.get(key)
+        if entry is None:
+            try:
+                eng = self._G.createGeometryEngine(geom.constGet())
+                eng.prepareGeometry()
+            except Exception:
+                eng = None
+            entry = self._engines[key] = (geom, eng)   # Geometrie mithalten: Engine verweist nur darauf
+        return entry[1]
+
+    def from_wkb(self, wkb):
+        g = self._G()
+        if wkb:
+            g.fromWkb(wkb)
+        return g
+
+    def to_wkb(self, geom) -> bytes:
+        return bytes(geom.asWkb()) if geom is not None and not geom.isEmpty() else b""
+
+    def from_line(self, coords):
+        return self._G.fromPolylineXY([self._P(x, y) for x, y in coords])
+
+    def empty(self):
+        return self._G()
+
+    def is_empty(self, geom) -> bool:
+        return geom is None or geom.isEmpty()
+
+    def parts(self, geom):
+        return [] if self.is_empty(geom) else geom.asGeometryCollection()
+
+    def lines(self, geom):
+        if self.is_empty(geom):
+            return []
+        pls = geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
+        return [[(p.x(), p.y()) for p in pl] for pl in pls if pl]
+
+    def polygons(self, geom):
+        if self.is_empty(geom):
+            return []
+        if geom.isMultipart():
+            return [self._G.fromPolygonXY(poly) for poly in geom.asMultiPolygon()]
+        return [geom]
+
+    def bounds(self, geom):
+        bb = geom.boundingBox()
+        return (bb.xMinimum(), bb.yMinimum(), bb.xMaximum(), bb.yMaximum())
+
+    def length(self, geom) -> float:
+        return geom.length()
+
+    def distance(self, a, b) -> float:
+        return a.distance(b)
+
+    def intersects(self, a, b, key=None) -> bool:
+        eng = self._engine(key, a)
+        if eng is not None:
+            self.prepared_calls += 1
+            return eng.intersects(b.constGet())
+        self.plain_calls += 1
+        return a.intersects(b)
+
+    def contains(self, a, b, key=None) -> bool:
+        eng = self._engine(key, a)
+        if eng is not None:
+            self.prepared_calls += 1
+            return eng.contains(b.constGet())
+        self.plain_calls += 1
+        return a.contains(b)
+
+    def collect(self, geoms):
+        geoms = [g for g in geoms if not self.is_empty(g)]
+        return self._G.collectGeometry(geoms) if geoms else self._G()
+
+    def union(self, geoms):
+        geoms = [g for g in geoms if not self.is_empty(g)]
+        if not geoms:
+            return self._G()
+        res = self._G.unaryUnion(geoms)
+        return res if res is not None else self._G()
+
+    def buffer(self, geom, dist, quad_segs):
+        return geom.buffer(dist, quad_segs)
+
+    def boundary(self, geom):
+        if hasattr(geom, "boundary"):
+            return geom.boundary()
+        return self.collect([self.from_line([(p.x(), p.y()) for p in poly[0]])
+                             for poly in (geom.asMultiPolygon() if geom.isMultipart() else [geom.asPolygon()])])
+
+    def clip(self, geom, rect):
+        res = geom.clipped(self._R(*rect))
+        return res if res is not None else geom
+
+    def simplify(self, geom, tol):
+        return geom.simplify(tol)
+
+    def remove_duplicate_nodes(self, geom, eps):
+        res = self._G(geom)
+        res.removeDuplicateNodes(eps)   # wirkt auf der Kopie
+        return res
+
+    def _overlay(self, op, a, b, key):
+        # Vorbereitung beschleunigt nur Prädikate; Overlays rechnet GEOS immer auf der ganzen Geometrie
+        self.plain_calls += 1
+        return getattr(a, op)(b)
+
+    def intersection(self, a, b, key=None):
+        return self._overlay("intersection", a, b, key)
+
+    def difference(self, a, b, key=None):
+        return self._overlay("difference", a, b, key)
+
+    def index(self, geoms):
+        return _QgisIndex(geoms)
+
+
+# ------------------------------
+# Shapely 2 (vektorisierte GEOS-Aufrufe, STRtree)
+# ------------------------------
+class _ShapelyIndex:
+    def __init__(self, geoms):
+        self._tree = shapely.STRtree(list(geoms))
+
+    def query(self, rect):
+        return [int(i) for i in self._tree.query(shapely.box(*rect))]
+
+    def nearest(self, x, y):
+        if len(self._tree) == 0:
+            return None
+        i = self._tree.nearest(shapely.points(x, y))
+        return None if i is None else int(i)
+
+
+class ShapelyBackend(GeometryBackend):
+    """Shapely-2-Geometrien; Massenoperationen über Array-Funktionen und STRtree-Prädikate."""
+
+    name = "shapely"
+
+    def __init__(self):
+        if shapely is None:
+            raise ImportError("Shapely >= 2 nicht verfügbar / Shapely >= 2 not available")
+        self.prepared_calls = 0
+        self.plain_calls = 0
+
+    def from_wkb(self, wkb):
+        return shapely.from_wkb(wkb) if wkb else self.empty()
+
+    def to_wkb(self, geom) -> bytes:
+        return b"" if self.is_empty(geom) else shapely.to_wkb(geom)
+
+    def from_line(self, coords):
+        return shapely.linestrings(coords)
+
+    def empty(self):
+        return shapely.GeometryCollection()
+
+    def is_empty(self, geom) -> bool:
+        return geom is None or bool(shapely.is_empty(geom))
+
+    def parts(self, geom):
+        return [] if self.is_empty(geom) else list(shapely.get_parts(geom))
+
+    def lines(self, geom):
+        out = []
+        for p in self.parts(geom):
+            if p.geom_type in ("LineString", "LinearRing") and not p.is_empty:
+                out.append([(float(x), float(y)) for x, y in shapely.get_coordinates(p)])
+            elif p.geom_type in ("MultiLineString", "GeometryCollection"):
+                out.extend(self.lines(p))
+        return out
+
+    def polygons(self, geom):
+        return [p for p in self.parts(geom) if p.geom_type == "Polygon"]
+
+    def bounds(self, geom):
+        return tuple(float(v) for v in shapely.bounds(geom))
+
+    def length(self, geom) -> float:
+        return float(shapely.length(geom))
+
+    def distance(self, a, b) -> float:
+        return float(shapely.distance(a, b))
+
+    def _prepared(self, a, key):
+        if key is not None:
+            shapely.prepare(a)          # idempotent; bleibt an der Geometrie hängen
+            self.prepared_calls += 1
+        else:
+            self.plain_calls += 1
+        return a
+
+    def intersects(self, a, b, key=None) -> bool:
+        return bool(shapely.intersects(self._prepared(a, key), b))
+
+    def contains(self, a, b, key=None) -> bool:
+        return bool(shapely.contains(self._prepared(a, key), b))
+
+    def collect(self, geoms):
+        parts = [p for g in geoms if not self.is_empty(g) for p in shapely.get_parts(g)]
+        if not parts:
+            return self.empty()
+        types = {p.geom_type for p in parts}
+        if types == {"LineString"}:
+            return shapely.multilinestrings(parts)
+        if types == {"Polygon"}:
+            return shapely.multipolygons(parts)
+        if types == {"Point"}:
+            return shapely.multipoints(parts)
+        return shapely.geometrycollections(parts)
+
+    def union(self, geoms):
+        geoms = [g for g in geoms if not self.is_empty(g)]
+        return shapely.union_all(geoms) if geoms else self.empty()
+
+    def buffer(self, geom, dist, quad_segs):
+        return shapely.buffer(geom, dist, quad_segs=quad_segs)
+
+    def boundary(self, geom):
+        return shapely.boundary(geom)
+
+    def clip(self, geom, rect):
+        return shapely.clip_by_rect(geom, *rect)
+
+    def simplify(self, geom, tol):
+        # wie QgsGeometry.simplify: Douglas-Peucker ohne Topologieschutz
+        return shapely.simplify(geom, tol, preserve_topology=False)
+
+    def remove_duplicate_nodes(self, geom, eps):
+        fn = getattr(shapely, "remove_repeated_points", None)   # erst ab Shapely 2.1
+        return fn(geom, eps) if fn is not None else geom
+
+    def intersection(self, a, b, key=None):
+        self.plain_calls += 1
+        return shapely.intersection(a, b)
+
+    def difference(self, a, b, key=None):
+        self.plain_calls += 1
+        return shapely.difference(a, b)
+
+    def index(self, geoms):
+        return _ShapelyIndex(geoms)
+
+    # --- Massenoperationen ---
+    def buffer_each(self, geoms, dist, quad_segs):
+        if not geoms:
+            return []
+        return list(shapely.buffer(geoms, dist, quad_segs=quad_segs))
+
+    def contains_pairs(self, containers, geoms, key_prefix="c", index=None, allowed=None, first_only=False):
+        out = [[] for _ in geoms]
+        if not containers or not geoms:
+            return out
+        tree = index._tree if index is not None else shapely.STRtree(containers)
+        g_idx, c_idx = tree.query(geoms, predicate="within")
+        for gi, ci in zip(g_idx.tolist(), c_idx.tolist()):
+            if allowed is None or ci in allowed:
+                out[gi].append(ci)
+        self.prepared_calls += len(geoms)
+        out = [sorted(h) for h in out]
+        return [h[:1] for h in out] if first_only else out
+
+    def near_mask(self, geoms, others, dist):
+        out = [False] * len(geoms)
+        if not geoms or not others:
+            return out
+        tree = shapely.STRtree(others)
+        try:
+            g_idx, _ = tree.query(geoms, predicate="dwithin", distance=dist)
+        except Exception:   # GEOS < 3.10 kennt 'dwithin' nicht
+            return GeometryBackend.near_mask(self, geoms, others, dist)
+        for gi in set(g_idx.tolist()):
+            out[gi] = True
+        return out
+
+
+BACKENDS = {
+    "qgis": QgisBackend,
+    "shapely": ShapelyBackend,
+}
+
+
+def available() -> list:
+    """Namen der Backends, deren Bibliothek sich laden lässt."""
+    import importlib.util
+    names = []
+    try:
+        if importlib.util.find_spec("qgis.core") is not None:
+            names.append("qgis")
+    except ImportError:
+        pass
+    if shapely is not None:
+        names.append("shapely")
+    return names
+
+
+def get_backend(name="qgis") -> GeometryBackend:
+    """Neues Backend 'qgis' oder 'shapely'; 'auto' nimmt Shapely, wenn vorhanden, sonst QGIS."""
+    name = str(name or "qgis").lower()
+    if name == "auto":
+        name = "shapely" if shapely is not None else "qgis"
+    if name not in BACKENDS:
+        raise ValueError(f"Unbekanntes Geometrie-Backend / unknown geometry backend: {name}")
+    return BACKENDS[name]()
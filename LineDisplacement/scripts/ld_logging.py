@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+# ld_logging.py – gemeinsames, gepuffertes Logging für Plugin und Skripte
+#
+# Ein Hintergrund-Thread schreibt die Zeilen aus einer begrenzten Warteschlange
+# stapelweise in die jeweilige Datei; der Aufrufer öffnet also keine Datei mehr.
+# Meldungen dürfen Funktionen sein, die erst formatiert werden, wenn das Level
+# tatsächlich geschrieben wird (zweisprachige f-Strings entstehen sonst nie).
+
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", WARNING: "WARNUNG/WARNING", ERROR: "FEHLER/ERROR"}
+
+QUEUE_MAX = 10000   # so viele Zeilen dürfen auf das Schreiben warten
+BATCH_MAX = 500     # so viele Zeilen schreibt der Thread höchstens am Stück
+
+
+class _Writer(threading.Thread):
+    """
+    Hintergrund-Thread: sammelt (Pfad, Zeile) und hängt sie je Datei in einem Zug an.
+    Verworfene Zeilen werden je Datei gezählt und mit dem nächsten Stapel als
+    Vermerk in die Datei geschrieben.
+    """
+
+    def __init__(self):
+        super().__init__(name="ld_logging", daemon=True)
+        self.queue = queue.Queue(maxsize=QUEUE_MAX)
+        self.dropped = {}   # Pfad → Anzahl verworfener Zeilen seit dem letzten Vermerk
+        self._dropped_lock = threading.Lock()
+
+    def note_dropped(self, path):
+        with self._dropped_lock:
+            self.dropped[path] = self.dropped.get(path, 0) + 1
+
+    def take_dropped(self) -> dict:
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, {}
+        return dropped
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < BATCH_MAX:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            self._write(batch, self.take_dropped())
+            for _ in batch:
+                self.queue.task_done()
+
+    @staticmethod
+    def _write(batch, dropped=None):
+        by_path = {}
+        for path, n in (dropped or {}).items():
+            by_path[path] = [f"[ld_logging] {datetime.now():%Y-%m-%d %H:%M:%S}  "
+                             f"{n} Zeilen verworfen (Warteschlange voll) / {n} lines dropped (queue full)\n"]
+        for path, line in batch:
+            by_path.setdefault(path, []).append(line)
+        for path, lines in by_path.items():
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+            except Exception:
+                pass
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> _Writer:
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = _Writer()
+            _writer.start()
+    return _writer
+
+
+def write(path, line, block=False):
+    """
+    Reiht eine fertige Zeile ein, ohne zu warten. Ist die Warteschlange voll, wird
+    die Zeile verworfen und gezählt (Vermerk in der Datei). Nur mit ausdrücklichem
+    block=True wartet der Aufrufer, bis Platz ist – die Verdrängung selbst nutzt das nie.
+    """
+    w = _get_writer()
+    try:
+        if block:
+            w.queue.put((str(path), line))
+        else:
+            w.queue.put_nowait((str(path), line))
+    except queue.Full:
+        w.note_dropped(str(path))
+
+
+def flush(timeout=5.0) -> bool:
+    """Wartet, bis alle eingereihten Zeilen geschrieben sind (höchstens timeout Sekunden)."""
+    w = _writer
+    if w is None or not w.is_alive():
+        return True
+    q = w.queue
+    end = time.monotonic() + timeout
+    with q.all_tasks_done:
+        while q.unfinished_tasks:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return False
+            q.all_tasks_done.wait(remaining)
+    return True
+
+
+atexit.register(flush)
+
+
+def rss_bytes():
+    """Aktueller Arbeitsspeicher (RSS) des Prozesses in Byte, sonst None
+    (psutil, /proc/self/statm oder unter Windows GetProcessMemoryInfo)."""
+    try:
+        import psutil
+        return int(psutil.Process().memory_info().rss)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        pass
+    if os.name == "nt":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class _PMC(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            pmc = _PMC()
+            pmc.cb = ctypes.sizeof(_PMC)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(pmc), pmc.cb):
+                return int(pmc.WorkingSetSize)
+        except Exception:
+            pass
+    return None
+
+
+class Logger:
+    """
+    Schreibt Meldungen mit Kennung (tag) und Zeitstempel in path.
+    enabled schaltet die Datei ein; level ist die Schwelle; echo gibt zusätzlich
+    auf der Python-Konsole aus. msg darf eine Funktion ohne Argumente sein.
+    """
+
+    def __init__(self, tag, path, level=INFO, enabled=False, echo=False):
+        self.tag = tag
+        self.path = path
+        self.level = level
+        self.enabled = enabled
+        self.echo = echo
+
+    def is_enabled(self, level=INFO) -> bool:
+        return self.enabled and level >= self.level
+
+    def log(self, msg, level=INFO):
+        to_file = self.enabled and level >= self.level
+        if not (to_file or self.echo):
+            return
+        if callable(msg):
+            msg = msg()
+        if self.echo:
+            print(f"[{self.tag}] {msg}")
+        if to_file:
+            lvl = LEVEL_NAMES.get(level)
+            prefix = f"{lvl}: " if lvl else ""
+            write(self.path, f"[{self.tag}] {datetime.now():%Y-%m-%d %H:%M:%S}  {prefix}{msg}\n")
+
+    def debug(self, msg):
+        self.log(msg, DEBUG)
+
+    def info(self, msg):
+        self.log(msg, INFO)
+
+    def warning(self, msg):
+        self.log(msg, WARNING)
+
+    def error(self, msg):
+        self.log(msg, ERROR)
+
+
+_loggers = {}
+
+
+def get_logger(tag, path, **kwargs) -> Logger:
+    """Ein Logger je (tag, path); weitere Argumente gelten nur beim ersten Anlegen."""
+    key = (tag, str(path))
+    lg = _loggers.get(key)
+    if lg is None:
+        lg = _loggers[key] = Logger(tag, path, **kwargs)
+    return lg
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench.py – Benchmarks für line_displacement und MergeLinesByDirection (ohne GUI, nur qgis.core)
+#
+#   python benchmarks/bench.py run --size small --repeat 5 --out results.json
+#   python benchmarks/bench.py compare baseline.json results.json --threshold 0.15
+#
+# 'run' misst jede Stufe von line_displacement, die Phasen von
+# MergeLinesByDirection.processAlgorithm sowie einzelne Hilfsfunktionen auf den
+# festen Datensätzen aus datasets.py und schreibt Min/Median/Mittel als JSON.
+# 'compare' meldet Verschlechterungen gegenüber einer gespeicherten Basis
+# (Rückgabecode 1, wenn mindestens eine gefunden wurde).
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.join(os.path.dirname(HERE), "LineDisplacement", "scripts")
+sys.path.insert(0, HERE)
+
+import datasets  # noqa: E402
+
+NOISE_FLOOR = 0.005   # Sekunden: kleinere Unterschiede gelten nie als Verschlechterung
+
+
+# ------------------------------
+# QGIS ohne Oberfläche
+# ------------------------------
+_QGS = None
+
+def init_qgis():
+    """Startet QgsApplication ohne GUI und macht die Skripte importierbar."""
+    global _QGS
+    if _QGS is None:
+        from qgis.core import QgsApplication
+        prefix = os.environ.get("QGIS_PREFIX_PATH")
+        if prefix:
+            QgsApplication.setPrefixPath(prefix, True)
+        _QGS = QgsApplication([], False)
+        _QGS.initQgis()
+    if SCRIPTS not in sys.path:
+        sys.path.insert(0, SCRIPTS)
+    return _QGS
+
+
+def _stats(runs):
+    return {
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.fmean(runs),
+        "runs": runs,
+    }
+
+
+def _collect(results, key, seconds):
+    results.setdefault(key, []).append(seconds)
+
+
+# ------------------------------
+# line_displacement: jede Stufe
+# ------------------------------
+def bench_line_displacement(data, repeat, results):
+    from qgis.core import QgsProject
+    import Linienverdraengung as LV
+
+    project = QgsProject.instance()
+    move_lyr = datasets.to_layer(data["to_move"], "bench_to_move")
+    fixed_lyr = datasets.to_layer(data["fixed"], "bench_fixed")
+    project.addMapLayers([move_lyr, fixed_lyr])
+    merge = (datasets.MERGE_TOL, 30.0, 1.0, 5, False, False)
+    try:
+        for _ in range(repeat):
+            # frische Pipeline je Lauf: nichts aus dem Speicher der vorigen Messung
+            pipe = LV._DisplacementPipeline(datasets.BUF_DIST, datasets.MIN_REPL_LEN,
+                                            move_lyr.name(), fixed_lyr.name(), merge, merge,
+                                            dict(LV.DEFAULT_OPTIONS), project)
+            t0 = time.perf_counter()
+            pipe.result("final")
+            _collect(results, "line_displacement/total", time.perf_counter() - t0)
+            for stage, secs in pipe.timings.items():
+                _collect(results, f"line_displacement/{stage}", secs)
+    finally:
+        project.removeMapLayers([move_lyr.id(), fixed_lyr.id()])
+
+
+# ------------------------------
+# MergeLinesByDirection: Phasen aus den Kennzahl-Zeilen
+# ------------------------------
+def bench_merge(data, repeat, results):
+    lyr = datasets.to_layer(data["fragments"], "bench_fragments")
+    for _ in range(repeat):
+        total, recs = datasets.run_merge(lyr)
+        _collect(results, "merge/total", total)
+        iterations = 0.0
+        for rec in recs:
+            if rec["stage"].startswith("iteration_"):
+                iterations += rec["seconds"]
+            else:
+                _collect(results, f"merge/{rec['stage']}", rec["seconds"])
+        _collect(results, "merge/iterations", iterations)
+
+
+# ------------------------------
+# Hilfsfunktionen
+# ------------------------------
+def bench_helpers(data, repeat, results):
+    from qgis.core import QgsPointXY, QgsProject
+    import Linienverdraengung as LV
+    from Netzfragmente_verknuepfen import MergeLinesByDirection
+
+    alg = MergeLinesByDirection()
+    stubs = []
+    for cid, pts in enumerate(data["fragments"]):
+        stubs.append({'chain_id': cid, 'end': 'start', 'pt': QgsPointXY(*pts[0]), 'angle': 0.0})
+        stubs.append({'chain_id': cid, 'end': 'end', 'pt': QgsPointXY(*pts[-1]), 'angle': 0.0})
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        alg._cluster_endpoints(stubs, datasets.MERGE_TOL)
+        _collect(results, "helpers/_cluster_endpoints", time.perf_counter() - t0)
+
+    # Eingaben für split_boundary_at_endpoints aus einer Pipeline ohne Vorverknüpfung
+    project = QgsProject.instance()
+    move_lyr = datasets.to_layer(data["to_move"], "bench_to_move")
+    fixed_lyr = datasets.to_layer(data["fixed"], "bench_fixed")
+    project.addMapLayers([move_lyr, fixed_lyr])
+    try:
+        pipe = LV._DisplacementPipeline(datasets.BUF_DIST, datasets.MIN_REPL_LEN,
+                                        move_lyr.name(), fixed_lyr.name(), None, None,
+                                        dict(LV.DEFAULT_OPTIONS), project)
+        boundary = pipe.get("fixed_boundary")
+        loops = pipe.get("loops")
+    finally:
+        project.removeMapLayers([move_lyr.id(), fixed_lyr.id()])
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        LV.split_boundary_at_endpoints(boundary, loops)
+        _collect(results, "helpers/split_boundary_at_endpoints", time.perf_counter() - t0)
+
+
+BENCHES = {
+    "line_displacement": bench_line_displacement,
+    "merge": bench_merge,
+    "helpers": bench_helpers,
+}
+
+
+# ------------------------------
+# Befehle
+# ------------------------------
+def cmd_run(args):
+    init_qgis()
+    from qgis.core import Qgis
+
+    data = datasets.build(args.size, seed=args.seed)
+    selected = args.only or list(BENCHES)
+    raw = {}
+    for name in selected:
+        print(f"… {name}", file=sys.stderr)
+        BENCHES[name](data, args.repeat, raw)
+
+    out = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "size": args.size,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "vertices": {k: datasets.vertex_count(v) for k, v in data.items()},
+            "python": platform.python_version(),
+            "qgis": Qgis.version(),
+            "platform": platform.platform(),
+        },
+        "results": {k: _stats(v) for k, v in sorted(raw.items())},
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
+    for key, st in out["results"].items():
+        print(f"{key:50s} {st['median']:10.4f} s  (min {st['min']:.4f})")
+    print(f"-> {args.out}")
+    return 0
+
+
+def compare(baseline, current, threshold, noise_floor=NOISE_FLOOR):
+    """Liste (Schlüssel, Basis, aktuell, Verhältnis, verschlechtert) über die Mediane beider Läufe."""
+    rows = []
+    base_res, cur_res = baseline["results"], current["results"]
+    for key in sorted(set(base_res) & set(cur_res)):
+        b = base_res[key]["median"]
+        c = cur_res[key]["median"]
+        ratio = (c / b) if b > 0 else float("inf") if c > 0 else 1.0
+        worse = ratio > 1.0 + threshold and (c - b) > noise_floor
+        rows.append((key, b, c, ratio, worse))
+    return rows
+
+
+def cmd_compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    if baseline["meta"].get("size") != current["meta"].get("size"):
+        print("Warnung: unterschiedliche Datensatzgrößen.", file=sys.stderr)
+    rows = compare(baseline, current, args.threshold, args.noise_floor)
+    regressions = 0
+    for key, b, c, ratio, worse in rows:
+        mark = "SCHLECHTER" if worse else ""
+        regressions += worse
+        print(f"{key:50s} {b:10.4f} -> {c:10.4f} s  x{ratio:5.2f}  {mark}")
+    missing = sorted(set(baseline["results"]) ^ set(current["results"]))
+    if missing:
+        print("Nur in einem Lauf: " + ", ".join(missing))
+    print(f"{regressions} Verschlechterung(en) über {args.threshold:.0%}.")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks für LineDisplacement")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="Benchmarks ausführen und als JSON schreiben")
+    r.add_argument("--size", choices=sorted(datasets.SIZES), default="small")
+    r.add_argument("--seed", type=int, default=1)
+    r.add_argument("--repeat", type=int, default=5)
+    r.add_argument("--only", nargs="*", choices=sorted(BENCHES))
+    r.add_argument("--out", default="bench_results.json")
+    r.set_defaults(func=cmd_run)
+
+    c = sub.add_parser("compare", help="Lauf mit gespeicherter Basis vergleichen")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--threshold", type=float, default=0.15, help="erlaubter Anstieg des Medians (0.15 = 15 %%)")
+    c.add_argument("--noise-floor", type=float, default=NOISE_FLOOR)
+    c.set_defaults(func=cmd_compare)
+
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
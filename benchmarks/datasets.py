@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# datasets.py – feste synthetische Datensätze für die Benchmarks
+#
+# Alle Koordinaten entstehen deterministisch aus einem festen Startwert, damit
+# Messungen verschiedener Versionen auf exakt denselben Daten laufen.
+# Die Erzeugung selbst braucht kein QGIS; erst to_layer() baut Speicherebenen,
+# run_merge() misst MergeLinesByDirection einmal mit denselben Parametern für
+# bench.py und scaling.py.
+
+import json
+import math
+import os
+import random
+import tempfile
+import time
+
+# Größenstufen: Anzahl Straßen je Richtung, Kantenlänge, Stützpunktabstand
+SIZES = {
+    "small":  {"streets": 8,  "extent": 800.0,  "step": 10.0, "rivers": 2},
+    "medium": {"streets": 20, "extent": 2000.0, "step": 8.0,  "rivers": 4},
+    "large":  {"streets": 40, "extent": 4000.0, "step": 6.0,  "rivers": 6},
+}
+
+BUF_DIST = 12.0        # Verdrängungs-Abstand der Benchmarks
+MIN_REPL_LEN = 5.0     # Mindestlänge der Ersatzsegmente
+MERGE_TOL = 0.5        # Fangtoleranz der Netzverknüpfung
+
+
+def _polyline(x0, y0, x1, y1, step, jitter, rng):
+    """Gerade von (x0, y0) nach (x1, y1) mit Stützpunkten alle 'step' und leichtem Versatz quer dazu."""
+    length = math.hypot(x1 - x0, y1 - y0)
+    n = max(int(length / step), 1)
+    nx, ny = -(y1 - y0) / length, (x1 - x0) / length
+    pts = []
+    for i in range(n + 1):
+        f = i / n
+        off = rng.uniform(-jitter, jitter) if 0 < i < n else 0.0
+        pts.append((x0 + f * (x1 - x0) + off * nx, y0 + f * (y1 - y0) + off * ny))
+    return pts
+
+
+def street_grid(streets, extent, step, rng):
+    """Rechtwinkliges Straßenraster (weichend): 'streets' Linien je Richtung."""
+    spacing = extent / (streets + 1)
+    lines = []
+    for k in range(1, streets + 1):
+        c = k * spacing
+        lines.append(_polyline(0.0, c, extent, c, step, step * 0.05, rng))
+        lines.append(_polyline(c, 0.0, c, extent, step, step * 0.05, rng))
+    return lines
+
+
+def rivers(count, extent, step, rng):
+    """Gewundene, diagonale Flüsse (bleibend), die das Raster vielfach kreuzen und begleiten."""
+    lines = []
+    for k in range(count):
+        y0 = extent * (k + 0.5) / count
+        amp = extent * rng.uniform(0.02, 0.06)
+        wave = extent * rng.uniform(0.15, 0.3)
+        n = int(extent / step)
+        pts = []
+        for i in range(n + 1):
+            x = extent * i / n
+            pts.append((x, (y0 + 0.35 * x + amp * math.sin(2 * math.pi * x / wave)) % extent))
+        # am Umbruch (modulo) in Teilstücke trennen
+        part = [pts[0]]
+        for p in pts[1:]:
+            if abs(p[1] - part[-1][1]) > extent / 2:
+                if len(part) >= 2:
+                    lines.append(part)
+                part = []
+            part.append(p)
+        if len(part) >= 2:
+            lines.append(part)
+    return lines
+
+
+def fragments(lines, piece_vertices, gap, rng):
+    """Zerlegt Linien in kurze Stücke mit fast zusammenfallenden Endpunkten (für die Netzverknüpfung)."""
+    pieces = []
+    for pts in lines:
+        i = 0
+        while i < len(pts) - 1:
+            j = min(i + rng.randint(2, piece_vertices), len(pts) - 1)
+            piece = list(pts[i:j + 1])
+            dx, dy = rng.uniform(-gap, gap), rng.uniform(-gap, gap)
+            piece[0] = (piece[0][0] + dx, piece[0][1] + dy)
+            pieces.append(piece)
+            i = j
+    return pieces
+
+
+def build(size="small", seed=1):
+    """Datensatz der Größe 'size': weichendes Raster, bleibende Flüsse, Fragmente des Rasters."""
+    cfg = SIZES[size]
+    rng = random.Random(seed)
+    to_move = street_grid(cfg["streets"], cfg["extent"], cfg["step"], rng)
+    fixed = rivers(cfg["rivers"], cfg["extent"], cfg["step"], rng)
+    frags = fragments(to_move, 8, MERGE_TOL * 0.4, rng)
+    return {"to_move": to_move, "fixed": fixed, "fragments": frags}
+
+
+def vertex_count(lines):
+    return sum(len(pts) for pts in lines)
+
+
+def to_layer(lines, name, crs="EPSG:25832"):
+    """Speicherebene (LineString) aus Koordinatenlisten."""
+    from qgis.core import QgsVectorLayer, QgsFeature, QgsGeometry, QgsPointXY
+
+    lyr = QgsVectorLayer(f"LineString?crs={crs}", name, "memory")
+    feats = []
+    for pts in lines:
+        f = QgsFeature()
+        f.setGeometry(QgsGeometry.fromPolylineXY([QgsPointXY(x, y) for x, y in pts]))
+        feats.append(f)
+    lyr.dataProvider().addFeatures(feats)
+    lyr.updateExtents()
+    return lyr
+
+
+def run_merge(lyr, memory=False):
+    """
+    (Gesamtsekunden, Kennzahlen-Zeilen) eines MergeLinesByDirection-Laufs auf lyr;
+    Speicher (py_peak_bytes, rss_delta_bytes) nur mit memory. Die Kennzahlen laufen
+    über eine temporäre Datei, die danach wieder gelöscht wird.
+    """
+    from qgis.core import QgsProcessingContext, QgsProcessingFeedback
+    from Netzfragmente_verknuepfen import MergeLinesByDirection
+
+    alg = MergeLinesByDirection().create({'headless': True})   # Parameterdefinitionen ohne iface
+    fd, metrics_path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    try:
+        params = {
+            alg.INPUT: lyr, alg.SELECTED_ONLY: False, alg.FILTER: "",
+            alg.TOLERANCE: MERGE_TOL, alg.ANGLE_TOL: 30.0, alg.SIMPLIFY_TOL: 1.0,
+            alg.MAX_ITERS: 10, alg.SPLIT_AT_NODES: True, alg.EVEN_ONLY: False,
+            alg.DRY_RUN: False, alg.OUT_REST: False, alg.WRITE_LOG: False,
+            alg.OUTPUT: "memory:", alg.METRICS_FILE: metrics_path, alg.TRACE_MEMORY: memory,
+        }
+        t0 = time.perf_counter()
+        alg.processAlgorithm(params, QgsProcessingContext(), QgsProcessingFeedback())
+        total = time.perf_counter() - t0
+        with open(metrics_path, encoding="utf-8") as f:
+            recs = [json.loads(line) for line in f]
+    finally:
+        os.remove(metrics_path)
+    return total, recs
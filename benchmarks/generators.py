@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# generators.py – skalierbare synthetische Netze (bleibend / weichend) für Skalierungsmessungen
+#
+# Jedes Szenario erzeugt zu einer Ziel-Stützpunktzahl n (ca. 10³ … 10⁶, weichend
+# und bleibend zusammen) ein Paar aus weichenden und bleibenden Linien sowie
+# Fragmente für die Netzverknüpfung. Die tatsächliche Zahl liegt in der Nähe von
+# n, nicht exakt darauf; maßgeblich für Auswertungen ist vertex_count().
+
+import math
+import random
+
+from datasets import BUF_DIST, MERGE_TOL, _polyline, fragments
+
+
+def grid_rivers(n, seed=1):
+    """
+    Straßenraster (weichend) mit Flüssen (bleibend), die einzelnen Straßen im
+    Abstand von gut einem halben Verdrängungs-Abstand mäandernd folgen.
+    """
+    rng = random.Random(seed)
+    step, spacing = 10.0, 100.0
+    k = max(2, round(math.sqrt(n / 22.5)))          # ≈ 20·k² im Raster, ≈ 2.5·k² in den Flüssen
+    extent = spacing * (k + 1)
+    to_move = []
+    for i in range(1, k + 1):
+        c = i * spacing
+        to_move.append(_polyline(0.0, c, extent, c, step, 0.5, rng))
+        to_move.append(_polyline(c, 0.0, c, extent, step, 0.5, rng))
+    fixed = []
+    for i in range(1, k + 1, 4):
+        c = i * spacing + BUF_DIST * 0.6
+        wave = rng.uniform(150.0, 300.0)
+        m = int(extent / step)
+        fixed.append([(extent * j / m, c + BUF_DIST * 0.5 * math.sin(2 * math.pi * extent * j / m / wave))
+                      for j in range(m + 1)])
+    return {"to_move": to_move, "fixed": fixed,
+            "fragments": fragments(to_move, 8, MERGE_TOL * 0.4, rng)}
+
+
+def urban_fragments(n, seed=1):
+    """
+    Dichte Innenstadt: jede Blockkante ist ein eigenes kurzes Stück, dessen
+    Endpunkte knapp neben denen der Nachbarn liegen. Bleibend sind wenige
+    diagonale Linien quer durch das Gebiet.
+    """
+    rng = random.Random(seed)
+    block, step = 40.0, 4.0
+    per_edge = int(block / step) + 1
+    k = max(2, round(math.sqrt(n / (2.0 * per_edge))))   # k×k Blöcke, je zwei Kanten
+    extent = block * k
+    jit = MERGE_TOL * 0.4
+
+    def node(x, y):
+        return (x + rng.uniform(-jit, jit), y + rng.uniform(-jit, jit))
+
+    to_move = []
+    for i in range(k + 1):
+        for j in range(k):
+            x, y = i * block, j * block
+            for (x0, y0, x1, y1) in ((x, y, x, y + block), (y, x, y + block, x)):
+                line = _polyline(x0, y0, x1, y1, step, 0.3, rng)
+                line[0], line[-1] = node(*line[0]), node(*line[-1])
+                to_move.append(line)
+    fixed = []
+    for d in range(max(1, k // 8)):
+        off = extent * (d + 0.5) / max(1, k // 8)
+        fixed.append(_polyline(0.0, off * 0.5, extent, off * 0.5 + extent * 0.4, step * 2, 2.0, rng))
+    return {"to_move": to_move, "fixed": fixed, "fragments": to_move}
+
+
+def _offset_curve(xs, amp, wave, offset):
+    """Parallele zur Mittellinie y = amp·sin(2πx/wave) im Normalenabstand offset."""
+    pts = []
+    for x in xs:
+        y = amp * math.sin(2 * math.pi * x / wave)
+        dy = amp * 2 * math.pi / wave * math.cos(2 * math.pi * x / wave)
+        norm = math.hypot(1.0, dy)
+        pts.append((x - offset * dy / norm, y + offset / norm))
+    return pts
+
+
+def rail_corridor(n, seed=1):
+    """
+    Langer, gewundener Bahnkorridor: vier Gleise (bleibend) im Abstand von 4 m,
+    eine begleitende Straße (weichend) im Verdrängungs-Abstand und kurze
+    Querstraßen, die den Korridor etwa alle 500 m kreuzen.
+    """
+    rng = random.Random(seed)
+    step = 5.0
+    m = max(20, n // 5)                     # Stützpunkte je Längslinie (vier Gleise, eine Straße)
+    length = m * step
+    amp, wave = rng.uniform(40.0, 80.0), rng.uniform(800.0, 1500.0)
+    xs = [length * i / m for i in range(m + 1)]
+    fixed = [_offset_curve(xs, amp, wave, o) for o in (-6.0, -2.0, 2.0, 6.0)]
+    road = _offset_curve(xs, amp, wave, 6.0 + BUF_DIST * 0.7)
+    to_move = [road]
+    x = rng.uniform(100.0, 500.0)
+    while x < length - 50.0:
+        y = amp * math.sin(2 * math.pi * x / wave)
+        to_move.append(_polyline(x, y - 60.0, x + rng.uniform(-20.0, 20.0), y + 60.0, step, 0.5, rng))
+        x += rng.uniform(300.0, 700.0)
+    return {"to_move": to_move, "fixed": fixed,
+            "fragments": fragments(to_move, 12, MERGE_TOL * 0.4, rng)}
+
+
+SCENARIOS = {
+    "grid_rivers": grid_rivers,
+    "urban_fragments": urban_fragments,
+    "rail_corridor": rail_corridor,
+}
+
+
+def generate(scenario, n, seed=1):
+    """Szenario 'scenario' mit rund n Stützpunkten (weichend und bleibend)."""
+    return SCENARIOS[scenario](int(n), seed)
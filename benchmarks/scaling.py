@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# scaling.py – Laufzeit und Speicher von line_displacement und MergeLinesByDirection über n
+#
+#   python benchmarks/scaling.py --scenario grid_rivers --sizes 1e3 1e4 1e5 --out scaling.json
+#   python benchmarks/scaling.py --scenario rail_corridor --sizes 1e3 1e4 1e5 1e6 --plot scaling.png
+#
+# Je Größe wird das Szenario aus generators.py erzeugt, line_displacement Stufe
+# für Stufe und MergeLinesByDirection Phase für Phase gemessen – je zweimal: die
+# Zeiten aus einem Lauf ohne tracemalloc (es bremst Python-Code spürbar und
+# ungleich), die Speicherwerte aus einem eigenen Lauf mit. Für jede Stufe wird der Exponent b aus Zeit ≈ a·nᵇ (log-log, kleinste
+# Quadrate) geschätzt; Stufen mit b über --superlinear werden markiert.
+# Eine Grafik entsteht nur, wenn matplotlib installiert ist.
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datasets  # noqa: E402
+import generators  # noqa: E402
+from bench import init_qgis  # noqa: E402
+
+SUPERLINEAR = 1.15    # Exponent, ab dem eine Stufe als überlinear gilt
+MIN_SECONDS = 0.002   # kürzere Messpunkte gehen nicht in die Schätzung ein
+
+
+def _line_displacement_pass(data, memory):
+    """(Gesamtsekunden, Gesamtspeicher, Pipeline) eines Laufs; Speicher nur mit memory."""
+    import tracemalloc
+    from qgis.core import QgsProject
+    import Linienverdraengung as LV
+
+    project = QgsProject.instance()
+    move_lyr = datasets.to_layer(data["to_move"], "scale_to_move")
+    fixed_lyr = datasets.to_layer(data["fixed"], "scale_fixed")
+    project.addMapLayers([move_lyr, fixed_lyr])
+    merge = (datasets.MERGE_TOL, 30.0, 1.0, 5, False, False)
+    started = memory and not tracemalloc.is_tracing()
+    mem = (None, None)
+    try:
+        pipe = LV._DisplacementPipeline(datasets.BUF_DIST, datasets.MIN_REPL_LEN,
+                                        move_lyr.name(), fixed_lyr.name(), merge, merge,
+                                        dict(LV.DEFAULT_OPTIONS), project)
+        pipe.memtrace = memory
+        mem0 = LV._mem_begin() if memory else None
+        t0 = time.perf_counter()
+        pipe.result("final")
+        total = time.perf_counter() - t0
+        if memory:
+            mem = LV._mem_end(mem0)
+    finally:
+        if started:
+            tracemalloc.stop()
+        project.removeMapLayers([move_lyr.id(), fixed_lyr.id()])
+    return total, mem, pipe
+
+
+def measure_line_displacement(data):
+    """{Stufe: {seconds, py_peak_bytes, rss_delta_bytes}}: Zeiten und Speicher aus getrennten Läufen."""
+    total, _mem, timed = _line_displacement_pass(data, memory=False)
+    _total, (py_peak, rss_delta), traced = _line_displacement_pass(data, memory=True)
+    out = {"total": {"seconds": total, "py_peak_bytes": py_peak, "rss_delta_bytes": rss_delta}}
+    for stage, secs in timed.timings.items():
+        py, rss = traced.memory.get(stage, (None, None))
+        out[stage] = {"seconds": secs, "py_peak_bytes": py, "rss_delta_bytes": rss}
+    return out
+
+
+def measure_merge(data):
+    """{Phase: {seconds, py_peak_bytes, rss_delta_bytes}}; Iterationen zusammengefasst, Zeiten und Speicher getrennt gemessen."""
+    lyr = datasets.to_layer(data["fragments"], "scale_fragments")
+    total, timed = datasets.run_merge(lyr, memory=False)
+    _total, traced = datasets.run_merge(lyr, memory=True)
+    mem = {rec["stage"]: (rec.get("py_peak_bytes"), rec.get("rss_delta_bytes")) for rec in traced}
+    out = {"total": {"seconds": total}}
+    it = {"seconds": 0.0, "py_peak_bytes": 0, "rss_delta_bytes": None}
+    for rec in timed:
+        py, rss = mem.get(rec["stage"], (None, None))
+        if rec["stage"].startswith("iteration_"):
+            it["seconds"] += rec["seconds"]
+        else:
+            out[rec["stage"]] = {"seconds": rec["seconds"], "py_peak_bytes": py, "rss_delta_bytes": rss}
+    for stage, (py, _rss) in mem.items():
+        if stage.startswith("iteration_"):
+            it["py_peak_bytes"] = max(it["py_peak_bytes"], py or 0)
+    out["iterations"] = it
+    return out
+
+
+def fit_exponent(points):
+    """Steigung b der Ausgleichsgeraden log t = log a + b·log n; None bei weniger als zwei Punkten."""
+    pts = [(math.log(n), math.log(s)) for n, s in points if s and s >= MIN_SECONDS]
+    if len(pts) < 2:
+        return None
+    mx = sum(x for x, _ in pts) / len(pts)
+    my = sum(y for _, y in pts) / len(pts)
+    sxx = sum((x - mx) ** 2 for x, _ in pts)
+    if sxx == 0:
+        return None
+    return sum((x - mx) * (y - my) for x, y in pts) / sxx
+
+
+def _mb(n):
+    return "–" if n is None else f"{n / 1048576.0:.1f}"
+
+
+def report(runs, superlinear):
+    """Tabelle je Stufe über alle Größen mit geschätztem Exponenten; gibt {Schlüssel: Exponent} zurück."""
+    keys = sorted({k for r in runs for k in r["stages"]})
+    sizes = [r["vertices"] for r in runs]
+    head = f"{'Stufe':45s}" + "".join(f"{n:>14d}" for n in sizes) + "      b"
+    print(head)
+    print("-" * len(head))
+    exponents = {}
+    for key in keys:
+        cells = [r["stages"].get(key) for r in runs]
+        b = fit_exponent([(r["vertices"], c["seconds"]) for r, c in zip(runs, cells) if c])
+        exponents[key] = b
+        mark = "  ÜBERLINEAR" if b is not None and b > superlinear else ""
+        row = "".join(f"{c['seconds']:8.3f}s/{_mb(c.get('py_peak_bytes')):>4s}" if c else f"{'':>14s}"
+                      for c in cells)
+        print(f"{key:45s}{row}  {'–' if b is None else f'{b:5.2f}'}{mark}")
+    print("(Sekunden / Python-Spitze in MB; b = Exponent aus Zeit ≈ a·nᵇ)")
+    return exponents
+
+
+def plot(runs, exponents, path):
+    """Log-log-Grafik der Laufzeit je Stufe; ohne matplotlib wird nur ein Hinweis ausgegeben."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib nicht installiert – keine Grafik.", file=sys.stderr)
+        return
+    fig, axes = plt.subplots(1, 2, figsize=(13, 5))
+    for ax, prefix in zip(axes, ("line_displacement/", "merge/")):
+        for key, b in exponents.items():
+            if not key.startswith(prefix):
+                continue
+            pts = [(r["vertices"], r["stages"][key]["seconds"]) for r in runs if key in r["stages"]]
+            if not pts:
+                continue
+            label = key[len(prefix):] + ("" if b is None else f" (b={b:.2f})")
+            ax.loglog([p[0] for p in pts], [p[1] for p in pts], marker="o", label=label)
+        ax.set_title(prefix.rstrip("/"))
+        ax.set_xlabel("Stützpunkte (weichend + bleibend)")
+        ax.set_ylabel("Sekunden")
+        ax.legend(fontsize=6)
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    print(f"-> {path}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Skalierungsbericht für LineDisplacement")
+    ap.add_argument("--scenario", choices=sorted(generators.SCENARIOS), default="grid_rivers")
+    ap.add_argument("--sizes", nargs="+", type=float, default=[1e3, 1e4, 1e5])
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--skip-merge", action="store_true", help="MergeLinesByDirection nicht messen")
+    ap.add_argument("--superlinear", type=float, default=SUPERLINEAR)
+    ap.add_argument("--out", default="scaling_results.json")
+    ap.add_argument("--plot", default="", help="PNG-Pfad für die log-log-Grafik (matplotlib)")
+    args = ap.parse_args(argv)
+
+    init_qgis()
+    from qgis.core import Qgis
+
+    runs = []
+    for n in sorted(args.sizes):
+        data = generators.generate(args.scenario, n, seed=args.seed)
+        move_v, fixed_v = datasets.vertex_count(data["to_move"]), datasets.vertex_count(data["fixed"])
+        verts = move_v + fixed_v
+        print(f"… n={int(n)} ({move_v} weichende, {fixed_v} bleibende Stützpunkte)", file=sys.stderr)
+        stages = {f"line_displacement/{k}": v for k, v in measure_line_displacement(data).items()}
+        if not args.skip_merge:
+            stages.update({f"merge/{k}": v for k, v in measure_merge(data).items()})
+        runs.append({"target": int(n), "vertices": verts,
+                     "to_move_vertices": move_v, "fixed_vertices": fixed_v,
+                     "fragment_vertices": datasets.vertex_count(data["fragments"]),
+                     "stages": stages})
+
+    exponents = report(runs, args.superlinear)
+    out = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "scenario": args.scenario,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "qgis": Qgis.version(),
+            "platform": platform.platform(),
+        },
+        "runs": runs,
+        "exponents": exponents,
+        "superlinear": sorted(k for k, b in exponents.items() if b is not None and b > args.superlinear),
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
+    print(f"-> {args.out}")
+    if args.plot:
+        plot(runs, exponents, args.plot)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Die Skripte liegen wie im QGIS-Profil flach nebeneinander (expressions bzw.
+# processing/scripts); die Tests laden sie genauso über den Suchpfad.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("LineDisplacement/scripts", "."):
+    path = os.path.join(ROOT, sub)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def qgis_app():
+    qgis_core = pytest.importorskip("qgis.core")
+    app = qgis_core.QgsApplication([], False)
+    app.initQgis()
+    yield app
+    app.exitQgis()
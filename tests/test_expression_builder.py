@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip("qgis")   # i18n liest die Sprache über qgis.PyQt
+
+from LineDisplacement.expression_builder import _map_literal  # noqa: E402
+
+
+def test_map_literal_quotes_and_literals():
+    text = _map_literal({'tiles': True, 'workers': 3, 'export_gpkg': "C:/o'brien.gpkg", 'crs': None})
+    assert text.splitlines() == [
+        "map(",
+        "  'tiles', true,",
+        "  'workers', 3,",
+        "  'export_gpkg', 'C:/o''brien.gpkg',",
+        "  'crs', NULL",
+        ")",
+    ]
+
+
+def test_map_literal_empty():
+    assert _map_literal({}) == "map(\n)"
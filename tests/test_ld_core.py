@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import ld_core
+import ld_geometry
+
+
+def test_read_distances():
+    assert ld_core.read_distances(5) == [5.0]
+    assert ld_core.read_distances("2.5") == [2.5]
+    assert ld_core.read_distances([10, None, 4]) == [10.0, 4.0]
+    assert ld_core.read_distances(None) == []
+    with pytest.raises(ValueError):
+        ld_core.read_distances(["x"])
+
+
+def test_read_params_pads_and_truncates():
+    assert ld_core.read_params(None) == (None,) * 6
+    assert ld_core.read_params([0.5, 45]) == (0.5, 45, None, None, None, None)
+    assert ld_core.read_params(range(8)) == (0, 1, 2, 3, 4, 5)
+    assert ld_core.read_params(42) == (None,) * 6   # nicht iterierbar
+
+
+def test_choose_fixed_strategy():
+    assert ld_core.choose_fixed_strategy("union", 10_000, 10**6) == "union"
+    assert ld_core.choose_fixed_strategy("INDEXED", 1, 1) == "indexed"
+
+
+@pytest.fixture
+def shapely_geo():
+    if ld_geometry.shapely is None:
+        pytest.skip("Shapely 2 nicht installiert")
+    return ld_geometry.get_backend("shapely")
+
+
+def test_split_boundary_at_endpoints_closed_ring(shapely_geo):
+    shapely = ld_geometry.shapely
+    ring = shapely.boundary(shapely.box(0, 0, 10, 10))
+    lines = [shapely.LineString([(2, -1), (2, 1)]), shapely.LineString([(8, 1), (8, -1)])]
+    segs = ld_core.split_boundary_at_endpoints(shapely_geo, ring, lines)
+    assert sorted(round(s.length, 9) for s in segs) == [6.0, 34.0]
+    # das Stück über den Ringanfang hinweg bleibt ein Segment
+    wrap = max(segs, key=lambda s: s.length)
+    assert wrap.coords[0] == (8.0, 0.0) and wrap.coords[-1] == (2.0, 0.0)
+
+
+def test_split_boundary_without_endpoints_keeps_ring(shapely_geo):
+    shapely = ld_geometry.shapely
+    ring = shapely.boundary(shapely.box(0, 0, 4, 4))
+    segs = ld_core.split_boundary_at_endpoints(shapely_geo, ring, [])
+    assert len(segs) == 1 and segs[0].length == pytest.approx(16.0)
+
+
+def test_contains_pairs_matches_generic_version(shapely_geo):
+    shapely = ld_geometry.shapely
+    blobs = [shapely.box(0, 0, 5, 5), shapely.box(3, 0, 8, 5), shapely.box(20, 20, 21, 21)]
+    segs = [shapely.LineString([(1, 1), (2, 2)]), shapely.LineString([(3.5, 1), (4.5, 1)]),
+            shapely.LineString([(1, 1), (7, 1)]), shapely.LineString([(30, 30), (31, 31)])]
+    idx = shapely_geo.index(blobs)
+    generic = ld_geometry.GeometryBackend.contains_pairs
+    for kwargs in ({}, {"allowed": {1, 2}}, {"first_only": True}):
+        assert (shapely_geo.contains_pairs(blobs, segs, "blob", index=idx, **kwargs)
+                == generic(shapely_geo, blobs, segs, "blob", index=idx, **kwargs))
+    assert shapely_geo.contains_pairs(blobs, segs) == [[0], [0, 1], [], []]
+
+
+def test_fixed_buffer_indexed_matches_union_within_reach(shapely_geo):
+    shapely = ld_geometry.shapely
+    to_move = shapely.LineString([(0, 0), (100, 0)])
+    fixed = shapely.MultiLineString([
+        [(0, 3), (100, 3)],
+        [(50, 14), (52, 14)],      # isoliert, berührt nichts, liegt aber in Reichweite
+        [(200, 200), (210, 200)],  # weit weg
+    ])
+    buf = 4.0
+    indexed, n_parts, n_used = ld_core.fixed_buffer_indexed(shapely_geo, fixed, to_move, buf)
+    assert (n_parts, n_used) == (3, 2)
+    union = shapely_geo.buffer(shapely_geo.union(shapely_geo.parts(fixed)), buf, 1)
+    reach = buf * (ld_core.BLOB_FACTOR + 1.0)
+    box = shapely.box(-reach, -reach, 100 + reach, reach)
+    diff = shapely.symmetric_difference(shapely.intersection(indexed, box), shapely.intersection(union, box))
+    assert shapely.area(diff) < 1e-6
+
+
+def _area(rect):
+    return (rect[2] - rect[0]) * (rect[3] - rect[1])
+
+
+def test_quadtree_tiles_cover_extent_and_refine_dense_cells():
+    extent = (0.0, 0.0, 16.0, 16.0)
+    pts = [(1.0 + 0.01 * i, 1.0 + 0.01 * i) for i in range(100)] + [(15.0, 15.0)]
+    tiles = ld_core.quadtree_tiles(extent, pts, max_vertices=10, min_size=0.5)
+    assert abs(sum(_area(r) for r in tiles) - _area(extent)) < 1e-9
+    for p in pts:   # jeder Punkt liegt in genau einer Kachel (halboffene Zellen)
+        hits = [r for r in tiles if r[0] <= p[0] < r[2] and r[1] <= p[1] < r[3]]
+        assert len(hits) == 1
+    sizes = sorted(r[2] - r[0] for r in tiles)
+    assert sizes[0] < 2.0 and sizes[-1] == 8.0   # dicht: klein, dünn: groß
+
+
+def test_quadtree_tiles_stops_at_min_size_and_depth():
+    pts = [(0.5, 0.5)] * 50
+    assert ld_core.quadtree_tiles((0, 0, 4, 4), pts, 1, min_size=3.0) == [(0, 0, 4, 4)]
+    assert len(ld_core.quadtree_tiles((0, 0, 4, 4), pts, 1, min_size=0.0, max_depth=2)) == 7
+
+
+SQUARE = [(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+
+
+def test_locate_on_ring_numpy_matches_pure(monkeypatch):
+    pts = [(5, -1), (11, 5), (5, 10.5), (-2, 3), (0, 0)]
+    expected = [5.0, 15.0, 25.0, 37.0, 0.0]
+    assert ld_core.locate_on_ring(SQUARE, pts) == pytest.approx(expected)
+    assert ld_core.locate_on_ring(SQUARE, pts, chunk_cells=1) == pytest.approx(expected)
+    monkeypatch.setattr(ld_core, "np", None)
+    assert ld_core.locate_on_ring(SQUARE, pts) == pytest.approx(expected)
+
+
+def test_ring_substring_plain_and_wrapping():
+    assert ld_core.ring_substring(SQUARE, 5, 15) == [(5.0, 0.0), (10, 0), (10.0, 5.0)]
+    # über den Ringanfang hinweg: von (0, 5) über (0, 0) bis (5, 0)
+    wrapped = ld_core.ring_substring(SQUARE, 35, 45)
+    assert wrapped == [(0.0, 5.0), (0, 0), (5.0, 0.0)]
+    # offene Linie: kein Umlauf, d2 wird auf die Länge begrenzt
+    line = SQUARE[:-1]
+    assert ld_core.ring_substring(line, 25, 40)[-1] == (0.0, 10.0)
+
+
+class _Geom:
+    def __init__(self, empty=False):
+        self.empty = empty
+
+    def isEmpty(self):
+        return self.empty
+
+
+def test_results_to_write_skips_early_and_empty():
+    full, empty = _Geom(), _Geom(empty=True)
+    results = [(10.0, full, False), (5.0, full, True), (2.0, empty, False), (1.0, None, False)]
+    written, skipped = ld_core.results_to_write(results)
+    assert written == [(10.0, full, False)]
+    assert skipped == [5.0]
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import queue
+import time
+
+import ld_logging
+
+
+def test_lines_keep_order_and_flush_writes_all(tmp_path):
+    path = tmp_path / "log.txt"
+    for i in range(2000):
+        ld_logging.write(path, f"{i}\n")
+    assert ld_logging.flush()
+    assert path.read_text(encoding="utf-8").split() == [str(i) for i in range(2000)]
+
+
+def test_logger_formats_lazily_and_filters_level(tmp_path):
+    path = tmp_path / "log.txt"
+    calls = []
+    lg = ld_logging.Logger("t", path, level=ld_logging.INFO, enabled=True)
+    lg.debug(lambda: calls.append("debug") or "nie")
+    lg.error(lambda: "kaputt")
+    assert ld_logging.flush()
+    text = path.read_text(encoding="utf-8")
+    assert calls == []
+    assert "[t]" in text and "FEHLER/ERROR: kaputt" in text and "nie" not in text
+
+
+def test_dropped_lines_are_reported_with_next_batch(tmp_path):
+    path = str(tmp_path / "log.txt")
+    w = ld_logging._Writer()   # nicht gestartet: Stapel wird direkt geschrieben
+    w.note_dropped(path)
+    w.note_dropped(path)
+    w._write([(path, "weiter\n")], w.take_dropped())
+    lines = open(path, encoding="utf-8").read().splitlines()
+    assert "2 Zeilen verworfen" in lines[0] and "2 lines dropped" in lines[0]
+    assert lines[1] == "weiter"
+    assert w.take_dropped() == {}
+
+
+def test_rss_bytes_is_positive_or_unknown():
+    rss = ld_logging.rss_bytes()
+    assert rss is None or rss > 0
+
+
+def test_write_never_waits_on_a_full_queue(tmp_path, monkeypatch):
+    path = str(tmp_path / "log.txt")
+    w = ld_logging._Writer()   # nicht gestartet: die Warteschlange leert sich nicht
+    w.queue = queue.Queue(maxsize=1)
+    w.queue.put_nowait((path, "voll\n"))
+    monkeypatch.setattr(ld_logging, "_get_writer", lambda: w)
+    t0 = time.perf_counter()
+    ld_logging.write(path, "a\n")
+    ld_logging.Logger("t", path, enabled=True).error("b")
+    assert time.perf_counter() - t0 < 0.1
+    assert w.take_dropped() == {path: 2}
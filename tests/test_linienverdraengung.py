@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Paritätstests der Verdrängung selbst; sie brauchen QGIS und werden sonst übersprungen.
+import pytest
+
+pytest.importorskip("qgis.core")
+
+from qgis.core import QgsGeometry  # noqa: E402
+
+import Linienverdraengung as LV  # noqa: E402
+
+TO_MOVE = "MULTILINESTRING((0 0, 100 0), (0 20, 100 20))"
+FIXED = "MULTILINESTRING((10 1, 90 1), (50 14, 52 14), (200 200, 210 200))"
+
+
+def _same(a, b, tol=1e-6):
+    assert a.isEmpty() == b.isEmpty()
+    assert abs(a.length() - b.length()) < tol
+    assert a.hausdorffDistance(b) < tol
+
+
+def test_indexed_matches_union(qgis_app):
+    to_move, fixed = QgsGeometry.fromWkt(TO_MOVE), QgsGeometry.fromWkt(FIXED)
+    union, early_u = LV._displace_geometry(to_move, fixed, 3.0, 1.0, fixed_strategy="union")
+    indexed, early_i = LV._displace_geometry(to_move, fixed, 3.0, 1.0, fixed_strategy="indexed")
+    assert early_u == early_i
+    _same(union, indexed)
+
+
+def test_multi_distance_matches_single(qgis_app):
+    to_move, fixed = QgsGeometry.fromWkt(TO_MOVE), QgsGeometry.fromWkt(FIXED)
+    multi = LV.run_line_displacement_multi(to_move, fixed, [2.0, 5.0], 1.0, log_enabled=False)
+    assert [d for d, _g, _e in multi] == [2.0, 5.0]
+    for dist, geom, early in multi:
+        single, single_early = LV.run_line_displacement(to_move, fixed, dist, 1.0, log_enabled=False)
+        assert early == single_early
+        _same(geom, single)
+
+
+def test_tiled_matches_untiled(qgis_app):
+    to_move, fixed = QgsGeometry.fromWkt(TO_MOVE), QgsGeometry.fromWkt(FIXED)
+    whole, _early = LV._displace_geometry(to_move, fixed, 3.0, 1.0)
+    tiled = LV._displace_tiled(to_move, fixed, 3.0, 1.0, workers=1, max_vertices=2)
+    _same(whole, tiled)
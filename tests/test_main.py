@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip("qgis")   # main.py ist Teil des Plugins und braucht QGIS
+
+from LineDisplacement.main import _parse_distances  # noqa: E402
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", []),
+    ("5", [5.0]),
+    ("2,5; 10  20.5", [2.5, 10.0, 20.5]),
+    ("3 x 4", [3.0, 4.0]),   # keine Zahl: übersprungen (und geloggt)
+])
+def test_parse_distances(text, expected):
+    assert _parse_distances(text) == expected